@@ -1,9 +1,7 @@
 from dash import Dash
-from dash import html, dcc, ctx
+from dash import html, dcc, ctx, no_update
 from dash.dependencies import Input, Output, State
-from datetime import datetime
 import json
-import pytz
 import pandas as pd
 
 import ui_text
@@ -22,26 +20,20 @@ server = app.server
 # --- PRELOADING DATASETS ---
 # ---------------------------
 
-dict_of_df = functions_ui.preload_data()
-# global variables used in the algorithm and ui extracted from the datasets
-df = dict_of_df["task_granularity"]
-site_area_components = df.loc[df["Course_Area"].isin(constants.site_area)]["Component"].unique()
-course_components = {}
-courses = []
-for course_dict in constants.specific_moodle_course_filter:
-    course = course_dict["value"]
-    courses.append(course)
-    course_components[course] = list(df.loc[df["Course_Area"] == course]["Component"].unique())
+# the datasets are loaded the first time they are used, and the least recently used ones are unloaded
+# when they exceed the memory budget
+dataset_registry = functions_ui.DatasetRegistry(constants.datasets, constants.dataset_memory_budget)
+courses = [course_dict["value"] for course_dict in constants.specific_moodle_course_filter]
 
 # -----------------------------------------
 # --- ESTABLISH INITIAL SETTING OPTIONS ---
 # -----------------------------------------
 
-initial_df = dict_of_df["task_granularity"]
-min_date = datetime.fromtimestamp(initial_df.min()["Unix_Time"], tz=pytz.timezone("Europe/Rome"))\
-                   .replace(hour=0, minute=0, second=0, microsecond=0)
-max_date = datetime.fromtimestamp(initial_df.max()["Unix_Time"], tz=pytz.timezone("Europe/Rome"))\
-                    .replace(hour=0, minute=0, second=0, microsecond=0)
+initial_dataset = list(constants.datasets.keys())[0]
+# (with the SQLite backend, the information of the dataset is queried from the indexes of its tables)
+_, _, min_time, max_time = dataset_registry.get_dataset_info(initial_dataset)
+min_date = functions_ui.get_day(min_time)
+max_date = functions_ui.get_day(max_time)
 
 # ----------------------------------------------
 # --- LAYOUT (VISUALLY COMPONENT OF THE APP) ---
@@ -50,6 +42,15 @@ max_date = datetime.fromtimestamp(initial_df.max()["Unix_Time"], tz=pytz.timezon
 app.layout = html.Div([
     html.Div([
         html.Div([
+            # the dataset selector is only shown if there are several datasets
+            html.Div([
+                html.P(children=ui_text.select_dataset_label),
+                dcc.Dropdown(options=list(constants.datasets.keys()),
+                             value=initial_dataset,
+                             clearable=False,
+                             id="dataset-toggle")
+            ], style={"margin-bottom": "5pt"} if len(constants.datasets) > 1 else {"display": "none"}),
+
             html.Div([
                 html.P(children=ui_text.select_specific_moodle_course_filter_label),
                 dcc.Dropdown(options=constants.specific_moodle_course_filter,
@@ -119,6 +120,7 @@ app.layout = html.Div([
                       type="number",
                       value=constants.max_stt_allowed,
                       min=2,
+                      max=constants.max_stt_histogram,
                       required=True,
                       placeholder=ui_text.max_session_timeout_threshold_placeholder),
             html.Div(children="",
@@ -134,7 +136,10 @@ app.layout = html.Div([
                       placeholder=ui_text.general_session_timeout_threshold_placeholder),
             html.Div(children="",
                      style={"color": "#8b8b8b", "font-size": "smaller"},
-                     id="general-session-timeout-threshold-suggestion")
+                     id="general-session-timeout-threshold-suggestion"),
+            html.Div(children="",
+                     style={"color": "#8b8b8b", "font-size": "smaller"},
+                     id="general-session-timeout-threshold-sweep")
         ], id="general-session-timeout-threshold-div",
            style={"width": "20%", "visibility": "hidden"}),
 
@@ -228,6 +233,9 @@ app.layout = html.Div([
     # currently displayed sessions durations
     dcc.Store(id="current-sessions-durations"),
 
+    # number of sessions, durations and reasons to end for every general STT value
+    dcc.Store(id="stt-sweep"),
+
     # statistical information about tasks in time window
     dcc.Store(id="time-windows-statistics")
 ])
@@ -236,6 +244,17 @@ app.layout = html.Div([
 # --- CALLBACKS (THE APP FUNCTIONALITY) ---
 # -----------------------------------------
 
+@app.callback(
+    Output(component_id="observation-range", component_property="start_date"),
+    Output(component_id="observation-range", component_property="end_date"),
+    Input(component_id="dataset-toggle", component_property="value"), prevent_initial_call=True)
+def update_dataset(dataset):
+    # the observation range is set to all the logs of the chosen dataset
+    # (which also updates the sessions and the pauses of the callbacks that depend on it)
+    _, _, min_time, max_time = dataset_registry.get_dataset_info(dataset)
+    return functions_ui.get_day(min_time), functions_ui.get_day(max_time)
+
+
 @app.callback(
     Output(component_id="current-sessions-durations", component_property="data"),
     Input(component_id="observation-range", component_property="start_date"),
@@ -248,8 +267,11 @@ app.layout = html.Div([
     Input(component_id="general-session-timeout-threshold", component_property="value"),
     Input(component_id="component-add-session-timeout-threshold", component_property="n_clicks"),
     Input(component_id="component-active-session-timeout-thresholds", component_property="value"),
+    Input(component_id="activity-task-toggle", component_property="value"),
     State(component_id="components-toggle", component_property="value"),
-    State(component_id="component-session-timeout-threshold", component_property="value"), prevent_initial_call=True)
+    State(component_id="component-session-timeout-threshold", component_property="value"),
+    State(component_id="current-sessions-durations", component_property="data"),
+    State(component_id="dataset-toggle", component_property="value"), prevent_initial_call=True)
 def prepare_data_for_plot(observation_start_date,
                           observation_end_date,
                           specific_moodle_course,
@@ -260,8 +282,11 @@ def prepare_data_for_plot(observation_start_date,
                           general_stt,
                           component_add_stt_button,
                           component_active_stt,
+                          activity_task_toggle,
                           current_component_selection,
-                          component_stt):
+                          component_stt,
+                          current_data,
+                          dataset):
     # --- PROCESS SETTINGS ---
     outlier_detection_switch = True if temporal_metric_toggle == "time-off-task" else False
     del_attendance_session_flag = "del_only_attendance" in check_list
@@ -274,25 +299,39 @@ def prepare_data_for_plot(observation_start_date,
         if current_component_selection is not None and component_stt is not None:
             active_component_stt_dict[current_component_selection] = component_stt
 
-    data_dict = {}
     # --- GET DATA ACCORDING TO SETTINGS ---
-    for granularity in ["activity_granularity", "task_granularity"]:
+    # only the granularities shown are divided into sessions (the time window statistics are only computed
+    # when the task granularity is shown); if only the granularities shown have changed, the sessions already
+    # computed with the same settings are kept
+    data_dict = json.loads(current_data) if ctx.triggered_id == "activity-task-toggle" and current_data else {}
+    computed_granularities = [granularity for granularity
+                              in functions_ui.get_computed_granularities(activity_task_toggle)
+                              if granularity not in data_dict]
+    if ctx.triggered_id == "activity-task-toggle" and len(computed_granularities) == 0:
+        return no_update
+    dict_of_df = dataset_registry.get_datasets(dataset)
+    for granularity in computed_granularities:
         chosen_df = functions_ui.get_chosen_df(dict_of_df,
                                                observation_start_date,
                                                observation_end_date,
-                                               granularity)
-
-        learning_sessions, _ = functions_algorithm.get_session_logs(chosen_df,
-                                                                    specific_moodle_course,
-                                                                    type_of_session,
-                                                                    authentication_flag,
-                                                                    stt_flag,
-                                                                    del_attendance_session_flag,
-                                                                    outlier_detection_switch,
-                                                                    general_stt,
-                                                                    active_component_stt_dict)
-
-        data_dict[granularity] = learning_sessions
+                                               granularity,
+                                               specific_moodle_course)
+
+        # the interruptions of the logs are shared with the STT sweep (built once for these settings),
+        # so a new general STT only assembles the sessions again
+        learning_sessions = functions_algorithm.get_swept_session_result(chosen_df,
+                                                                         specific_moodle_course,
+                                                                         type_of_session,
+                                                                         authentication_flag,
+                                                                         stt_flag,
+                                                                         del_attendance_session_flag,
+                                                                         outlier_detection_switch,
+                                                                         general_stt,
+                                                                         active_component_stt_dict,
+                                                                         constants.session_identification_workers)
+
+        # only the columns used by the plot and the time window statistics are kept
+        data_dict[granularity] = learning_sessions.to_dict(["Unix_Time", "Component", "Event_Name", "Duration"])
     return json.dumps(data_dict)
 
 
@@ -307,50 +346,161 @@ def update_legend_visibility(data_json,
     # --- PLOT THE DATA ---
     data_dict = json.loads(data_json)
     data_list = []
-    for granularity in ["activity_granularity", "task_granularity"]:
-        learning_sessions = data_dict[granularity]
+    # (only the granularities that have been divided into sessions are plotted: none if no granularity is shown)
+    for granularity in functions_ui.get_computed_granularities(data_dict.keys()):
+        learning_sessions = functions_algorithm.SessionResult.from_dict(data_dict[granularity])
         temp_df = functions_ui.get_data_for_boxplot(learning_sessions)
         temp_df["Granularity"] = "Task" if granularity == "task_granularity" else "Activity"
         data_list.append(temp_df)
-    data = pd.concat(data_list)
+    data = pd.concat(data_list) if len(data_list) != 0 \
+        else pd.DataFrame(columns=["Time of session start", "Time of session end", "Granularity"])
     activity_task_visibility = {
-        "Task": True if "task_granularity" in activity_task_toggle else "legendonly",
-        "Activity": True if "activity_granularity" in activity_task_toggle else "legendonly"
+        "Task": True if "task_granularity" in activity_task_toggle and "task_granularity" in data_dict
+        else "legendonly",
+        "Activity": True if "activity_granularity" in activity_task_toggle and "activity_granularity" in data_dict
+        else "legendonly"
     }
     fig = functions_ui.plot_boxplot(data, activity_task_visibility, current_split_points)
     return fig
 
 
 @app.callback(
-    Output(component_id="pause-info", component_property="data"),
+    Output(component_id="stt-sweep", component_property="data"),
     Input(component_id="observation-range", component_property="start_date"),
     Input(component_id="observation-range", component_property="end_date"),
     Input(component_id="specific-moodle-course-filter-toggle", component_property="value"),
-    Input(component_id="type-of-session-toggle", component_property="value"))
-def update_pause_analysis_info(observation_start_date,
-                               observation_end_date,
-                               moodle_course,
-                               type_of_session):
-    # --- GET DATA ACCORDING TO SETTINGS ---
-    final_pause_analysis_dict = {}
-    for granularity in ["activity_granularity", "task_granularity"]:
+    Input(component_id="type-of-session-toggle", component_property="value"),
+    Input(component_id="temporal-metric-toggle", component_property="value"),
+    Input(component_id="study-session-identification-toggle", component_property="value"),
+    Input(component_id="check-list-toggle", component_property="value"),
+    Input(component_id="component-add-session-timeout-threshold", component_property="n_clicks"),
+    Input(component_id="component-active-session-timeout-thresholds", component_property="value"),
+    Input(component_id="max-session-timeout-threshold", component_property="value"),
+    Input(component_id="activity-task-toggle", component_property="value"),
+    State(component_id="components-toggle", component_property="value"),
+    State(component_id="component-session-timeout-threshold", component_property="value"),
+    State(component_id="stt-sweep", component_property="data"),
+    State(component_id="dataset-toggle", component_property="value"), prevent_initial_call=True)
+def update_stt_sweep(observation_start_date,
+                     observation_end_date,
+                     specific_moodle_course,
+                     type_of_session,
+                     temporal_metric_toggle,
+                     study_session_identification,
+                     check_list,
+                     component_add_stt_button,
+                     component_active_stt,
+                     max_stt,
+                     activity_task_toggle,
+                     current_component_selection,
+                     component_stt,
+                     current_stt_sweep,
+                     dataset):
+    # --- PROCESS SETTINGS (the same as for the plot, except the general STT) ---
+    outlier_detection_switch = True if temporal_metric_toggle == "time-off-task" else False
+    del_attendance_session_flag = "del_only_attendance" in check_list
+    authentication_flag = "authentication" in study_session_identification
+    stt_flag = "stt" in study_session_identification
+    active_component_stt_dict = functions_ui.transform_active_components_options_to_dict(component_active_stt)
+    if component_add_stt_button is not None:
+        if current_component_selection is not None and component_stt is not None:
+            active_component_stt_dict[current_component_selection] = component_stt
+    max_stt = constants.max_stt_allowed if max_stt is None else max_stt
+
+    # --- SESSIONS FOR ALL THE GENERAL STT VALUES AT ONCE (ONLY FOR THE GRANULARITIES SHOWN) ---
+    stt_sweep_dict = json.loads(current_stt_sweep) if ctx.triggered_id == "activity-task-toggle" \
+        and current_stt_sweep else {}
+    computed_granularities = [granularity for granularity
+                              in functions_ui.get_computed_granularities(activity_task_toggle)
+                              if granularity not in stt_sweep_dict]
+    if ctx.triggered_id == "activity-task-toggle" and len(computed_granularities) == 0:
+        return no_update
+    dict_of_df = dataset_registry.get_datasets(dataset)
+    for granularity in computed_granularities:
         chosen_df = functions_ui.get_chosen_df(dict_of_df,
                                                observation_start_date,
                                                observation_end_date,
-                                               granularity)
+                                               granularity,
+                                               specific_moodle_course)
+        stt_sweep_dict[granularity] = functions_algorithm.get_stt_sweep(chosen_df,
+                                                                        specific_moodle_course,
+                                                                        type_of_session,
+                                                                        authentication_flag,
+                                                                        stt_flag,
+                                                                        del_attendance_session_flag,
+                                                                        outlier_detection_switch,
+                                                                        active_component_stt_dict,
+                                                                        constants.min_stt_allowed,
+                                                                        max(max_stt, constants.max_stt_allowed),
+                                                                        constants.session_identification_workers)
+    return json.dumps(stt_sweep_dict)
+
+
+@app.callback(
+    Output(component_id="general-session-timeout-threshold-sweep", component_property="children"),
+    Input(component_id="general-session-timeout-threshold", component_property="value"),
+    Input(component_id="stt-sweep", component_property="data"),
+    Input(component_id="activity-task-toggle", component_property="value"), prevent_initial_call=True)
+def update_stt_sweep_info(general_stt,
+                          stt_sweep,
+                          activity_task_toggle):
+    # the sessions of the chosen general STT are taken from the sweep (without dividing the logs again)
+    if stt_sweep is None:
+        return ""
+    return functions_ui.get_stt_sweep_ui_text(json.loads(stt_sweep), general_stt, activity_task_toggle)
 
-        _, final_pause_analysis = functions_algorithm.get_session_logs(chosen_df,
-                                                                       moodle_course,
-                                                                       type_of_session,
-                                                                       authentication_flag=False,
-                                                                       stt_flag=True,
-                                                                       del_attendance_session_flag=False,
-                                                                       outlier_detection_switch=True,
-                                                                       general_stt=0,
-                                                                       active_component_stt_dict={})
 
-        final_pause_analysis_dict[granularity] = final_pause_analysis
-    return json.dumps(final_pause_analysis_dict)
+@app.callback(
+    Output(component_id="pause-info", component_property="data"),
+    Input(component_id="observation-range", component_property="start_date"),
+    Input(component_id="observation-range", component_property="end_date"),
+    Input(component_id="specific-moodle-course-filter-toggle", component_property="value"),
+    Input(component_id="type-of-session-toggle", component_property="value"),
+    Input(component_id="activity-task-toggle", component_property="value"),
+    State(component_id="pause-info", component_property="data"),
+    State(component_id="dataset-toggle", component_property="value"))
+def update_pause_analysis_info(observation_start_date,
+                               observation_end_date,
+                               moodle_course,
+                               type_of_session,
+                               activity_task_toggle,
+                               current_pause_info,
+                               dataset):
+    # --- GET DATA ACCORDING TO SETTINGS (ONLY FOR THE GRANULARITIES SHOWN) ---
+    pause_histogram_dict = json.loads(current_pause_info) if ctx.triggered_id == "activity-task-toggle" \
+        and current_pause_info else {}
+    computed_granularities = [granularity for granularity
+                              in functions_ui.get_computed_granularities(activity_task_toggle)
+                              if granularity not in pause_histogram_dict]
+    if ctx.triggered_id == "activity-task-toggle" and len(computed_granularities) == 0:
+        return no_update
+    dict_of_df = dataset_registry.get_datasets(dataset)
+    start_date, end_date = functions_ui.get_observation_range(observation_start_date, observation_end_date)
+    for granularity in computed_granularities:
+        if constants.data_backend == "sqlite":
+            # the whole dataset is not in memory: the pauses are extracted from the logs of the range
+            chosen_df = functions_ui.get_chosen_df(dict_of_df,
+                                                   observation_start_date,
+                                                   observation_end_date,
+                                                   granularity,
+                                                   moodle_course)
+            pause_table = functions_algorithm.get_pause_table(chosen_df,
+                                                              moodle_course,
+                                                              type_of_session,
+                                                              constants.session_identification_workers)
+            pause_histogram = functions_algorithm.get_pause_histogram_index(pause_table, type_of_session)
+        else:
+            # the pauses of the whole dataset are binned once per day (for each course filter and type of session),
+            # so the pause histograms of any observation range are sums of daily counts
+            # (only the pauses at the boundaries of the range are extracted again)
+            daily_pause_histograms = functions_algorithm.get_daily_pause_histograms(
+                dict_of_df[granularity],
+                moodle_course,
+                type_of_session,
+                constants.session_identification_workers)
+            pause_histogram = daily_pause_histograms.get_pause_histogram(start_date, end_date)
+        pause_histogram_dict[granularity] = pause_histogram.to_dict()
+    return json.dumps(pause_histogram_dict)
 
 
 @app.callback(
@@ -372,7 +522,8 @@ def update_pause_analysis_info(observation_start_date,
     State(component_id="specific-moodle-course-filter-toggle", component_property="value"),
     State(component_id="type-of-session-toggle", component_property="value"),
     State(component_id="components-toggle", component_property="value"),
-    State(component_id="component-session-timeout-threshold", component_property="value"), prevent_initial_call=True)
+    State(component_id="component-session-timeout-threshold", component_property="value"),
+    State(component_id="dataset-toggle", component_property="value"), prevent_initial_call=True)
 def update_options(pause_info,
                    outlier_detection_toggle,
                    study_session_identification,
@@ -383,7 +534,8 @@ def update_options(pause_info,
                    moodle_course,
                    type_of_session,
                    component_toggle,
-                   component_session_timeout_threshold):
+                   component_session_timeout_threshold,
+                   dataset):
     # --- PROCESS SETTINGS ---
     # load existing information about component's threshold
     active_component_threshold_dict = functions_ui.transform_active_components_options_to_dict(active_component_stt)
@@ -397,15 +549,17 @@ def update_options(pause_info,
     # --- UPDATE VISUALIZATION PART ---
     active_component_stt = functions_ui.transform_active_components_dict_to_options(active_component_threshold_dict)
 
-    final_pause_analysis_dict = json.loads(pause_info)
+    pause_histogram_dict = json.loads(pause_info)
+    # (the pauses of a granularity that has just been shown are not binned yet)
     max_stt_div, general_stt, general_stt_suggestion = functions_ui.get_general_time_off_task_update(
-        final_pause_analysis_dict,
+        pause_histogram_dict,
         type_of_session,
         study_session_identification,
         outlier_detection_switch,
-        activity_task_toggle,
+        [granularity for granularity in activity_task_toggle if granularity in pause_histogram_dict],
         max_stt
     )
+    site_area_components, course_components, _, _ = dataset_registry.get_dataset_info(dataset)
     component_stt, component_options = functions_ui.get_component_time_off_task_update(study_session_identification,
                                                                                        moodle_course,
                                                                                        site_area_components,
@@ -430,9 +584,11 @@ def update_components_threshold(component_toggle,
                                 max_stt,
                                 type_of_session,
                                 outlier_detection_toggle):
-    final_pause_analysis_dict = json.loads(pause_info)
+    pause_histogram_dict = json.loads(pause_info)
     outlier_detection_switch = True if outlier_detection_toggle == "time-off-task" else False
-    component_stt_suggestion = functions_ui.get_component_time_off_task_suggestion(final_pause_analysis_dict,
+    # (the pauses of a granularity that has just been shown are not binned yet)
+    activity_toggle = [granularity for granularity in activity_toggle if granularity in pause_histogram_dict]
+    component_stt_suggestion = functions_ui.get_component_time_off_task_suggestion(pause_histogram_dict,
                                                                                    type_of_session,
                                                                                    outlier_detection_switch,
                                                                                    component_toggle,
@@ -444,13 +600,17 @@ def update_components_threshold(component_toggle,
 @app.callback(Output(component_id="activity-task-toggle", component_property="value"),
               Input(component_id="session-spread-box-plot", component_property="restyleData"),
               State(component_id="activity-task-toggle", component_property="value"),
+              State(component_id="session-spread-box-plot", component_property="figure"),
               prevent_initial_call=True)
 def align_legend_and_activity_task_toggle(legend_desc,
-                                          activity_task_toggle):
+                                          activity_task_toggle,
+                                          figure):
     if legend_desc is not None:
         visible = legend_desc[0]["visible"]
         index = legend_desc[1]
-        index = ["activity_granularity" if item == 0 else "task_granularity" for item in index]
+        # the granularity of each trace is found by its name (only the granularities computed are plotted)
+        index = ["activity_granularity" if figure["data"][item]["name"] == "Activity" else "task_granularity"
+                 for item in index]
         for i in range(len(index)):
             if visible[i] == "legendonly":
                 activity_task_toggle.remove(index[i])
@@ -486,7 +646,11 @@ def update_current_split_points(add_split_point_button,
 def update_tabs(sessions,
                 current_split_points):
     sessions = json.loads(sessions)
-    task_info_df = functions_ui.info_task_in_time_window(sessions["task_granularity"], current_split_points)
+    # the statistics are computed from the task sessions, that are only divided when the task granularity is shown
+    if "task_granularity" not in sessions:
+        return [], None, None
+    task_sessions = functions_algorithm.SessionResult.from_dict(sessions["task_granularity"])
+    task_info_df = functions_ui.info_task_in_time_window(task_sessions, current_split_points)
     children = []
     for time_window in task_info_df:
         children.append(dcc.Tab(label=time_window, value=time_window + '-tab'))
@@ -506,7 +670,7 @@ def update_tabs_displayed_content(tab_value,
         return html.Thead(html.Tr([html.Th(col) for col in dataframe.columns])),\
             html.Tbody([html.Tr([html.Td(dataframe.iloc[i][col]) for col in dataframe.columns]) for i in range(len(dataframe))])
     else:
-        return []
+        return ui_text.time_window_statistics_without_task
 
 
 if __name__ == "__main__":
@@ -5,6 +5,25 @@ from datetime import date
 data_dir_path = "data/"
 file_names = {"activity_granularity": "data_activity_granularity.csv",
               "task_granularity": "data_task_granularity.csv"}
+# datasets served by the Visual Tool (name shown in the dataset selector: folder with the files of file_names);
+# the first one is shown when the Visual Tool is opened
+datasets = {"Default": data_dir_path}
+# memory (bytes) that the datasets loaded at the same time may use (None for no limit): when it is exceeded,
+# the least recently used datasets are unloaded (and loaded again the next time they are selected)
+dataset_memory_budget = None
+# if True, the logs with task granularity are derived from the logs with activity granularity when they are
+# first needed (consecutive logs of a student on the same component of the same course/area are merged),
+# instead of being read from their own file
+derive_task_granularity = False
+# the datasets are also stored as columnar caches next to the CSV files (directories with this suffix),
+# that are memory-mapped when they are loaded (and written again when the CSV file changes)
+use_data_cache = True
+data_cache_suffix = ".cache"
+# where the Visual Tool reads the logs: "csv" (the datasets of file_names, loaded in memory) or "sqlite"
+# (the tables of the SQLite file in the folder of the dataset, written with python functions_database.py,
+# read only for the observation range)
+data_backend = "csv"
+sqlite_file_name = "logs.sqlite"
 
 # courses available as a filter option
 specific_moodle_course_filter = [{"label": "Course A", "value": "Course_A"},
@@ -23,6 +42,15 @@ learning_components = ["Assignment", "File", "Lesson", "URL"]
 # the interval of the considered STT values
 min_stt_allowed = 0
 max_stt_allowed = 60
+# the greatest max considered STT for which the pause histograms of the STT suggestion are kept (minutes)
+max_stt_histogram = 24 * 60
+
+# number of worker processes used to divide the logs into sessions (1 means no parallelism)
+session_identification_workers = 1
+
+# number of rows of the CSV file read at a time when a dataset that does not fit in memory is divided into sessions
+# (see functions_streaming.write_sessions_of_csv)
+segmentation_chunk_size = 1000000
 
 # --- VARIABLES REQUIRED FOR THE STT SUGGESTION ALGORITHM ---
 stt_suggestion_considered_pause_types = {"session_study": ["Different course/area after inactivity",
@@ -47,4 +75,16 @@ stt_suggestion_final_pause_types = {"session_study": ["Different course/area aft
                                     "session_learning": ["Quality learning stopped", "Inactivity"]}
 stt_suggestion_real_pause = ["Different course/area after inactivity",
                              "Change of course + Site area after inactivity",
-                             "Quality learning stopped"]
\ No newline at end of file
+                             "Quality learning stopped"]
+
+# method of the STT suggestion: "histogram" (log-linear fit of the probabilities of the pause types in one-minute bins)
+# or "kde" (crossover of the probabilities of the pause types smoothed by kernel density estimation)
+stt_suggestion_method = "histogram"
+
+# confidence level of the interval shown next to the STT suggestion, and number of bootstrap replicates used to get it
+stt_suggestion_confidence = 0.95
+stt_suggestion_bootstrap_replicates = 1000
+# the interval is not shown when a pause type has fewer pauses than this in the fitted range,
+# or when less than this share of the bootstrap replicates give a suggestion
+stt_suggestion_confidence_min_pauses = 50
+stt_suggestion_confidence_min_suggested_share = 0.5
\ No newline at end of file
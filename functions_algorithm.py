@@ -1,5 +1,9 @@
+import weakref
+from datetime import datetime, timedelta
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
 import numpy as np
-import matplotlib.pyplot as plt
+import pandas as pd
 
 import constants
 
@@ -8,6 +12,334 @@ import constants
 # -------------------------------------------------------------------------------
 
 
+# text columns that are encoded as integer codes
+category_columns = ["Student ID", "Course_Area", "Component", "Event_Name"]
+# questions about the value of a text column that are answered for every log by the interruption rules and filters
+category_lookups = {"is_site_area": ("Course_Area", lambda value: value in constants.site_area),
+                    "is_learning_component": ("Component", lambda value: value in constants.learning_components),
+                    "is_login": ("Component", lambda value: value == "Login"),
+                    "is_logout": ("Component", lambda value: value == "Logout"),
+                    "is_course_home": ("Component", lambda value: value == "Course_home"),
+                    "is_attendance": ("Component", lambda value: value == "Attendance")}
+
+
+# --- TEXT COLUMNS OF THE LOGS ENCODED AS INTEGER CODES (THE EQUAL VALUES HAVE THE SAME CODE) ---
+# categories[column][codes[column]] gives back the column (the missing values have code -1);
+# a lookup has one entry per category, plus the last entry for the missing values, so lookup[codes[column]]
+# answers the question about the value of each log with a single index
+class CategoryCodes:
+    def __init__(self, df, codes=None, categories=None, lookups=None):
+        if codes is None:
+            codes = {}
+            categories = {}
+            for column in category_columns:
+                if column in df.columns:
+                    column_codes, column_categories = pd.factorize(df[column])
+                    codes[column] = column_codes.astype(np.int32)
+                    categories[column] = np.asarray(column_categories, dtype=object)
+        self.codes = codes
+        self.categories = categories
+        if lookups is None:
+            lookups = {name: self.get_lookup(column, lookup)
+                       for name, (column, lookup) in category_lookups.items() if column in categories}
+        self.lookups = lookups
+        # the flags of the logs for the last course filter and type of session (see get_row_flags)
+        self.row_flags = None
+
+    def get_lookup(self, column, lookup, dtype=bool):
+        # the lookup is evaluated once per category (and once for the missing values)
+        return np.array([lookup(value) for value in self.categories[column].tolist() + [np.nan]], dtype=dtype)
+
+    def get_column_lookup(self, column, lookup, dtype=bool):
+        return self.get_lookup(column, lookup, dtype)[self.codes[column]]
+
+    def get_row_flags(self, specific_moodle_course, type_of_session):
+        # the flags only depend on the codes, so the ones of the last course filter and type of session are kept
+        # for all the sessions of these logs (and of the subsets of their student index, that share the codes)
+        key = (frozenset(specific_moodle_course), type_of_session)
+        if self.row_flags is None or self.row_flags[0] != key:
+            self.row_flags = (key, SessionRowFlags(self, specific_moodle_course, type_of_session))
+        return self.row_flags[1]
+
+    def get_subset(self, rows):
+        # the categories (and so the lookups) are shared with the subset
+        return CategoryCodes(None,
+                             {column: column_codes[rows] for column, column_codes in self.codes.items()},
+                             self.categories,
+                             self.lookups)
+
+
+# --- POSITIONS OF THE ROWS FROM starts (INCLUDED) TO ends (EXCLUDED) OF EACH RANGE ---
+def get_range_rows(starts, ends):
+    lengths = ends - starts
+    first_positions = np.cumsum(lengths) - lengths
+    return np.arange(lengths.sum()) + np.repeat(starts - first_positions, lengths)
+
+
+# --- RANGES OF THE SELECTED ROWS (FROM starts TO ends) AS RANGES OF THE ROWS OF THE DATAFRAME ---
+# rows are the positions in the dataframe of the selected rows (None if all its rows are selected);
+# a range of the selected rows within the logs of one student is also a range of the rows of the dataframe
+def get_df_ranges(rows, starts, ends):
+    if rows is None:
+        return starts, ends
+    return rows[starts], rows[ends - 1] + 1
+
+
+# --- LOGS SORTED BY STUDENT AND TIME WITH THE OFFSETS OF EACH STUDENT'S LOGS ---
+class StudentIndex:
+    def __init__(self, df, student_codes=None, students=None, student_positions=None, category_codes=None,
+                 range_starts=None, range_ends=None):
+        if student_codes is None:
+            # the text columns are encoded once, when the logs are indexed;
+            # the rows are sorted once by (Student ID, Unix_Time): the students keep the order of their first
+            # appearance in the dataset, and the logs with the same timestamp keep their original order
+            # (the logs that are already sorted, as the ones loaded from the columnar cache, are not copied)
+            category_codes = CategoryCodes(df)
+            student_codes = category_codes.codes["Student ID"]
+            unix_time = df["Unix_Time"].to_numpy()
+            student_steps = np.diff(student_codes)
+            if not ((student_steps > 0) | ((student_steps == 0) & (np.diff(unix_time) >= 0))).all():
+                order = np.lexsort((unix_time, student_codes))
+                df = df.take(order)
+                category_codes = category_codes.get_subset(order)
+                student_codes = category_codes.codes["Student ID"]
+            students = category_codes.categories["Student ID"]
+        self.df = df
+        self.category_codes = category_codes
+        self.student_codes = student_codes
+        self.students = students
+        # the index has the rows of df from range_starts[k] (included) to range_ends[k] (excluded) for the k-th
+        # student: all the rows of df, or a subset of them that shares the columns and the codes of df
+        # (see get_range_subset)
+        if range_starts is None:
+            df_offsets = np.zeros(len(students) + 1, dtype=np.int64)
+            np.cumsum(np.bincount(student_codes, minlength=len(students)), out=df_offsets[1:])
+            range_starts = df_offsets[:-1]
+            range_ends = df_offsets[1:]
+            self.rows = None
+        else:
+            # the positions in df of the rows of the subset are only listed when they are needed
+            self.rows = False
+        self.range_starts = range_starts
+        self.range_ends = range_ends
+        # the logs of the k-th student are the rows of the index from offsets[k] (included) to offsets[k+1] (excluded)
+        self.offsets = np.zeros(len(students) + 1, dtype=np.int64)
+        np.cumsum(range_ends - range_starts, out=self.offsets[1:])
+        if student_positions is None:
+            student_positions = {student: k for k, student in enumerate(students.tolist())}
+        self.student_positions = student_positions
+        # the (student, time) keys of the rows of df, built at the first selection of a time range
+        # (see get_time_range), and the last selected time range with its subset
+        self.student_times = None
+        self.time_subset = None
+
+    def __len__(self):
+        return int(self.offsets[-1])
+
+    def get_rows(self):
+        # the positions in df of the rows of the index (None if the index has all the rows of df)
+        if self.rows is False:
+            self.rows = get_range_rows(self.range_starts, self.range_ends)
+        return self.rows
+
+    def get_student_range(self, student):
+        k = self.student_positions[student]
+        return int(self.range_starts[k]), int(self.range_ends[k])
+
+    def get_student_logs(self, student):
+        start, end = self.get_student_range(student)
+        return self.df.iloc[start:end]
+
+    def get_session_rule_columns(self, general_stt, active_component_stt_dict):
+        # the columns checked by the interruption rules, for the rows of the index
+        columns, lookups, components = get_session_rule_columns(self.df,
+                                                                self.student_codes,
+                                                                general_stt,
+                                                                active_component_stt_dict,
+                                                                self.category_codes)
+        rows = self.get_rows()
+        if rows is not None:
+            columns = {name: column[rows] for name, column in columns.items()}
+        return columns, lookups, components
+
+    def get_time_range(self, start_time, end_time):
+        # the logs of the k-th student from start_time (included) to end_time (excluded) are the rows of df
+        # from range_starts[k] to range_ends[k]: the rows are sorted by (student, time), so both limits are found
+        # by binary search of a single increasing key (student code * time span + time from the first log)
+        if self.student_times is None:
+            unix_time = self.df["Unix_Time"].to_numpy(dtype=float)
+            first_time = unix_time.min() if len(unix_time) != 0 else 0.0
+            time_span = unix_time.max() - first_time + 2 if len(unix_time) != 0 else 2.0
+            self.student_times = (self.student_codes * time_span + (unix_time - first_time), first_time, time_span)
+        student_times, first_time, time_span = self.student_times
+        student_keys = np.arange(len(self.students)) * time_span
+        range_limits = np.clip(np.array([start_time, end_time], dtype=float) - first_time, 0, time_span - 1)
+        return np.clip(np.searchsorted(student_times, student_keys + range_limits[0]),
+                       self.range_starts, self.range_ends), \
+            np.clip(np.searchsorted(student_times, student_keys + range_limits[1]), self.range_starts, self.range_ends)
+
+    def get_time_subset(self, start_time, end_time):
+        # the index of the logs from start_time (included) to end_time (excluded); the whole index is returned
+        # as it is if all its logs are in the range, and the subset of the last range is kept for the next callbacks
+        if self.time_subset is not None and self.time_subset[0] == (start_time, end_time):
+            return self.time_subset[1]
+        range_starts, range_ends = self.get_time_range(start_time, end_time)
+        if (range_ends - range_starts).sum() == len(self):
+            time_subset = self
+        else:
+            time_subset = self.get_range_subset(range_starts, range_ends)
+        self.time_subset = ((start_time, end_time), time_subset)
+        return time_subset
+
+    def get_range_subset(self, range_starts, range_ends):
+        # the subset with the rows of df from range_starts[k] to range_ends[k] for the k-th student:
+        # the rows are still sorted, and the columns and the codes of df are not copied
+        subset = StudentIndex(self.df,
+                              self.student_codes,
+                              self.students,
+                              self.student_positions,
+                              self.category_codes,
+                              range_starts,
+                              range_ends)
+        # (the keys of the time ranges are the ones of df)
+        subset.student_times = self.student_times
+        return subset
+
+
+# student indexes of the dataframes that have already been divided into sessions
+# (the dataframes are expected not to be modified in place after they were indexed)
+student_index_cache = {}
+
+
+# --- GET (BUILDING IT ONLY THE FIRST TIME) THE STUDENT INDEX OF THE DATAFRAME ---
+def get_student_index(chosen_df):
+    if isinstance(chosen_df, StudentIndex):
+        return chosen_df
+    key = id(chosen_df)
+    if key in student_index_cache:
+        df_reference, student_index = student_index_cache[key]
+        if df_reference() is chosen_df:
+            return student_index
+    student_index = StudentIndex(chosen_df)
+    # the index is forgotten as soon as its dataframe is deleted
+    student_index_cache[key] = (weakref.ref(chosen_df, lambda _: student_index_cache.pop(key, None)), student_index)
+    return student_index
+
+
+# labels of the reasons why the sessions were interrupted (SessionResult stores the position in this list)
+reason_to_end_labels = ["Authentication",
+                        "Change of course",
+                        "Quality learning stopped",
+                        "Different course/area after inactivity",
+                        "Same course after inactivity",
+                        "Same area after inactivity",
+                        "Site area after inactivity",
+                        "Quality learning after inactivity",
+                        "Course home after inactivity",
+                        "Final log"]
+
+
+# --- SESSIONS STORED AS RANGES OF ROWS OF THE SOURCE DATAFRAME ---
+# the i-th session consists of the rows from starts[i] (included) to ends[i] (excluded) of df;
+# its reason to end is stored as columns: reason code (position in reason_to_end_labels),
+# last component before inactivity (position in components) and inactivity duration (seconds)
+class SessionResult:
+    def __init__(self, df, starts, ends, student_codes, students, reason_codes, component_codes, components,
+                 inactivity_periods, category_codes=None):
+        self.df = df
+        # the codes of the text columns of df (encoded when they are first needed, if not given)
+        self.category_codes = category_codes
+        self.starts = starts
+        self.ends = ends
+        self.student_codes = student_codes
+        self.students = students
+        self.reason_codes = reason_codes
+        self.component_codes = component_codes
+        self.components = components
+        self.inactivity_periods = inactivity_periods
+
+    def __len__(self):
+        return len(self.starts)
+
+    def get_session_lengths(self):
+        return self.ends - self.starts
+
+    def get_category_codes(self):
+        if self.category_codes is None:
+            self.category_codes = CategoryCodes(self.df)
+        return self.category_codes
+
+    def get_session_rows(self):
+        # positions (in df) of the logs of all the sessions, one session after another
+        lengths = self.get_session_lengths()
+        first_positions = np.cumsum(lengths) - lengths
+        return np.arange(lengths.sum()) + np.repeat(self.starts - first_positions, lengths)
+
+    def get_session_numbers(self):
+        # position of the session of each log returned by get_session_rows
+        return np.repeat(np.arange(len(self)), self.get_session_lengths())
+
+    def get_subset(self, session_mask):
+        return SessionResult(self.df,
+                             self.starts[session_mask],
+                             self.ends[session_mask],
+                             self.student_codes[session_mask],
+                             self.students,
+                             self.reason_codes[session_mask],
+                             self.component_codes[session_mask],
+                             self.components,
+                             self.inactivity_periods[session_mask],
+                             self.category_codes)
+
+    def get_trimmed(self, starts, ends):
+        return SessionResult(self.df, starts, ends, self.student_codes, self.students, self.reason_codes,
+                             self.component_codes, self.components, self.inactivity_periods, self.category_codes)
+
+    def get_sessions(self):
+        # the logs are copied out of the dataframe only when the sessions are requested as lists of logs
+        logs = self.df.take(self.get_session_rows()).to_dict("records")
+        session_ends = np.cumsum(self.get_session_lengths()).tolist()
+        session_starts = [0] + session_ends[:-1]
+        return [logs[start:end] for start, end in zip(session_starts, session_ends)]
+
+    def get_reason_to_end(self):
+        return list(zip(np.array(reason_to_end_labels, dtype=object)[self.reason_codes].tolist(),
+                        np.asarray(self.components, dtype=object)[self.component_codes].tolist(),
+                        self.inactivity_periods.tolist()))
+
+    def get_reason_to_end_table(self):
+        # the reasons to end as a table: categorical reason and last component, inactivity in seconds
+        return pd.DataFrame({"Reason": pd.Categorical.from_codes(self.reason_codes, reason_to_end_labels),
+                             "Component": pd.Categorical.from_codes(self.component_codes, self.components),
+                             "Inactivity": self.inactivity_periods.astype(float)})
+
+    def to_dict(self, columns=None):
+        # JSON-serializable form that only keeps the logs of the sessions (and, optionally, only some columns)
+        columns = list(self.df.columns) if columns is None else [col for col in columns if col in self.df.columns]
+        logs = self.df.take(self.get_session_rows())
+        return {"columns": {col: logs[col].tolist() for col in columns},
+                "lengths": self.get_session_lengths().tolist(),
+                "students": np.asarray(self.students, dtype=object)[self.student_codes].tolist(),
+                "reason_codes": self.reason_codes.tolist(),
+                "components": np.asarray(self.components, dtype=object)[self.component_codes].tolist(),
+                "inactivity_periods": self.inactivity_periods.tolist()}
+
+    @staticmethod
+    def from_dict(data):
+        ends = np.cumsum(np.array(data["lengths"], dtype=np.int64))
+        student_codes, students = pd.factorize(pd.Series(data["students"], dtype=object))
+        component_codes, components = pd.factorize(pd.Series(data["components"], dtype=object))
+        return SessionResult(pd.DataFrame(data["columns"]),
+                             ends - np.array(data["lengths"], dtype=np.int64),
+                             ends,
+                             student_codes,
+                             np.asarray(students),
+                             np.array(data["reason_codes"], dtype=np.int8),
+                             component_codes,
+                             np.asarray(components),
+                             np.array(data["inactivity_periods"], dtype=float))
+
+
 # --- DIVIDE LOGS INTO SESSIONS OF CORRESPONDING SESSION TYPE ---
 def get_session_logs(chosen_df,
                      specific_moodle_course,
@@ -17,7 +349,572 @@ def get_session_logs(chosen_df,
                      del_attendance_session_flag,
                      outlier_detection_switch,
                      general_stt,
-                     active_component_stt_dict):
+                     active_component_stt_dict,
+                     engine="columnar",
+                     workers=1):
+    # both engines apply the same interruption rules and return the same sessions and reasons to end:
+    # "columnar" evaluates the rules over whole columns at once (and keeps the sessions as ranges of rows
+    # until they are returned), "loop" analyses one log-line at a time.
+    # The columnar engine can also divide the students among several worker processes
+    if engine == "columnar":
+        session_result = get_session_result(chosen_df,
+                                            specific_moodle_course,
+                                            type_of_session,
+                                            authentication_flag,
+                                            stt_flag,
+                                            del_attendance_session_flag,
+                                            outlier_detection_switch,
+                                            general_stt,
+                                            active_component_stt_dict,
+                                            workers)
+        return session_result.get_sessions(), session_result.get_reason_to_end()
+    elif engine == "loop":
+        general_stt = 0 if general_stt is None else general_stt
+        # the logs of each student are accessed through the student index (built once per dataframe)
+        student_index = get_student_index(chosen_df)
+        sessions, reason_to_end = divide_logs_into_sessions_loop(student_index,
+                                                                 type_of_session,
+                                                                 authentication_flag,
+                                                                 stt_flag,
+                                                                 outlier_detection_switch,
+                                                                 general_stt,
+                                                                 active_component_stt_dict)
+        return select_and_clean_sessions_loop(sessions,
+                                              reason_to_end,
+                                              specific_moodle_course,
+                                              type_of_session,
+                                              del_attendance_session_flag)
+    else:
+        raise ValueError("Unknown session identification engine: " + str(engine))
+
+
+# --- DIVIDE LOGS INTO SESSIONS OF CORRESPONDING SESSION TYPE (KEEPING THEM AS RANGES OF ROWS) ---
+def get_session_result(chosen_df,
+                       specific_moodle_course,
+                       type_of_session,
+                       authentication_flag,
+                       stt_flag,
+                       del_attendance_session_flag,
+                       outlier_detection_switch,
+                       general_stt,
+                       active_component_stt_dict,
+                       workers=1):
+    general_stt = 0 if general_stt is None else general_stt
+    # the logs of each student are accessed through the student index (built once per dataframe)
+    student_index = get_student_index(chosen_df)
+    session_result = divide_logs_into_sessions_columnar(student_index,
+                                                        type_of_session,
+                                                        authentication_flag,
+                                                        stt_flag,
+                                                        outlier_detection_switch,
+                                                        general_stt,
+                                                        active_component_stt_dict,
+                                                        workers)
+    return select_and_clean_sessions(session_result,
+                                     specific_moodle_course,
+                                     type_of_session,
+                                     del_attendance_session_flag)
+
+
+# --- PAUSES (REASONS TO END OF THE SESSIONS) USED BY THE STT SUGGESTION, AS A TABLE ---
+# the same pauses as the reason_to_end returned by get_session_logs with the settings of the STT suggestion
+# (time-off-task, STT of 0 minutes, no authentication), obtained from the ranges of rows of the sessions
+# without copying their logs: categorical reason and last component before inactivity, inactivity in seconds
+def get_pause_table(chosen_df, specific_moodle_course, type_of_session, workers=1):
+    session_result = get_session_result(chosen_df,
+                                        specific_moodle_course,
+                                        type_of_session,
+                                        authentication_flag=False,
+                                        stt_flag=True,
+                                        del_attendance_session_flag=False,
+                                        outlier_detection_switch=True,
+                                        general_stt=0,
+                                        active_component_stt_dict={},
+                                        workers=workers)
+    return session_result.get_reason_to_end_table()
+
+
+# --- THE SAME PAUSES AS get_pause_table, AS A LIST OF (REASON, LAST COMPONENT, INACTIVITY) ---
+def get_pause_analysis(chosen_df, specific_moodle_course, type_of_session, workers=1):
+    pause_table = get_pause_table(chosen_df, specific_moodle_course, type_of_session, workers)
+    return list(zip(pause_table["Reason"].tolist(),
+                    pause_table["Component"].tolist(),
+                    pause_table["Inactivity"].tolist()))
+
+
+# --- PAUSE TABLE OF THE PAUSES GIVEN AS A LIST OF (REASON, LAST COMPONENT, INACTIVITY) ---
+def get_pause_table_from_list(pause_analysis):
+    if isinstance(pause_analysis, pd.DataFrame):
+        return pause_analysis
+    return pd.DataFrame({"Reason": pd.Categorical([pause[0] for pause in pause_analysis],
+                                                  categories=reason_to_end_labels),
+                         "Component": pd.Categorical([pause[1] for pause in pause_analysis]),
+                         "Inactivity": np.array([pause[2] for pause in pause_analysis], dtype=float)})
+
+
+# --- FINAL PAUSE TYPE (POSITION IN constants.stt_suggestion_final_pause_types) OF EACH PAUSE OF THE TABLE ---
+# -1 for the pauses that are not considered by the STT suggestion of this type of session
+def get_final_pause_types(pause_table, type_of_session):
+    final_pause_types = constants.stt_suggestion_final_pause_types[type_of_session]
+    considered_pause_types = constants.stt_suggestion_considered_pause_types[type_of_session]
+    # the mapping is evaluated once per reason (and once for the missing reason)
+    reasons = pause_table["Reason"].cat.categories.tolist()
+    pause_type_map = np.array([final_pause_types.index(constants.stt_suggestion_map[type_of_session][reason])
+                               if reason in considered_pause_types else -1 for reason in reasons] + [-1],
+                              dtype=np.int64)
+    return pause_type_map[pause_table["Reason"].cat.codes.to_numpy()]
+
+
+# --- FLAGS OF THE LOGS CHECKED BY THE FILTERS AND THE CLEANING OF THE SESSIONS ---
+# the flags only depend on the logs, the course filter and the type of session, so they are computed once
+# for all the sessions of the logs (for example, the sessions of every STT value of the sweep)
+class SessionRowFlags:
+    def __init__(self, category_codes, specific_moodle_course, type_of_session):
+        def get_cumulative_counts(row_flags):
+            # the number of flagged rows of a range is the difference of the cumulative sums at its limits
+            cumulative_counts = np.zeros(len(row_flags) + 1, dtype=np.int64)
+            np.cumsum(row_flags, out=cumulative_counts[1:])
+            return cumulative_counts
+
+        def get_next_rows(row_flags):
+            # position of the first flagged row at or after each position (len(row_flags) if there is none)
+            rows_count = len(row_flags)
+            next_rows = np.full(rows_count + 1, rows_count, dtype=np.int64)
+            next_rows[:-1] = np.where(row_flags, np.arange(rows_count), rows_count)
+            return np.minimum.accumulate(next_rows[::-1])[::-1]
+
+        def get_previous_rows_ends(row_flags):
+            # position after the last flagged row before each position (0 if there is none)
+            previous_rows_ends = np.zeros(len(row_flags) + 1, dtype=np.int64)
+            previous_rows_ends[1:] = np.where(row_flags, np.arange(1, len(row_flags) + 1), 0)
+            return np.maximum.accumulate(previous_rows_ends)
+
+        # interpretation of session settings
+        self.is_course_session = type_of_session == "session_course"
+        self.is_learning_session = type_of_session == "session_learning"
+        self.is_study_session = self.is_course_session is False and self.is_learning_session is False
+        course_area = category_codes.codes["Course_Area"]
+        component = category_codes.codes["Component"]
+        is_site_area = category_codes.lookups["is_site_area"][course_area]
+        is_learning_component = category_codes.lookups["is_learning_component"][component]
+        self.is_attendance = category_codes.lookups["is_attendance"][component]
+        self.needed_course_counts = None
+        if len(specific_moodle_course) != 0:
+            self.needed_course_counts = get_cumulative_counts(
+                category_codes.get_column_lookup("Course_Area", lambda value: value in specific_moodle_course))
+        # (and the rows kept at the beginning and the end of the course and learning sessions)
+        if self.is_course_session or self.is_learning_session:
+            self.area_of_interest_counts = get_cumulative_counts(~is_site_area)
+            self.area_of_interest_bounds = (get_next_rows(~is_site_area), get_previous_rows_ends(~is_site_area))
+        if self.is_learning_session:
+            self.learning_component_counts = get_cumulative_counts(is_learning_component)
+            self.learning_component_bounds = (get_next_rows(is_learning_component),
+                                              get_previous_rows_ends(is_learning_component))
+
+
+# --- FILTER AND CLEAN THE SESSIONS STORED AS RANGES OF ROWS ---
+# the flags of the logs are the ones of the codes of the session result, if they are not given
+def select_and_clean_sessions(session_result,
+                              specific_moodle_course,
+                              type_of_session,
+                              del_attendance_session_flag,
+                              row_flags=None):
+    if row_flags is None:
+        row_flags = session_result.get_category_codes().get_row_flags(specific_moodle_course, type_of_session)
+
+    # FILTERING SESSIONS (to only return the sessions of interest)
+    # the conditions are the same as in select_and_clean_sessions_loop, but they are checked for all the sessions
+    # at once: each condition is an aggregate over the rows of the session, and the sessions that do not satisfy
+    # any of them are removed with a single mask
+    def get_session_counts(cumulative_counts):
+        # the number of flagged rows of each session
+        return cumulative_counts[session_result.ends] - cumulative_counts[session_result.starts]
+
+    session_lengths = session_result.get_session_lengths()
+    sessions_to_keep = np.ones(len(session_result), dtype=bool)
+    # 1) Does it have logs that are part of the courses that are of interest to us?
+    if row_flags.needed_course_counts is not None:
+        sessions_to_keep &= get_session_counts(row_flags.needed_course_counts) != 0
+    # 2) The course and learning sessions should contain at least one log that does not belong to site area
+    if not row_flags.is_study_session:
+        sessions_to_keep &= get_session_counts(row_flags.area_of_interest_counts) != 0
+    # 3) The learning sessions should contain at least one log with the quality learning component
+    if row_flags.is_learning_session:
+        sessions_to_keep &= get_session_counts(row_flags.learning_component_counts) != 0
+    # 4) Is it the only attendance session that we are not interested in?
+    if del_attendance_session_flag and len(row_flags.is_attendance) != 0:
+        last_is_attendance = row_flags.is_attendance[np.maximum(session_result.ends - 1, 0)] & (session_lengths != 0)
+        sessions_to_keep &= ~(last_is_attendance & (session_lengths <= 5))
+    session_result = session_result.get_subset(sessions_to_keep)
+
+    # CLEANING SESSIONS' LOGS (to only return the logs that are effectively part of the session)
+    # the site area logs (and, for the learning sessions, the non-quality learning component logs)
+    # are deleted from the beginning and the end of the session by narrowing its range of rows:
+    # the new start is the first kept row at or after the start, the new end follows the last kept row before the end
+    def trim(starts, ends, row_bounds):
+        next_rows, previous_rows_ends = row_bounds
+        starts = np.minimum(next_rows[starts], ends)
+        ends = np.maximum(previous_rows_ends[ends], starts)
+        return starts, ends
+
+    if row_flags.is_course_session or row_flags.is_learning_session:
+        starts, ends = trim(session_result.starts, session_result.ends, row_flags.area_of_interest_bounds)
+        if row_flags.is_learning_session:
+            starts, ends = trim(starts, ends, row_flags.learning_component_bounds)
+        session_result = session_result.get_trimmed(starts, ends)
+        # a learning session can be left without logs (when its quality learning logs belong to the site area
+        # and are deleted with it): such sessions are not returned
+        session_result = session_result.get_subset(session_result.get_session_lengths() != 0)
+    return session_result
+
+
+# --- INTERRUPTIONS OF THE SESSIONS FOR EVERY GENERAL STT VALUE ---
+# The interruption rules are checked only twice: with the general STT so high that it never interrupts a session,
+# and so low that it interrupts a session after every log where the STT check is applied. Between the two,
+# the interruption after such a log only depends on its inactivity being longer than the general STT,
+# so the sessions (before filtering and cleaning) of any general STT are assembled from these two sets of interruptions
+class SessionBreakSweep:
+    def __init__(self,
+                 chosen_df,
+                 type_of_session,
+                 authentication_flag,
+                 stt_flag,
+                 outlier_detection_switch,
+                 active_component_stt_dict,
+                 workers=1):
+        student_index = get_student_index(chosen_df)
+        # (the sweep does not keep the student index itself, so that it is forgotten with the index, see below)
+        self.df = student_index.df
+        self.rows = student_index.get_rows()
+        self.student_codes = student_index.student_codes
+        self.students = student_index.students
+        self.category_codes = student_index.category_codes
+        self.outlier_detection_switch = outlier_detection_switch
+        settings = (type_of_session, authentication_flag, stt_flag, outlier_detection_switch)
+
+        def get_breaks(general_stt):
+            columns, lookups, components = student_index.get_session_rule_columns(general_stt,
+                                                                                  active_component_stt_dict)
+            if workers > 1 and len(student_index) != 0:
+                return columns, lookups, components, get_session_breaks_parallel(columns,
+                                                                                 lookups,
+                                                                                 student_index.offsets,
+                                                                                 workers,
+                                                                                 settings)
+            return columns, lookups, components, get_session_breaks(columns, lookups, *settings)
+
+        columns, lookups, self.components, session_breaks = get_breaks(-np.inf)
+        self.break_ids, self.reason_codes, self.component_codes, self.inactivity_periods = session_breaks
+        _, _, _, (upper_break_ids, upper_reason_codes, upper_component_codes, _) = get_breaks(np.inf)
+
+        # the logs whose interruption depends on the general STT: the STT check was the reason to end the session,
+        # and the component does not have its own STT (its lookup value is the low general STT)
+        self.is_general_stt_component = np.isneginf(lookups["stt_component"][columns["component"][self.break_ids]])
+        stt_reason_codes = [reason_to_end_labels.index(label) for label in reason_to_end_labels[3:9]]
+        self.is_swept = np.isin(self.reason_codes, stt_reason_codes) & self.is_general_stt_component
+        self.durations = columns["duration"][self.break_ids]
+        self.inactivity = self.durations
+        if outlier_detection_switch:
+            self.inactivity = self.inactivity - columns["estimated_duration"][self.break_ids]
+        # without the STT interruption, these logs can still end the session if the next log is log-in
+        # (the interruptions of the high general STT are always a part of the interruptions of the low one)
+        upper_positions = np.minimum(np.searchsorted(upper_break_ids, self.break_ids),
+                                     max(len(upper_break_ids) - 1, 0))
+        self.is_upper_break = np.zeros(len(self.break_ids), dtype=bool)
+        self.upper_reason_codes = self.reason_codes
+        self.upper_component_codes = self.component_codes
+        if len(upper_break_ids) != 0:
+            self.is_upper_break = upper_break_ids[upper_positions] == self.break_ids
+            self.upper_reason_codes = upper_reason_codes[upper_positions]
+            self.upper_component_codes = upper_component_codes[upper_positions]
+        # the interruptions that do not depend on the general STT,
+        # and the inactivity periods of the STT interruptions, sorted
+        self.is_fixed_break = ~self.is_swept | self.is_upper_break
+        self.sorted_inactivity = np.sort(self.inactivity[self.is_swept])
+        self.type_of_session = type_of_session
+
+    def get_row_flags(self, specific_moodle_course):
+        # the flags of the logs for the filters and the cleaning of the sessions
+        return self.category_codes.get_row_flags(specific_moodle_course, self.type_of_session)
+
+    def get_stt_break_counts(self, stt_values):
+        # the number of STT interruptions of each general STT value (minutes)
+        return len(self.sorted_inactivity) - np.searchsorted(self.sorted_inactivity,
+                                                             np.asarray(stt_values) * 60.0,
+                                                             side="right")
+
+    def get_session_result(self, general_stt):
+        # the sessions of the general STT before filtering and cleaning (as divide_logs_into_sessions_columnar)
+        general_stt = 0 if general_stt is None else general_stt
+        is_stt_break = self.inactivity > general_stt * 60.0
+        positions = np.flatnonzero(self.is_fixed_break | (self.is_swept & is_stt_break))
+        reason_codes = self.reason_codes[positions]
+        component_codes = self.component_codes[positions]
+        # the swept interruptions without the STT interruption keep the reason of the high general STT
+        is_upper_reason = self.is_swept[positions] & ~is_stt_break[positions]
+        reason_codes[is_upper_reason] = self.upper_reason_codes[positions[is_upper_reason]]
+        component_codes[is_upper_reason] = self.upper_component_codes[positions[is_upper_reason]]
+        inactivity_periods = self.inactivity_periods[positions].astype(float)
+        if not self.outlier_detection_switch:
+            # the inactivity between the sessions of the elapsed time metric is decreased by the STT itself
+            is_general_stt_component = self.is_general_stt_component[positions]
+            inactivity_periods[is_general_stt_component] = \
+                self.durations[positions[is_general_stt_component]] - general_stt
+        ends = (self.break_ids[positions] + 1).astype(np.int64)
+        starts = np.zeros_like(ends)
+        starts[1:] = ends[:-1]
+        starts, ends = get_df_ranges(self.rows, starts, ends)
+        return SessionResult(self.df,
+                             starts,
+                             ends,
+                             self.student_codes[starts],
+                             self.students,
+                             reason_codes.astype(np.int8),
+                             component_codes,
+                             self.components,
+                             inactivity_periods,
+                             self.category_codes)
+
+
+# the last interruption sweep of each student index, with the settings it was built with
+# (the plot and the STT sweep of the Visual Tool divide the same logs with the same settings)
+session_break_sweep_cache = {}
+
+
+# --- GET (BUILDING IT ONLY FOR NEW SETTINGS) THE INTERRUPTION SWEEP OF THE LOGS ---
+def get_session_break_sweep(chosen_df,
+                            type_of_session,
+                            authentication_flag,
+                            stt_flag,
+                            outlier_detection_switch,
+                            active_component_stt_dict,
+                            workers=1):
+    student_index = get_student_index(chosen_df)
+    key = id(student_index)
+    settings = (type_of_session,
+                authentication_flag,
+                stt_flag,
+                outlier_detection_switch,
+                frozenset(active_component_stt_dict.items()))
+    if key in session_break_sweep_cache:
+        index_reference, cached_settings, session_break_sweep = session_break_sweep_cache[key]
+        if index_reference() is student_index and cached_settings == settings:
+            return session_break_sweep
+    session_break_sweep = SessionBreakSweep(student_index,
+                                            type_of_session,
+                                            authentication_flag,
+                                            stt_flag,
+                                            outlier_detection_switch,
+                                            active_component_stt_dict,
+                                            workers)
+    # the sweep is forgotten as soon as its student index is deleted
+    session_break_sweep_cache[key] = (weakref.ref(student_index, lambda _: session_break_sweep_cache.pop(key, None)),
+                                      settings,
+                                      session_break_sweep)
+    return session_break_sweep
+
+
+# --- DIVIDE LOGS INTO SESSIONS REUSING THE INTERRUPTIONS OF THE LAST SWEEP WITH THE SAME SETTINGS ---
+# the same sessions as get_session_result; the interruption rules are only checked again when the settings
+# other than the general STT (or the logs) change, so a new general STT only assembles the sessions again
+def get_swept_session_result(chosen_df,
+                             specific_moodle_course,
+                             type_of_session,
+                             authentication_flag,
+                             stt_flag,
+                             del_attendance_session_flag,
+                             outlier_detection_switch,
+                             general_stt,
+                             active_component_stt_dict,
+                             workers=1):
+    session_break_sweep = get_session_break_sweep(chosen_df,
+                                                  type_of_session,
+                                                  authentication_flag,
+                                                  stt_flag,
+                                                  outlier_detection_switch,
+                                                  active_component_stt_dict,
+                                                  workers)
+    return select_and_clean_sessions(session_break_sweep.get_session_result(general_stt),
+                                     specific_moodle_course,
+                                     type_of_session,
+                                     del_attendance_session_flag,
+                                     session_break_sweep.get_row_flags(specific_moodle_course))
+
+
+# --- SESSIONS FOR EVERY GENERAL STT VALUE OF THE INTERVAL (STT SWEEP) ---
+# returns, for each integer general STT from min_stt to max_stt, the number of sessions, the distribution
+# of their durations (minutes) and the number of sessions ended by each reason.
+# The sessions of each STT value are assembled from the interruptions of the sweep (see SessionBreakSweep),
+# and they are only filtered and cleaned again (with the same flags of the logs) when the number
+# of STT interruptions changes
+def get_stt_sweep(chosen_df,
+                  specific_moodle_course,
+                  type_of_session,
+                  authentication_flag,
+                  stt_flag,
+                  del_attendance_session_flag,
+                  outlier_detection_switch,
+                  active_component_stt_dict,
+                  min_stt=constants.min_stt_allowed,
+                  max_stt=constants.max_stt_allowed,
+                  workers=1):
+    session_break_sweep = get_session_break_sweep(chosen_df,
+                                                  type_of_session,
+                                                  authentication_flag,
+                                                  stt_flag,
+                                                  outlier_detection_switch,
+                                                  active_component_stt_dict,
+                                                  workers)
+    stt_values = np.arange(int(min_stt), int(max_stt) + 1)
+    stt_break_counts = session_break_sweep.get_stt_break_counts(stt_values)
+    row_flags = session_break_sweep.get_row_flags(specific_moodle_course)
+    unix_time = session_break_sweep.df["Unix_Time"].to_numpy()
+    stt_sweep = {}
+    for i, stt in enumerate(stt_values.tolist()):
+        if i != 0 and stt_break_counts[i] == stt_break_counts[i - 1]:
+            stt_sweep[stt] = stt_sweep[stt - 1]
+            continue
+        session_result = select_and_clean_sessions(session_break_sweep.get_session_result(stt),
+                                                   specific_moodle_course,
+                                                   type_of_session,
+                                                   del_attendance_session_flag,
+                                                   row_flags)
+        stt_sweep[stt] = get_session_summary(session_result, unix_time)
+    return stt_sweep
+
+
+# --- NUMBER, DURATIONS AND REASONS TO END OF THE SESSIONS ---
+def get_session_summary(session_result, unix_time):
+    is_not_empty = session_result.ends > session_result.starts
+    durations = (unix_time[session_result.ends[is_not_empty] - 1]
+                 - unix_time[session_result.starts[is_not_empty]]) / 60.0
+    if len(durations) != 0:
+        duration_distribution = dict(zip(["min", "q1", "median", "q3", "max"],
+                                         np.percentile(durations, [0, 25, 50, 75, 100]).tolist()))
+    else:
+        duration_distribution = dict.fromkeys(["min", "q1", "median", "q3", "max"])
+    reason_counts = np.bincount(session_result.reason_codes, minlength=len(reason_to_end_labels))
+    return {"session_count": len(session_result),
+            "duration_distribution": duration_distribution,
+            "reason_to_end_counts": dict(zip(reason_to_end_labels, reason_counts.tolist()))}
+
+
+# --- FILTER AND CLEAN THE SESSIONS STORED AS LISTS OF LOGS (REFERENCE IMPLEMENTATION) ---
+def select_and_clean_sessions_loop(sessions,
+                                   reason_to_end,
+                                   specific_moodle_course,
+                                   type_of_session,
+                                   del_attendance_session_flag):
+    # interpretation of session settings
+    is_course_session = type_of_session == "session_course"
+    is_learning_session = type_of_session == "session_learning"
+    is_study_session = is_course_session is False and is_learning_session is False
+
+    # FILTERING SESSIONS (to only return the sessions of interest)
+    # at this point we divided all the logs into sessions.
+    # However, we might only be interested in the session related to some specific course
+    # (specific_moodle_course variable); also we have divided all the logs into sessions,
+    # in case of course and learning sessions, we still need to check that the session has at least one log
+    # that does not belong to the site_area, etc.
+    # Consequently, first of all, we need to filter out all the sessions that we are not interested in.
+    no_specific_moodle_course = len(specific_moodle_course) == 0
+    session_ids_to_del = []
+    for i in range(len(sessions)):
+        session = sessions[i]
+        # 1) Does it have logs that are part of the courses that are of interest to us?
+        # If we are not interested in a specific course, always True;
+        # otherwise, we check if the session contains the logs that we need
+        has_needed_course = False if not no_specific_moodle_course else True
+        if not no_specific_moodle_course:
+            for log in session:
+                if log["Course_Area"] in specific_moodle_course:
+                   has_needed_course = True
+        if not has_needed_course:
+            session_ids_to_del.append(i)
+        else:
+            # 2) All the course sessions and learning sessions should contain at least one log that does not belong
+            # to site area. If we are interested in study sessions, this variable is always True;
+            # otherwise, we check this condition
+            has_area_of_interest = False if not is_study_session else True
+            if not is_study_session:
+                for log in session:
+                    if log["Course_Area"] not in constants.site_area:
+                        has_area_of_interest = True
+            if not has_area_of_interest:
+                session_ids_to_del.append(i)
+            else:
+                # 3) The learning sessions should contain at least one log with the quality learning component.
+                # If we are interested in any other session type, always True; otherwise check the condition
+                has_learning_component = False if is_learning_session else True
+                if is_learning_session:
+                    for log in session:
+                        if log["Component"] in constants.learning_components:
+                            has_learning_component = True
+                if not has_learning_component:
+                    session_ids_to_del.append(i)
+                else:
+                    # 4) In case we are also not interested in the only attendance sessions,
+                    # we should check whether or not the current session is the attendnce one
+                    if del_attendance_session_flag:
+                        # we defined the attendance sessions in the following way
+                        is_attendance_session = session[-1]["Component"] == "Attendance" \
+                                                and len(session) <= 5
+                        if is_attendance_session:
+                            session_ids_to_del.append(i)
+    # delete all the sessions that we are not interested in
+    sessions = [sessions[i] for i in range(len(sessions)) if i not in session_ids_to_del]
+    reason_to_end = [reason_to_end[i] for i in range(len(reason_to_end)) if i not in session_ids_to_del]
+
+    # CLEANING SESSIONS' LOGS (to only return the logs that are effectively part of the session)
+    # the way in which we divide the dataset into sessions, sometimes still results in the course and
+    # learning sessions that include in the beginning or the end the site area logs, which should not be the case.
+    # Consequently, before returning the sessions to the user, we delete those unnecessary logs within the sessions.
+    if is_course_session or is_learning_session:
+        for i in range(len(sessions)):
+            session = sessions[i]
+            # delete site area logs from the beginning of the session (if there are any)
+            id_until_which_delete_logs = 0
+            while id_until_which_delete_logs < len(session) \
+                    and session[id_until_which_delete_logs]["Course_Area"] in constants.site_area:
+                id_until_which_delete_logs += 1
+            del session[:id_until_which_delete_logs]
+            # delete site area logs from the end of the session (if there are any)
+            id_until_which_delete_logs = -1
+            while -id_until_which_delete_logs <= len(session) \
+                    and session[id_until_which_delete_logs]["Course_Area"] in constants.site_area:
+                id_until_which_delete_logs -= 1
+            del session[len(session)+id_until_which_delete_logs+1:]
+            # in case of the learning session,
+            # we should also delete the non-quality learning modules from the beginning snd the end
+            if is_learning_session:
+                # delete non-quality learning component logs from the beginning of the session (if there are any)
+                id_until_which_delete_logs = 0
+                while id_until_which_delete_logs < len(session) \
+                        and session[id_until_which_delete_logs]["Component"] not in constants.learning_components:
+                    id_until_which_delete_logs += 1
+                del session[:id_until_which_delete_logs]
+                # delete non-quality learning component logs from the end of the session (if there are any)
+                id_until_which_delete_logs = -1
+                while -id_until_which_delete_logs <= len(session) \
+                        and session[id_until_which_delete_logs]["Component"] not in constants.learning_components:
+                    id_until_which_delete_logs -= 1
+                del session[len(session)+id_until_which_delete_logs+1:]
+        # the sessions left without logs (a learning session whose quality learning logs belong to the site area)
+        # are not returned
+        reason_to_end = [reason_to_end[i] for i in range(len(sessions)) if len(sessions[i]) != 0]
+        sessions = [session for session in sessions if len(session) != 0]
+
+    return sessions, reason_to_end
+
+
+# --- DIVIDE LOGS INTO SESSIONS ANALYSING ONE LOG-LINE AT A TIME (REFERENCE IMPLEMENTATION) ---
+def divide_logs_into_sessions_loop(student_index,
+                                   type_of_session,
+                                   authentication_flag,
+                                   stt_flag,
+                                   outlier_detection_switch,
+                                   general_stt,
+                                   active_component_stt_dict):
     def estimate_inactivity_period_between_sessions(log_row):
         pause = None
         if outlier_detection_switch:
@@ -39,13 +936,12 @@ def get_session_logs(chosen_df,
     is_course_session = type_of_session == "session_course"
     is_learning_session = type_of_session == "session_learning"
     is_study_session = is_course_session is False and is_learning_session is False
-    general_stt = 0 if general_stt is None else general_stt
 
-    user_list = chosen_df["Student ID"].unique()
+    user_list = student_index.students
     sessions = []
     reason_to_end = []
     for user in user_list:  # the logs are being divided into sessions one student at a time
-        chosen_df_user_dict = chosen_df[chosen_df["Student ID"] == user].to_dict("records")
+        chosen_df_user_dict = student_index.get_student_logs(user).to_dict("records")
         # variable which accumulates all the logs of the current session
         # (afterwards, we save these logs as sessions list entry, and assign this variable the empty list value)
         session_logs = []
@@ -188,168 +1084,850 @@ def get_session_logs(chosen_df,
                                   chosen_df_user_dict[-1]["Component"],
                                   estimate_inactivity_period_between_sessions(chosen_df_user_dict[-1])))
 
-    # FILTERING SESSIONS (to only return the sessions of interest)
-    # at this point we divided all the logs into sessions.
-    # However, we might only be interested in the session related to some specific course
-    # (specific_moodle_course variable); also we have divided all the logs into sessions,
-    # in case of course and learning sessions, we still need to check that the session has at least one log
-    # that does not belong to the site_area, etc.
-    # Consequently, first of all, we need to filter out all the sessions that we are not interested in.
-    no_specific_moodle_course = len(specific_moodle_course) == 0
-    session_ids_to_del = []
-    for i in range(len(sessions)):
-        session = sessions[i]
-        # 1) Does it have logs that are part of the courses that are of interest to us?
-        # If we are not interested in a specific course, always True;
-        # otherwise, we check if the session contains the logs that we need
-        has_needed_course = False if not no_specific_moodle_course else True
-        if not no_specific_moodle_course:
-            for log in session:
-                if log["Course_Area"] in specific_moodle_course:
-                   has_needed_course = True
-        if not has_needed_course:
-            session_ids_to_del.append(i)
-        else:
-            # 2) All the course sessions and learning sessions should contain at least one log that does not belong
-            # to site area. If we are interested in study sessions, this variable is always True;
-            # otherwise, we check this condition
-            has_area_of_interest = False if not is_study_session else True
-            if not is_study_session:
-                for log in session:
-                    if log["Course_Area"] not in constants.site_area:
-                        has_area_of_interest = True
-            if not has_area_of_interest:
-                session_ids_to_del.append(i)
-            else:
-                # 3) The learning sessions should contain at least one log with the quality learning component.
-                # If we are interested in any other session type, always True; otherwise check the condition
-                has_learning_component = False if is_learning_session else True
-                if is_learning_session:
-                    for log in session:
-                        if log["Component"] in constants.learning_components:
-                            has_learning_component = True
-                if not has_learning_component:
-                    session_ids_to_del.append(i)
-                else:
-                    # 4) In case we are also not interested in the only attendance sessions,
-                    # we should check whether or not the current session is the attendnce one
-                    if del_attendance_session_flag:
-                        # we defined the attendance sessions in the following way
-                        is_attendance_session = session[-1]["Component"] == "Attendance" \
-                                                and len(session) <= 5
-                        if is_attendance_session:
-                            session_ids_to_del.append(i)
-    # delete all the sessions that we are not interested in
-    sessions = [sessions[i] for i in range(len(sessions)) if i not in session_ids_to_del]
-    reason_to_end = [reason_to_end[i] for i in range(len(reason_to_end)) if i not in session_ids_to_del]
+    return sessions, reason_to_end
 
-    # CLEANING SESSIONS' LOGS (to only return the logs that are effectively part of the session)
-    # the way in which we divide the dataset into sessions, sometimes still results in the course and
-    # learning sessions that include in the beginning or the end the site area logs, which should not be the case.
-    # Consequently, before returning the sessions to the user, we delete those unnecessary logs within the sessions.
+
+# --- DIVIDE LOGS INTO SESSIONS EVALUATING THE INTERRUPTION RULES OVER WHOLE COLUMNS ---
+def divide_logs_into_sessions_columnar(student_index,
+                                       type_of_session,
+                                       authentication_flag,
+                                       stt_flag,
+                                       outlier_detection_switch,
+                                       general_stt,
+                                       active_component_stt_dict,
+                                       workers=1):
+    # the rows of the student index are already sorted by student and time
+    columns, lookups, components = student_index.get_session_rule_columns(general_stt, active_component_stt_dict)
+    settings = (type_of_session, authentication_flag, stt_flag, outlier_detection_switch)
+    if workers > 1 and len(student_index) != 0:
+        session_breaks = get_session_breaks_parallel(columns, lookups, student_index.offsets, workers, settings)
+    else:
+        session_breaks = get_session_breaks(columns, lookups, *settings)
+    break_ids, reason_codes, component_codes, inactivity_periods = session_breaks
+
+    # every session is a contiguous range of the sorted logs that ends with an interruption
+    # (the sessions of a subset of the index are ranges of the rows of its dataframe)
+    ends = (break_ids + 1).astype(np.int64)
+    starts = np.zeros_like(ends)
+    starts[1:] = ends[:-1]
+    starts, ends = get_df_ranges(student_index.get_rows(), starts, ends)
+    return SessionResult(student_index.df,
+                         starts,
+                         ends,
+                         student_index.student_codes[starts],
+                         student_index.students,
+                         reason_codes,
+                         component_codes,
+                         components,
+                         inactivity_periods,
+                         student_index.category_codes)
+
+
+# --- INTRODUCING COLUMNS USED IN THE CHECKS OF THE INTERRUPTION RULES ---
+# the text columns are replaced by their codes (the same codes as the ones of the student index, when available),
+# and the information needed by the checks is stored in the lookups (see CategoryCodes)
+def get_session_rule_columns(ordered_df, student_codes, general_stt, active_component_stt_dict, category_codes=None):
+    if category_codes is None:
+        category_codes = CategoryCodes(ordered_df)
+    columns = {"student": student_codes,
+               "course_area": category_codes.codes["Course_Area"],
+               "component": category_codes.codes["Component"],
+               "duration": ordered_df["Duration"].to_numpy(),
+               "estimated_duration": ordered_df["Estimated_Duration"].to_numpy()}
+    lookups = dict(category_codes.lookups)
+    lookups["stt_component"] = category_codes.get_lookup("Component",
+                                                         lambda value: active_component_stt_dict.get(value,
+                                                                                                     general_stt),
+                                                         dtype=float)
+    return columns, lookups, category_codes.categories["Component"]
+
+
+# --- CHECK THE INTERRUPTION RULES AFTER EACH LOG AND EXPLAIN THE REASON WHY EACH SESSION WAS INTERRUPTED ---
+# returns the positions of the last logs of the sessions, and the reason to end of each session
+# (reason code, code of the last component before inactivity, inactivity duration)
+def get_session_breaks(columns,
+                       lookups,
+                       type_of_session,
+                       authentication_flag,
+                       stt_flag,
+                       outlier_detection_switch):
+    def get_next(column, step):
+        # value of the log that follows (step=1) or that follows the next one (step=2) the current log;
+        # the values that cross the end of the student's logs are masked by has_next/has_next_next
+        return np.roll(column, -step)
+
+    # interpretation of session settings
+    is_course_session = type_of_session == "session_course"
+    is_learning_session = type_of_session == "session_learning"
+    is_study_session = is_course_session is False and is_learning_session is False
+    student_codes = columns["student"]
+    course_area = columns["course_area"]
+    component_codes = columns["component"]
+    duration = columns["duration"]
+    estimated_duration = columns["estimated_duration"]
+    logs_count = len(student_codes)
+
+    # INTRODUCING COLUMNS USED IN THE CHECKS
+    is_site_area = lookups["is_site_area"][course_area]
+    is_learning_component = lookups["is_learning_component"][component_codes]
+    is_login = lookups["is_login"][component_codes]
+    is_logout = lookups["is_logout"][component_codes]
+    is_course_home = lookups["is_course_home"][component_codes]
+    stt_component = lookups["stt_component"][component_codes]
+    # the inactivity period is estimated in the same way for all the reasons to end
+    # (see divide_logs_into_sessions_loop for the explanation of the temporal metrics)
+    if outlier_detection_switch:
+        inactivity_period = duration - estimated_duration
+        inactivity_period_between_sessions = inactivity_period
+    else:
+        inactivity_period = duration
+        inactivity_period_between_sessions = duration - stt_component
+    # does the student have the next log, and the log after the next one?
+    has_next = np.zeros(logs_count, dtype=bool)
+    has_next[:-1] = student_codes[1:] == student_codes[:-1]
+    has_next_next = np.zeros(logs_count, dtype=bool)
+    has_next_next[:-2] = has_next[:-2] & has_next[1:-1]
+
+    # CHECK THE CONDITIONS FOR SESSION INTERRUPTION (after the current log)
+    # 1) Authentication log checks: log-out ends the session including the current log
+    logout_break = is_logout & authentication_flag
+    # the other checks are only applied if the session is still open and the student has the next log
+    can_continue = has_next & ~logout_break
+    # 2) Change of Course (only for course and learning sessions), unless the student comes back
+    # to the same Course immediately after a visit to the Site Area
+    course_change_break = np.zeros(logs_count, dtype=bool)
     if is_course_session or is_learning_session:
-        for i in range(len(sessions)):
-            session = sessions[i]
-            # delete site area logs from the beginning of the session (if there are any)
-            if session[0]["Course_Area"] in constants.site_area:
-                id_until_which_delete_logs = 0
-                current_log = session[id_until_which_delete_logs]
-                while current_log["Course_Area"] in constants.site_area:
-                    id_until_which_delete_logs += 1
-                    current_log = session[id_until_which_delete_logs]
-                del session[:id_until_which_delete_logs]
-            # delete site area logs from the end of the session (if there are any)
-            if session[-1]["Course_Area"] in constants.site_area:
-                id_until_which_delete_logs = -1
-                current_log = session[id_until_which_delete_logs]
-                while current_log["Course_Area"] in constants.site_area:
-                    id_until_which_delete_logs -= 1
-                    current_log = session[id_until_which_delete_logs]
-                del session[id_until_which_delete_logs+1:]
-            # in case of the learning session,
-            # we should also delete the non-quality learning modules from the beginning snd the end
-            if is_learning_session:
-                # delete non-quality learning component logs from the beginning of the session (if there are any)
-                if session[0]["Component"] not in constants.learning_components:
-                    id_until_which_delete_logs = 0
-                    current_log = session[id_until_which_delete_logs]
-                    while current_log["Component"] not in constants.learning_components:
-                        id_until_which_delete_logs += 1
-                        current_log = session[id_until_which_delete_logs]
-                    del session[:id_until_which_delete_logs]
-                # delete non-quality learning component logs from the end of the session (if there are any)
-                if session[-1]["Component"] not in constants.learning_components:
-                    id_until_which_delete_logs = -1
-                    current_log = session[id_until_which_delete_logs]
-                    while current_log["Component"] not in constants.learning_components:
-                        id_until_which_delete_logs -= 1
-                        current_log = session[id_until_which_delete_logs]
-                    del session[id_until_which_delete_logs+1:]
+        course_change_break = can_continue \
+            & ~is_site_area \
+            & (course_area != get_next(course_area, 1)) \
+            & ~(get_next(is_site_area, 1) & has_next_next & (get_next(course_area, 2) == course_area))
+    # 3) Stop working on Quality Learning Modules (only for learning session),
+    # unless the student moves to the next learning module through Course_home page
+    learning_stopped_break = np.zeros(logs_count, dtype=bool)
+    if is_learning_session:
+        learning_stopped_break = can_continue \
+            & is_learning_component \
+            & ~get_next(is_learning_component, 1) \
+            & ~(get_next(is_course_home, 1) & has_next_next & ~get_next(is_learning_component, 2))
+    # 4) Session timeout threshold log checks (only if the STT identification is used)
+    # (stt is stored in minutes, timeout in seconds)
+    stt_break = np.zeros(logs_count, dtype=bool)
+    if stt_flag:
+        stt_break = can_continue & (inactivity_period > stt_component * 60.0)
+    # 1) Authentication log checks: log-in starts the new session,
+    # unless the previous session has already been interrupted after the current log
+    login_break = has_next \
+        & get_next(is_login, 1) \
+        & authentication_flag \
+        & ~(logout_break | course_change_break | learning_stopped_break | stt_break)
+    # the last log of the student always ends the session (if it has not already been ended by log-out)
+    final_break = ~has_next & ~logout_break
 
-    return sessions, reason_to_end
+    # analysing the current state of student activity that lead to the session interruption after the STT
+    # (for STT suggestion algorithm)
+    if is_study_session:
+        stt_reason = np.where(course_area != get_next(course_area, 1),
+                              reason_to_end_labels.index("Different course/area after inactivity"),
+                              np.where(~is_site_area,
+                                       reason_to_end_labels.index("Same course after inactivity"),
+                                       reason_to_end_labels.index("Same area after inactivity")))
+    elif is_course_session:
+        stt_reason = np.where((course_area == get_next(course_area, 1))
+                              | (get_next(is_site_area, 1) & has_next_next & (course_area == get_next(course_area, 2))),
+                              reason_to_end_labels.index("Same course after inactivity"),
+                              reason_to_end_labels.index("Site area after inactivity"))
+    else:
+        stt_reason = np.where(get_next(is_learning_component, 1),
+                              reason_to_end_labels.index("Quality learning after inactivity"),
+                              reason_to_end_labels.index("Course home after inactivity"))
 
+    # when more than one condition is satisfied after the same log, the first checked condition explains the reason
+    session_break = logout_break | course_change_break | learning_stopped_break | stt_break | login_break | final_break
+    reason_codes = np.select([logout_break, course_change_break, learning_stopped_break, stt_break, login_break],
+                             [reason_to_end_labels.index("Authentication"),
+                              reason_to_end_labels.index("Change of course" if is_course_session
+                                                         else "Quality learning stopped"),
+                              reason_to_end_labels.index("Quality learning stopped"),
+                              stt_reason,
+                              reason_to_end_labels.index("Authentication")],
+                             reason_to_end_labels.index("Final log")).astype(np.int8)
+    # in case of log-in, the reason refers to the log-in itself (the first log of the next session)
+    reason_component_codes = np.where(login_break, get_next(component_codes, 1), component_codes)
+    break_ids = np.flatnonzero(session_break)
 
+    return break_ids, \
+        reason_codes[break_ids], \
+        reason_component_codes[break_ids], \
+        inactivity_period_between_sessions[break_ids].astype(float)
+
+
+# --- CHECK THE INTERRUPTION RULES IN PARALLEL (STUDENTS ARE SHARDED AMONG THE WORKER PROCESSES) ---
+def get_session_breaks_parallel(columns, lookups, student_offsets, workers, settings):
+    # the shards are contiguous groups of whole students with approximately the same number of logs
+    # (more shards than workers, so that the shards with heavy students do not keep the other workers waiting)
+    logs_count = int(student_offsets[-1])
+    shards_count = min(workers * 4, len(student_offsets) - 1)
+    shard_targets = np.arange(1, shards_count) * logs_count / shards_count
+    shard_bounds = student_offsets[np.searchsorted(student_offsets, shard_targets)]
+    shard_bounds = np.unique(np.concatenate(([0], shard_bounds, [logs_count]))).tolist()
+
+    # the columns are passed to the workers through shared memory (only the small lookups are pickled)
+    shared_blocks = []
+    try:
+        shared_columns = {}
+        for name, column in columns.items():
+            column = np.ascontiguousarray(column)
+            block = shared_memory.SharedMemory(create=True, size=max(column.nbytes, 1))
+            shared_blocks.append(block)
+            np.ndarray(column.shape, dtype=column.dtype, buffer=block.buf)[:] = column
+            shared_columns[name] = (block.name, column.shape, column.dtype.str)
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            futures = [executor.submit(get_session_breaks_shard, shared_columns, lookups, start, end, settings)
+                       for start, end in zip(shard_bounds[:-1], shard_bounds[1:])]
+            # the results are merged in the order of the shards, that is in the same order as the serial ones
+            shard_results = [future.result() for future in futures]
+    finally:
+        for block in shared_blocks:
+            block.close()
+            block.unlink()
+    return tuple(np.concatenate([shard_result[i] for shard_result in shard_results]) for i in range(4))
+
+
+# --- CHECK THE INTERRUPTION RULES FOR THE SHARD OF LOGS (RUN BY THE WORKER PROCESS) ---
+def get_session_breaks_shard(shared_columns, lookups, start, end, settings):
+    shared_blocks = []
+    columns = {}
+    try:
+        for name, (block_name, shape, dtype) in shared_columns.items():
+            block = shared_memory.SharedMemory(name=block_name)
+            shared_blocks.append(block)
+            columns[name] = np.ndarray(shape, dtype=dtype, buffer=block.buf)[start:end]
+        break_ids, reason_codes, component_codes, inactivity_periods = get_session_breaks(columns, lookups, *settings)
+        # the shard results are new arrays, so they do not refer to the shared memory
+        return break_ids + start, reason_codes, component_codes, inactivity_periods
+    finally:
+        # the views of the shared memory have to be released before it is closed
+        columns.clear()
+        for block in shared_blocks:
+            block.close()
+
+
+# --- PAUSE LENGTHS (MINUTES) OF EACH FINAL PAUSE TYPE OF THE STT SUGGESTION ---
+# the pauses are a pause table or a list of (reason, last component, inactivity); only the pauses of the considered
+# types, with not null inactivity (and of the specific component, if given) are kept, in their original order
 def get_classified_pause_length_list(pause_analysis, type_of_session, specific_component):
-    result_dict = {}
-    for pause_type in constants.stt_suggestion_final_pause_types[type_of_session]:
-        result_dict[pause_type] = []
-    for pause in pause_analysis:
-        if pause[0] in constants.stt_suggestion_considered_pause_types[type_of_session] \
-                and pause[2] != 0 \
-                and (specific_component is None or pause[1] == specific_component):
-            result_dict[constants.stt_suggestion_map[type_of_session][pause[0]]].append(pause[2] / 60.0)
-    result_list = []
-    for pause_type in constants.stt_suggestion_final_pause_types[type_of_session]:
-        result_dict[pause_type] = np.array(result_dict[pause_type])
-        result_dict[pause_type] = result_dict[pause_type].astype(float)
-        result_list.append(result_dict[pause_type])
-    return np.array(result_list, dtype=object)
-
-
-def get_recommended_threshold(data, labels, max_stt):
+    pause_table = get_pause_table_from_list(pause_analysis)
+    pause_types = get_final_pause_types(pause_table, type_of_session)
+    lengths = pause_table["Inactivity"].to_numpy(dtype=float)
+    is_considered = (pause_types != -1) & (lengths != 0)
+    if specific_component is not None:
+        is_considered &= (pause_table["Component"] == specific_component).to_numpy(dtype=bool)
+    # the array keeps one entry per pause type even if all the pause types have the same number of pauses
+    # (np.array would turn them into a 2-D array, whose columns would be histogrammed as the pause types)
+    result = np.empty(len(constants.stt_suggestion_final_pause_types[type_of_session]), dtype=object)
+    for j in range(len(result)):
+        result[j] = lengths[is_considered & (pause_types == j)] / 60.0
+    return result
+
+
+# --- DENSITY HISTOGRAM OF EACH PAUSE CLASS (THE SAME DENSITIES AS plt.hist(data, bins, density=True)) ---
+# data is a list of arrays (one per class) or, as for plt.hist, a 2-D array whose columns are the classes;
+# the bins include their left edge, except the last one, that includes both edges
+def get_pause_histogram(data, bins):
+    if isinstance(data, np.ndarray) and data.ndim == 2:
+        data = [data[:, i] for i in range(data.shape[1])]
+    bins = np.asarray(bins, dtype=float)
+    bins_count = len(bins) - 1
+    densities = np.zeros((len(data), bins_count))
+    for i, pause_lengths in enumerate(data):
+        pause_lengths = np.asarray(pause_lengths, dtype=float)
+        pause_lengths = pause_lengths[(pause_lengths >= bins[0]) & (pause_lengths <= bins[-1])]
+        bin_ids = np.minimum(np.searchsorted(bins, pause_lengths, side="right") - 1, bins_count - 1)
+        counts = np.bincount(bin_ids, minlength=bins_count)
+        # the class without pauses in the interval has no density (as in numpy.histogram)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            densities[i] = counts / np.diff(bins) / counts.sum()
+    return densities
+
+
+# the STT suggestion is given by the log-linear fit of the difference of the probabilities of the two pause types
+# in one-minute bins ("histogram"), or by the crossover of the probabilities of the smoothed densities ("kde")
+def get_recommended_threshold(data, labels, max_stt, method="histogram"):
+    if method == "kde":
+        threshold = get_thresholds_from_kde(get_kde_grid_counts(data, max_stt)[np.newaxis], labels)[0]
+        return None if np.isnan(threshold) else threshold
+    elif method != "histogram":
+        raise ValueError("Unknown STT suggestion method: " + str(method))
     start_point = constants.min_stt_allowed
     end_point = max_stt  # constants.max_stt_allowed
     bins = list(range(start_point, end_point, 1))
     bins.append(end_point)
-    n, bins, patches = plt.hist(data, bins, histtype='bar', stacked=False, fill=True, density=True)
-    plt.close()
+    n = get_pause_histogram(data, bins)
+    return get_threshold_from_densities(n, labels)
+
+
+# --- STT SUGGESTION FROM THE DENSITY HISTOGRAMS OF THE TWO PAUSE TYPES (ONE-MINUTE BINS FROM min_stt_allowed) ---
+def get_threshold_from_densities(n, labels):
+    threshold = get_thresholds_from_densities(np.asarray(n, dtype=float)[np.newaxis], labels)[0]
+    return None if np.isnan(threshold) else threshold
+
+
+# the log-linear fits whose slope changes the difference of the probabilities by less than this over the fitted
+# minutes are considered flat: their crossover is only given by rounding errors, so they give no suggestion
+min_fit_slope_change = 1e-9
+
+
+# --- STT SUGGESTIONS FROM A STACK OF DENSITY HISTOGRAMS (THE LOG-LINEAR FITS OF ALL THE HISTOGRAMS AT ONCE) ---
+# the least squares fit of the difference of the probabilities of the two pause types on the logarithm of the minute,
+# solved in closed form for all the histograms; the suggestion is missing (nan) without the density of a pause type,
+# with less than two bins where both pause types are present, for a flat fit or when the crossover is not finite
+def get_thresholds_from_densities(densities, labels):
     index_real_pause = 0 if labels[0] in constants.stt_suggestion_real_pause else 1
     index_continue = 1 - index_real_pause
-    difference_list = []
-    difference_x = []
-    for i in range(len(n[0])):
-        density_real_pause = n[index_real_pause][i]
-        density_continue = n[index_continue][i]
-        if density_real_pause != 0 and density_continue != 0:
-            difference_x.append(i+1)
-            density_sum = density_real_pause + density_continue
-            probability_real_pause = density_real_pause / density_sum
-            probability_continue = density_continue / density_sum
-            difference_list.append(probability_continue - probability_real_pause)
-    try:
-        res = np.polyfit(np.log(difference_x), difference_list, 1)
-        a = res[0]
-        b = res[1]
-        change_place = np.exp(-b/a)
-        return round(change_place, 2)
-    except:
+    density_real_pause = densities[:, index_real_pause]
+    density_continue = densities[:, index_continue]
+    is_used = (density_real_pause != 0) & (density_continue != 0)
+    with np.errstate(divide="ignore", invalid="ignore", over="ignore"):
+        density_sum = density_real_pause + density_continue
+        difference = np.where(is_used, density_continue / density_sum - density_real_pause / density_sum, 0.0)
+        x = np.where(is_used, np.log(np.arange(1, densities.shape[2] + 1)), 0.0)
+        used_count = is_used.sum(axis=1)
+        x_mean = x.sum(axis=1) / used_count
+        difference_mean = difference.sum(axis=1) / used_count
+        x_centered = np.where(is_used, x - x_mean[:, np.newaxis], 0.0)
+        a = (x_centered * difference).sum(axis=1) / (x_centered ** 2).sum(axis=1)
+        b = difference_mean - a * x_mean
+        thresholds = np.round(np.exp(-b / a), 2)
+        x_range = np.where(is_used, x, -np.inf).max(axis=1) - np.where(is_used, x, np.inf).min(axis=1)
+    is_suggested = ((used_count >= 2) & np.isfinite(difference).all(axis=1)
+                    & (np.abs(a) * x_range > min_fit_slope_change) & np.isfinite(thresholds))
+    return np.where(is_suggested, thresholds, np.nan)
+
+
+# --- PAUSES OF EACH TYPE ON THE HALF-MINUTE GRID OF THE KERNEL DENSITY ESTIMATION (FROM min_stt_allowed TO max_stt) ---
+# the grid points are the cells of the pause histograms (see get_pause_cells): a pause equal to min_stt_allowed + k
+# is counted at min_stt_allowed + k, a pause from min_stt_allowed + k to min_stt_allowed + k + 1 (both excluded)
+# at min_stt_allowed + k + 0.5
+def get_kde_grid_counts(data, max_stt):
+    if isinstance(data, np.ndarray) and data.ndim == 2:
+        data = [data[:, i] for i in range(data.shape[1])]
+    if int(max_stt) > constants.max_stt_histogram:
+        raise ValueError("The kernel density estimation only goes up to " + str(constants.max_stt_histogram)
+                         + " minutes")
+    grid_size = 2 * (int(max_stt) - constants.min_stt_allowed) + 1
+    grid_counts = np.zeros((len(data), grid_size), dtype=np.int64)
+    for i, pause_lengths in enumerate(data):
+        cells = get_pause_cells(np.asarray(pause_lengths, dtype=float))
+        grid_counts[i] = np.bincount(cells[cells < grid_size], minlength=grid_size)
+    return grid_counts
+
+
+# --- SMOOTHED DENSITIES OF THE PAUSES ON THE HALF-MINUTE GRID (BINNED GAUSSIAN KERNEL DENSITY ESTIMATION) ---
+# grid_counts[..., k] is the number of pauses at the k-th grid point; the bandwidth of each distribution is given
+# by Silverman's rule, and the counts are convolved with the kernel through the FFT (its Fourier transform is known),
+# so the cost only depends on the size of the grid. The densities are reflected at the limits of the grid
+# (the pauses shorter than min_stt_allowed and longer than max_stt are not part of the distributions)
+def get_kde_densities(grid_counts, grid_step=0.5):
+    grid_size = grid_counts.shape[-1]
+    positions = np.arange(grid_size) * grid_step
+    totals = grid_counts.sum(axis=-1)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        means = (grid_counts * positions).sum(axis=-1) / totals
+        deviations = np.sqrt((grid_counts * (positions - means[..., np.newaxis]) ** 2).sum(axis=-1) / totals)
+        cumulative_counts = np.cumsum(grid_counts, axis=-1)
+        quartiles = [positions[np.minimum((cumulative_counts < (totals * q)[..., np.newaxis]).sum(axis=-1),
+                                          grid_size - 1)] for q in (0.25, 0.75)]
+        spreads = np.where(quartiles[1] > quartiles[0],
+                           np.minimum(deviations, (quartiles[1] - quartiles[0]) / 1.34),
+                           deviations)
+        bandwidths = 0.9 * spreads * totals ** -0.2
+    bandwidths = np.where(np.isfinite(bandwidths) & (bandwidths > grid_step), bandwidths, grid_step)
+    # the kernel is (almost) entirely within 4 bandwidths, and the FFT is long enough not to wrap the kernel around
+    reflected_size = min(int(np.ceil(4 * bandwidths.max() / grid_step)), grid_size - 1)
+    fft_size = 1 << int(np.ceil(np.log2(grid_size + 2 * reflected_size)))
+    frequencies = np.fft.rfftfreq(fft_size, d=grid_step)
+    kernel_transforms = np.exp(-0.5 * (2 * np.pi * frequencies * bandwidths[..., np.newaxis]) ** 2)
+    smoothed_counts = np.fft.irfft(np.fft.rfft(grid_counts, fft_size) * kernel_transforms, fft_size)
+    densities = smoothed_counts[..., :grid_size].copy()
+    if reflected_size != 0:
+        densities[..., 1:reflected_size + 1] += smoothed_counts[..., fft_size - reflected_size:][..., ::-1]
+        densities[..., grid_size - 1 - reflected_size:grid_size - 1] += \
+            smoothed_counts[..., grid_size:grid_size + reflected_size][..., ::-1]
+    with np.errstate(divide="ignore", invalid="ignore"):
+        return np.maximum(densities, 0) / grid_step / totals[..., np.newaxis]
+
+
+# --- STT SUGGESTIONS FROM A STACK OF PAUSE COUNTS ON THE GRID (CROSSOVER OF THE SMOOTHED DENSITIES) ---
+# grid_counts[i, j, k] is the number of pauses of the j-th pause type at the k-th grid point of the i-th distribution;
+# the suggestion is the first length where the probability of the real pause, that is smaller than the one
+# of the continuation for the short pauses, reaches it (linear interpolation between the grid points),
+# nan if the probabilities never cross
+def get_thresholds_from_kde(grid_counts, labels, grid_step=0.5):
+    index_real_pause = 0 if labels[0] in constants.stt_suggestion_real_pause else 1
+    index_continue = 1 - index_real_pause
+    thresholds = np.full(len(grid_counts), np.nan)
+    # the distributions are smoothed in chunks, so that the transforms of a large stack are not kept all at once
+    chunk_size = max(1, (1 << 21) // (2 * grid_counts.shape[-1]))
+    for chunk_start in range(0, len(grid_counts), chunk_size):
+        densities = get_kde_densities(grid_counts[chunk_start:chunk_start + chunk_size], grid_step)
+        density_real_pause = densities[:, index_real_pause]
+        density_continue = densities[:, index_continue]
+        density_sum = density_real_pause + density_continue
+        # the probabilities are only compared where the densities are not vanishingly small
+        with np.errstate(divide="ignore", invalid="ignore"):
+            is_defined = density_sum > 1e-9 * density_sum.max(axis=1, keepdims=True)
+            difference = np.where(is_defined, (density_continue - density_real_pause) / density_sum, 0.0)
+        is_crossing = is_defined[:, :-1] & is_defined[:, 1:] & (difference[:, :-1] > 0) & (difference[:, 1:] <= 0)
+        has_crossing = is_crossing.any(axis=1)
+        first_crossings = is_crossing.argmax(axis=1)
+        rows = np.arange(len(densities))
+        before = difference[rows, first_crossings]
+        after = difference[rows, first_crossings + 1]
+        with np.errstate(divide="ignore", invalid="ignore"):
+            crossings = constants.min_stt_allowed + (first_crossings + before / (before - after)) * grid_step
+        thresholds[chunk_start:chunk_start + chunk_size] = np.where(has_crossing, np.round(crossings, 2), np.nan)
+    return thresholds
+
+
+# --- BOOTSTRAP CONFIDENCE INTERVAL OF THE STT SUGGESTION ---
+# counts[j, k] is the number of pauses of the j-th pause type in the k-th one-minute bin (in the k-th grid point
+# of get_kde_grid_counts for the "kde" method); the pauses of each type are
+# resampled as a multinomial draw from its histogram (without dividing the logs into sessions again), and the interval
+# is given by the percentiles of the suggestions of the replicates (None if the suggestion can not be computed, if a
+# pause type has less than min_pauses pauses or if less than min_suggested_share of the replicates give a suggestion)
+def get_threshold_confidence_interval(counts,
+                                      labels,
+                                      replicates,
+                                      confidence,
+                                      seed=0,
+                                      method="histogram",
+                                      min_pauses=constants.stt_suggestion_confidence_min_pauses,
+                                      min_suggested_share=constants.stt_suggestion_confidence_min_suggested_share):
+    totals = counts.sum(axis=1)
+    if (totals == 0).any() or (totals < min_pauses).any():
+        return None
+    random_generator = np.random.default_rng(seed)
+    replicate_counts = np.stack([random_generator.multinomial(total, type_counts / total, size=replicates)
+                                 for total, type_counts in zip(totals.tolist(), counts)], axis=1)
+    if method == "kde":
+        thresholds = get_thresholds_from_kde(replicate_counts, labels)
+    else:
+        replicate_densities = replicate_counts / np.ones(counts.shape[1]) / totals[:, np.newaxis]
+        thresholds = get_thresholds_from_densities(replicate_densities, labels)
+    thresholds = thresholds[np.isfinite(thresholds)]
+    if len(thresholds) == 0 or len(thresholds) < min_suggested_share * replicates:
         return None
+    low, high = np.percentile(thresholds, [50 * (1 - confidence), 50 * (1 + confidence)])
+    return round(low, 2), round(high, 2)
+
+
+# --- HISTOGRAMS OF THE PAUSES OF EACH COMPONENT, BUILT ONCE FOR ALL THE STT SUGGESTIONS ---
+# for each component (and, in the last row, for all the components together) and each pause type
+# of constants.stt_suggestion_final_pause_types, bin_counts[c, j, k] is the number of pauses (in minutes) from
+# min_stt_allowed + k (included) to min_stt_allowed + k + 1 (excluded), and edge_counts[c, j, k] is the number of
+# pauses equal to min_stt_allowed + k. The histogram of any max_stt is then obtained from the first bins
+# (the last bin of plt.hist also includes its right edge), and its total from the cumulative counts.
+# The pauses longer than constants.max_stt_histogram minutes are only counted in pause_counts
+class PauseHistogram:
+    def __init__(self, type_of_session, components, bin_counts, edge_counts, pause_counts):
+        self.type_of_session = type_of_session
+        self.components = components
+        self.component_positions = {component: c for c, component in enumerate(components)}
+        self.bin_counts = bin_counts
+        self.edge_counts = edge_counts
+        self.cumulative_counts = np.cumsum(bin_counts, axis=2)
+        self.pause_counts = pause_counts
+
+    def get_component_position(self, specific_component):
+        # None stands for all the components; an unknown component has no pauses
+        if specific_component is None:
+            return len(self.components)
+        return self.component_positions.get(specific_component)
+
+    def get_pause_counts(self, specific_component):
+        # the number of pauses of each pause type (of any length), as the lengths of get_classified_pause_length_list
+        c = self.get_component_position(specific_component)
+        if c is None:
+            return np.zeros(self.pause_counts.shape[1], dtype=np.int64)
+        return self.pause_counts[c]
+
+    def get_all_densities(self, max_stt):
+        # the same densities as get_pause_histogram of the classified pauses with the bins of get_recommended_threshold,
+        # for each component (and, in the last position, for all the components)
+        bins_count = int(max_stt) - constants.min_stt_allowed
+        if bins_count > self.bin_counts.shape[2]:
+            raise ValueError("The pause histogram only goes up to " + str(constants.max_stt_histogram) + " minutes")
+        counts = self.bin_counts[:, :, :bins_count].copy()
+        counts[:, :, -1] += self.edge_counts[:, :, bins_count]
+        totals = self.cumulative_counts[:, :, bins_count - 1] + self.edge_counts[:, :, bins_count]
+        with np.errstate(divide="ignore", invalid="ignore"):
+            return counts / np.ones(bins_count) / totals[:, :, np.newaxis]
+
+    def get_densities(self, specific_component, max_stt):
+        c = self.get_component_position(specific_component)
+        if c is None:
+            # no pauses: no density (as in numpy.histogram)
+            return np.full((self.bin_counts.shape[1], int(max_stt) - constants.min_stt_allowed), np.nan)
+        return self.get_all_densities(max_stt)[c]
+
+    def get_all_kde_grid_counts(self, max_stt):
+        # the same counts as get_kde_grid_counts of the classified pauses, for each component
+        # (and, in the last position, for all the components): the pauses at the grid points are the edge counts,
+        # the ones between two grid points are the rest of the bin counts
+        bins_count = int(max_stt) - constants.min_stt_allowed
+        if bins_count > self.bin_counts.shape[2]:
+            raise ValueError("The pause histogram only goes up to " + str(constants.max_stt_histogram) + " minutes")
+        grid_counts = np.zeros(self.bin_counts.shape[:2] + (2 * bins_count + 1,), dtype=np.int64)
+        grid_counts[:, :, 0::2] = self.edge_counts[:, :, :bins_count + 1]
+        grid_counts[:, :, 1::2] = self.bin_counts[:, :, :bins_count] - self.edge_counts[:, :, :bins_count]
+        return grid_counts
+
+    def get_recommended_threshold(self, specific_component, max_stt, method="histogram"):
+        labels = constants.stt_suggestion_final_pause_types[self.type_of_session]
+        if method == "kde":
+            c = self.get_component_position(specific_component)
+            if c is None:
+                return None
+            threshold = get_thresholds_from_kde(self.get_all_kde_grid_counts(max_stt)[c:c + 1], labels)[0]
+            return None if np.isnan(threshold) else threshold
+        elif method != "histogram":
+            raise ValueError("Unknown STT suggestion method: " + str(method))
+        return get_threshold_from_densities(self.get_densities(specific_component, max_stt), labels)
+
+    def get_threshold_confidence_interval(self,
+                                          specific_component,
+                                          max_stt,
+                                          replicates=constants.stt_suggestion_bootstrap_replicates,
+                                          confidence=constants.stt_suggestion_confidence,
+                                          seed=0,
+                                          method="histogram"):
+        c = self.get_component_position(specific_component)
+        if c is None:
+            return None
+        if method == "kde":
+            counts = self.get_all_kde_grid_counts(max_stt)[c]
+        else:
+            bins_count = int(max_stt) - constants.min_stt_allowed
+            counts = self.bin_counts[c, :, :bins_count].copy()
+            counts[:, -1] += self.edge_counts[c, :, bins_count]
+        return get_threshold_confidence_interval(counts,
+                                                 constants.stt_suggestion_final_pause_types[self.type_of_session],
+                                                 replicates,
+                                                 confidence,
+                                                 seed,
+                                                 method)
+
+    def get_recommended_thresholds(self, max_stt, method="histogram"):
+        # the suggestions of all the components (and, in the last position, of all the components together)
+        labels = constants.stt_suggestion_final_pause_types[self.type_of_session]
+        if method == "kde":
+            return get_thresholds_from_kde(self.get_all_kde_grid_counts(max_stt), labels)
+        return get_thresholds_from_densities(self.get_all_densities(max_stt), labels)
+
+    def to_dict(self):
+        # JSON-serializable form (only the bins with pauses are kept)
+        bin_ids = np.flatnonzero(self.bin_counts)
+        edge_ids = np.flatnonzero(self.edge_counts)
+        return {"type_of_session": self.type_of_session,
+                "components": list(self.components),
+                "shape": list(self.bin_counts.shape),
+                "bin_ids": bin_ids.tolist(),
+                "bin_counts": self.bin_counts.ravel()[bin_ids].tolist(),
+                "edge_ids": edge_ids.tolist(),
+                "edge_counts": self.edge_counts.ravel()[edge_ids].tolist(),
+                "pause_counts": self.pause_counts.tolist()}
+
+    @staticmethod
+    def from_dict(data):
+        shape = tuple(data["shape"])
+        bin_counts = np.zeros(int(np.prod(shape)), dtype=np.int64)
+        bin_counts[data["bin_ids"]] = data["bin_counts"]
+        edge_counts = np.zeros(shape[0] * shape[1] * (shape[2] + 1), dtype=np.int64)
+        edge_counts[data["edge_ids"]] = data["edge_counts"]
+        return PauseHistogram(data["type_of_session"],
+                              data["components"],
+                              bin_counts.reshape(shape),
+                              edge_counts.reshape((shape[0], shape[1], shape[2] + 1)),
+                              np.array(data["pause_counts"], dtype=np.int64).reshape((shape[0], shape[1])))
+
+
+# --- FIXED CELLS OF THE PAUSE LENGTHS (MINUTES) THE PAUSE HISTOGRAMS ARE BUILT FROM ---
+# a pause equal to min_stt_allowed + k has the cell 2k (it is counted in the k-th bin and edge), a pause
+# from min_stt_allowed + k to min_stt_allowed + k + 1 (both excluded) has the cell 2k + 1 (it is only counted
+# in the k-th bin), and the pauses out of the histograms have the last cell (they are only counted in pause_counts)
+pause_cells_count = 2 * (constants.max_stt_histogram - constants.min_stt_allowed) + 3
+
+
+def get_pause_cells(lengths):
+    is_in_bins = (lengths >= constants.min_stt_allowed) & (lengths <= constants.max_stt_histogram)
+    shifted_lengths = np.where(is_in_bins, lengths - constants.min_stt_allowed, 0)
+    bin_ids = np.floor(shifted_lengths)
+    cells = 2 * bin_ids.astype(np.int64) + (shifted_lengths != bin_ids)
+    return np.where(is_in_bins, cells, pause_cells_count - 1)
+
+
+# --- POSITION OF EACH PAUSE OF THE TABLE IN THE (COMPONENT, FINAL PAUSE TYPE, CELL) COUNTS ---
+# the pauses without component have the component position components_count;
+# -1 for the pauses that are not considered by the STT suggestion (see get_classified_pause_length_list)
+def get_pause_keys(pause_table, type_of_session, component_codes, components_count):
+    types_count = len(constants.stt_suggestion_final_pause_types[type_of_session])
+    pause_types = get_final_pause_types(pause_table, type_of_session)
+    lengths = pause_table["Inactivity"].to_numpy(dtype=float) / 60.0
+    component_positions = np.where(component_codes == -1, components_count, component_codes)
+    keys = (component_positions * types_count + pause_types) * pause_cells_count + get_pause_cells(lengths)
+    return np.where((pause_types != -1) & (lengths != 0), keys, -1)
+
+
+# --- PAUSE HISTOGRAM FROM THE COUNTS OF THE PAUSES IN EACH (COMPONENT, FINAL PAUSE TYPE, CELL) ---
+# the last row of cell_counts has the pauses without component
+def get_pause_histogram_from_cells(type_of_session, components, cell_counts):
+    # each pause is counted for its component and (in the last row) for all the components
+    # (the pauses without component are only counted for all the components)
+    cell_counts = np.concatenate((cell_counts[:-1], cell_counts.sum(axis=0)[np.newaxis]))
+    bins_count = constants.max_stt_histogram - constants.min_stt_allowed
+    # the pauses equal to max_stt_histogram are only counted as edge counts
+    return PauseHistogram(type_of_session,
+                          components,
+                          cell_counts[:, :, 0:2 * bins_count:2] + cell_counts[:, :, 1:2 * bins_count:2],
+                          cell_counts[:, :, 0:2 * bins_count + 1:2].copy(),
+                          cell_counts.sum(axis=2))
+
+
+# --- BUILD THE PAUSE HISTOGRAMS OF THE PAUSE TABLE (OR OF THE LIST OF PAUSES RETURNED BY get_pause_analysis) ---
+def get_pause_histogram_index(pause_analysis, type_of_session):
+    types_count = len(constants.stt_suggestion_final_pause_types[type_of_session])
+    pause_table = get_pause_table_from_list(pause_analysis)
+    # only the components that end at least one pause have a histogram
+    component = pause_table["Component"].cat.remove_unused_categories()
+    component_codes = component.cat.codes.to_numpy().astype(np.int64)
+    components = np.asarray(component.cat.categories, dtype=object).tolist()
+    keys = get_pause_keys(pause_table, type_of_session, component_codes, len(components))
+    cell_counts = np.bincount(keys[keys != -1], minlength=(len(components) + 1) * types_count * pause_cells_count)
+    return get_pause_histogram_from_cells(type_of_session,
+                                          components,
+                                          cell_counts.reshape((len(components) + 1, types_count, pause_cells_count)))
+
+
+# --- LOCAL MIDNIGHTS FROM THE DAY OF THE FIRST LOG TO THE DAY AFTER THE LAST ONE ---
+# (the same timestamps as the limits of the observation range)
+def get_day_bounds(unix_time):
+    if len(unix_time) == 0:
+        return np.zeros(1, dtype=np.int64)
+    first_day = datetime.fromtimestamp(unix_time.min()).date()
+    last_day = datetime.fromtimestamp(unix_time.max()).date()
+    days = [first_day + timedelta(days=k) for k in range((last_day - first_day).days + 2)]
+    return np.array([int(datetime.timestamp(datetime.combine(day, datetime.min.time()))) for day in days],
+                    dtype=np.int64)
+
+
+# --- PAUSE HISTOGRAMS OF EVERY DAY, MERGED INTO THE PAUSE HISTOGRAM OF ANY OBSERVATION RANGE ---
+# The interruption rules look at most two logs ahead, and the filters and the cleaning only look at the logs
+# of the session, so a session of all the logs is also a session of the logs of an observation range (with the same
+# pause) if it starts in the range and its last log and the two following ones occur before the end of the range.
+# The other pauses of the range are re-derived at its boundaries: the session that started before the range
+# is cut at the beginning of the range, and the logs from the first session whose following logs occur after
+# the range are divided again. The pauses of the sessions that start and end (with the two following logs)
+# in the same day are kept as daily counts of the cells of the pause histograms, so the histogram of a range of days
+# is a sum of daily counts; the few pauses over more days are kept one by one
+class DailyPauseHistograms:
+    def __init__(self, chosen_df, specific_moodle_course, type_of_session, workers=1):
+        self.specific_moodle_course = specific_moodle_course
+        self.type_of_session = type_of_session
+        self.student_index = get_student_index(chosen_df)
+        # the sessions before filtering and cleaning (the rows of a session are the ones the rules looked at)
+        self.session_result = divide_logs_into_sessions_columnar(self.student_index,
+                                                                 type_of_session,
+                                                                 authentication_flag=False,
+                                                                 stt_flag=True,
+                                                                 outlier_detection_switch=True,
+                                                                 general_stt=0,
+                                                                 active_component_stt_dict={},
+                                                                 workers=workers)
+        self.components = np.asarray(self.session_result.components, dtype=object).tolist()
+        # the keys of the cells of the pause histograms, followed by the keys of the components (and of no component)
+        self.cells_count = (len(self.components) + 1) \
+            * len(constants.stt_suggestion_final_pause_types[type_of_session]) * pause_cells_count
+        self.keys_count = self.cells_count + len(self.components) + 1
+        unix_time = self.student_index.df["Unix_Time"].to_numpy(dtype=float)
+        self.day_bounds = get_day_bounds(unix_time)
+
+        # the pauses of the sessions of all the logs, with the time of the first log of the session before cleaning
+        # and the time of the last log it depends on
+        pause_result = self.get_pause_result(self.session_result)
+        keys = self.get_pause_keys(pause_result)
+        session_ids = np.searchsorted(self.session_result.ends, pause_result.starts, side="right")
+        last_rows = self.student_index.range_ends[self.session_result.student_codes[session_ids]] - 1
+        start_times = unix_time[self.session_result.starts[session_ids]]
+        depend_times = unix_time[np.minimum(self.session_result.ends[session_ids] + 1, last_rows)]
+        # (each pause has two keys: its cell and its component)
+        start_times = np.tile(start_times, 2)
+        depend_times = np.tile(depend_times, 2)
+        start_days = np.searchsorted(self.day_bounds, start_times, side="right") - 1
+        is_daily = np.searchsorted(self.day_bounds, depend_times, side="right") - 1 == start_days
+        # daily counts: the counts of the day d are daily_counts[daily_offsets[d]:daily_offsets[d + 1]],
+        # for the positions daily_keys (in the same slice)
+        is_counted = is_daily & (keys != -1)
+        day_keys, self.daily_counts = np.unique(start_days[is_counted] * self.keys_count + keys[is_counted],
+                                                return_counts=True)
+        self.daily_keys = day_keys % self.keys_count
+        self.daily_offsets = np.searchsorted(day_keys // self.keys_count, np.arange(len(self.day_bounds)))
+        is_kept = ~is_daily & (keys != -1)
+        self.other_keys = keys[is_kept]
+        self.other_start_times = start_times[is_kept]
+        self.other_depend_times = depend_times[is_kept]
+
+    def get_pause_result(self, session_result):
+        return select_and_clean_sessions(session_result,
+                                         self.specific_moodle_course,
+                                         self.type_of_session,
+                                         del_attendance_session_flag=False)
+
+    def get_pause_keys(self, pause_result):
+        # the keys of the cells of the pauses (-1 for the pauses out of the histograms), followed by the keys of their
+        # components: every pause of a component is counted, so the components that end a pause in the range are
+        # kept even if none of their pauses is in the histograms (as in get_pause_histogram_index)
+        component_codes = pause_result.component_codes
+        component_positions = np.where(component_codes == -1, len(self.components), component_codes)
+        return np.concatenate((get_pause_keys(pause_result.get_reason_to_end_table(),
+                                              self.type_of_session,
+                                              component_codes,
+                                              len(self.components)),
+                               self.cells_count + component_positions))
+
+    def get_boundary_pause_keys(self, start_time, end_time):
+        student_index = self.student_index
+        session_result = self.session_result
+        # the logs of each student in the range are the rows from range_starts to range_ends
+        student_codes = np.arange(len(student_index.students))
+        range_starts, range_ends = student_index.get_time_range(start_time, end_time)
+        is_in_range = range_starts < range_ends
+        student_codes = student_codes[is_in_range]
+        range_starts = range_starts[is_in_range]
+        range_ends = range_ends[is_in_range]
+        # the logs are divided again from the first session whose last log is one of the last two logs in the range
+        # (or its last log is after the range), if the student has logs after the range
+        last_sessions = np.searchsorted(session_result.ends, range_ends - 1)
+        divided_starts = np.where(range_ends < student_index.range_ends[student_codes],
+                                  np.maximum(session_result.starts[last_sessions], range_starts),
+                                  range_ends)
+        # the session of the first log of the range is cut if it started before the range
+        # (and it is not divided again)
+        first_sessions = np.searchsorted(session_result.ends, range_starts, side="right")
+        is_cut = (session_result.starts[first_sessions] < range_starts) \
+            & (session_result.ends[first_sessions] <= divided_starts)
+        cut_sessions = first_sessions[is_cut]
+
+        # (the cut sessions are ranges of the rows of the dataframe, as the sessions of all the logs)
+        cut_result = self.get_pause_result(SessionResult(student_index.df,
+                                                         range_starts[is_cut],
+                                                         session_result.ends[cut_sessions],
+                                                         session_result.student_codes[cut_sessions],
+                                                         session_result.students,
+                                                         session_result.reason_codes[cut_sessions],
+                                                         session_result.component_codes[cut_sessions],
+                                                         session_result.components,
+                                                         session_result.inactivity_periods[cut_sessions],
+                                                         student_index.category_codes))
+        divided_starts_of_students = np.zeros(len(student_index.students), dtype=np.int64)
+        divided_ends_of_students = np.zeros(len(student_index.students), dtype=np.int64)
+        divided_starts_of_students[student_codes] = divided_starts
+        divided_ends_of_students[student_codes] = range_ends
+        divided_index = student_index.get_range_subset(divided_starts_of_students, divided_ends_of_students)
+        divided_result = self.get_pause_result(divide_logs_into_sessions_columnar(divided_index,
+                                                                                  self.type_of_session,
+                                                                                  authentication_flag=False,
+                                                                                  stt_flag=True,
+                                                                                  outlier_detection_switch=True,
+                                                                                  general_stt=0,
+                                                                                  active_component_stt_dict={}))
+        keys = np.concatenate([self.get_pause_keys(pause_result) for pause_result in (cut_result, divided_result)])
+        return keys[keys != -1]
+
+    def get_pause_histogram(self, start_time, end_time):
+        # start_time and end_time are local midnights, as the limits of the observation range (end_time excluded)
+        for limit in (start_time, end_time):
+            if self.day_bounds[0] < limit < self.day_bounds[-1] and limit not in self.day_bounds:
+                raise ValueError("The limits of the daily pause histograms have to be local midnights")
+        # the days that are entirely in the range
+        first_day, end_day = np.minimum(np.searchsorted(self.day_bounds, [start_time, end_time]),
+                                        len(self.day_bounds) - 1)
+        daily_slice = slice(self.daily_offsets[first_day], self.daily_offsets[max(first_day, end_day)])
+        cell_counts = np.bincount(self.daily_keys[daily_slice],
+                                  weights=self.daily_counts[daily_slice],
+                                  minlength=self.keys_count)
+        is_other_in_range = (self.other_start_times >= start_time) & (self.other_depend_times < end_time)
+        cell_counts += np.bincount(self.other_keys[is_other_in_range], minlength=self.keys_count)
+        cell_counts += np.bincount(self.get_boundary_pause_keys(start_time, end_time), minlength=self.keys_count)
+        # only the components that end at least one pause in the range have a histogram
+        has_pauses = cell_counts[self.cells_count:-1] != 0
+        cell_counts = cell_counts[:self.cells_count].astype(np.int64).reshape((len(self.components) + 1,
+                                                                               -1,
+                                                                               pause_cells_count))
+        return get_pause_histogram_from_cells(self.type_of_session,
+                                              [component for component, has_component_pauses
+                                               in zip(self.components, has_pauses.tolist()) if has_component_pauses],
+                                              cell_counts[np.append(has_pauses, True)])
+
+
+# daily pause histograms of the dataframes that have already been analysed
+daily_pause_histograms_cache = {}
+
+
+# --- GET (BUILDING THEM ONLY THE FIRST TIME) THE DAILY PAUSE HISTOGRAMS OF THE DATAFRAME ---
+def get_daily_pause_histograms(chosen_df, specific_moodle_course, type_of_session, workers=1):
+    key = (id(chosen_df), frozenset(specific_moodle_course), type_of_session)
+    if key in daily_pause_histograms_cache:
+        df_reference, daily_pause_histograms = daily_pause_histograms_cache[key]
+        if df_reference() is chosen_df:
+            return daily_pause_histograms
+    daily_pause_histograms = DailyPauseHistograms(chosen_df, specific_moodle_course, type_of_session, workers)
+    # the histograms are forgotten as soon as their dataframe is deleted
+    daily_pause_histograms_cache[key] = (weakref.ref(chosen_df, lambda _: daily_pause_histograms_cache.pop(key, None)),
+                                         daily_pause_histograms)
+    return daily_pause_histograms
+
+
+# --- STT SUGGESTIONS FOR EVERY COMPONENT, GRANULARITY AND TYPE OF SESSION ---
+# dict_of_df has a dataframe (or student index) of logs for each granularity; the pauses are extracted once per
+# granularity and type of session. Returns a table with a row per granularity, type of session and component
+# (None stands for the general suggestion), with the number of pauses of each pause type
+# and the STT suggestion (nan if there are not enough examples)
+def get_session_timeout_threshold_suggestions(dict_of_df,
+                                              specific_moodle_course,
+                                              max_stt=constants.max_stt_allowed,
+                                              workers=1,
+                                              method="histogram"):
+    suggestion_tables = []
+    for granularity, chosen_df in dict_of_df.items():
+        for type_of_session, final_pause_types in constants.stt_suggestion_final_pause_types.items():
+            pause_table = get_pause_table(chosen_df, specific_moodle_course, type_of_session, workers)
+            pause_histogram = get_pause_histogram_index(pause_table, type_of_session)
+            index_real_pause = 0 if final_pause_types[0] in constants.stt_suggestion_real_pause else 1
+            suggestion_tables.append(pd.DataFrame({
+                "Granularity": granularity,
+                "Type of session": type_of_session,
+                "Component": list(pause_histogram.components) + [None],
+                "Real pauses": pause_histogram.pause_counts[:, index_real_pause],
+                "Continuation pauses": pause_histogram.pause_counts[:, 1 - index_real_pause],
+                "STT suggestion": pause_histogram.get_recommended_thresholds(max_stt, method)}))
+    return pd.concat(suggestion_tables, ignore_index=True)
+
+
+# --- COMPONENT THRESHOLDS (active_component_stt_dict) FROM THE TABLE OF STT SUGGESTIONS ---
+def get_suggested_component_stt_dict(suggestions, granularity, type_of_session):
+    suggestions = suggestions[(suggestions["Granularity"] == granularity)
+                              & (suggestions["Type of session"] == type_of_session)
+                              & suggestions["Component"].notna()
+                              & suggestions["STT suggestion"].notna()]
+    return dict(zip(suggestions["Component"].tolist(), suggestions["STT suggestion"].tolist()))
 
 
 def get_session_timeout_threshold_suggestion(chosen_df,
                                              specific_moodle_course,
                                              type_of_session,
                                              specific_component):
-    _, pause_analysis = get_session_logs(chosen_df,
-                                         specific_moodle_course,
-                                         type_of_session,
-                                         authentication_flag=False,
-                                         stt_flag=True,
-                                         del_attendance_session_flag=False,
-                                         outlier_detection_switch=True,
-                                         general_stt=0,
-                                         active_component_stt_dict={})
-    preprocessed_analysis = get_classified_pause_length_list(pause_analysis,
+    pause_table = get_pause_table(chosen_df, specific_moodle_course, type_of_session)
+    preprocessed_analysis = get_classified_pause_length_list(pause_table,
                                                              type_of_session,
                                                              specific_component)
     error_message = "There is not enough examples of this behaviour to make an STT recommendation"
@@ -0,0 +1,334 @@
+import json
+import os
+import shutil
+import numpy as np
+import pandas as pd
+
+import constants
+
+# ----------------------------------------------------------------------
+# --- FUNCTIONS THAT ARE USED TO STORE AND LOAD THE DATASETS OF LOGS ---
+# ----------------------------------------------------------------------
+
+
+# version of the layout of the columnar cache (a cache written with another version is written again)
+data_cache_version = 5
+
+# --- SCHEMA OF THE DATASETS OF LOGS ---
+# the text columns are categorical and the timestamps use a compact numeric type (see get_typed_column); the durations
+# are kept as float64, since the pauses are compared with the STT (a rounded duration can move a pause to the other
+# side of the STT and change the sessions); the columns that are not in the schema are kept with the types they are
+# read with, except for the dropped ones (the index written by pandas when the CSV-files were exported)
+data_schema = {"Student ID": "category",
+               "Course_Area": "category",
+               "Component": "category",
+               "Event_Name": "category",
+               "Unix_Time": "int32",
+               "Estimated_Duration": "float64",
+               "Duration": "float64"}
+dropped_columns = ["Unnamed: 0"]
+
+
+# --- COLUMN CONVERTED INTO THE TYPE OF THE SCHEMA ---
+# a compact integer type is only used if it keeps all the values of the column, and a compact float type if it keeps
+# them up to its rounding (a relative error of its machine epsilon: about 7 significant digits for float32);
+# otherwise the column is kept as it is. The integer columns of a float type (the durations exported as integer
+# seconds) stay integer, with the size of the float type
+def get_typed_column(values, dtype):
+    if dtype == "category":
+        return values.astype("category")
+    compact_dtype = np.dtype(dtype)
+    if compact_dtype.kind == "f" and values.dtype.kind in "iu":
+        compact_dtype = np.dtype("int" + str(8 * compact_dtype.itemsize))
+    try:
+        original_values = values.to_numpy()
+        with np.errstate(over="ignore", under="ignore"):
+            compact_values = original_values.astype(compact_dtype)
+    except (TypeError, ValueError):
+        return values
+    # (an empty column, as the ones of a query without rows, has no values to keep)
+    if len(original_values) == 0:
+        is_kept = True
+    elif compact_dtype.kind == "f":
+        with np.errstate(over="ignore", under="ignore"):
+            is_kept = np.allclose(compact_values.astype(original_values.dtype), original_values,
+                                  rtol=np.finfo(compact_dtype).eps, atol=0, equal_nan=True)
+    else:
+        is_kept = np.array_equal(compact_values.astype(original_values.dtype), original_values)
+    if not is_kept:
+        return values
+    return pd.Series(compact_values, index=values.index, name=values.name)
+
+
+# --- DATAFRAME CONVERTED INTO THE SCHEMA OF THE DATASETS OF LOGS ---
+def get_typed_dataset(df):
+    df = df.drop(columns=[column for column in dropped_columns if column in df.columns])
+    return pd.DataFrame({column: get_typed_column(df[column], data_schema[column]) if column in data_schema
+                         else df[column] for column in df.columns})
+
+
+# --- READ THE CSV FILE DIRECTLY WITH THE SCHEMA OF THE DATASETS OF LOGS ---
+# (the text columns are parsed straight into categories, and the dropped columns are not parsed at all)
+def read_typed_csv(csv_path):
+    df = pd.read_csv(csv_path,
+                     usecols=lambda column: column not in dropped_columns,
+                     dtype={column: dtype for column, dtype in data_schema.items() if dtype == "category"})
+    return get_typed_dataset(df)
+
+
+# columns of the datasets of logs with task granularity
+task_columns = ["Student ID", "Course_Area", "Component", "Unix_Time", "Estimated_Duration", "Duration"]
+
+
+# --- LOGS WITH TASK GRANULARITY DERIVED FROM THE LOGS WITH ACTIVITY GRANULARITY ---
+# the consecutive logs of a student (in the order of the dataset) on the same component of the same course/area
+# are one task: it keeps the first log's timestamp, and the sum of the durations of its logs.
+# The logs are grouped in a single pass over the columns (a new task starts at every change of student,
+# course/area or component). For incremental conversion, task_df has the tasks of the logs converted before
+# activity_df: the first new task of a student continues the student's last task if it is on the same component
+# of the same course/area. Returns all the tasks, with the schema of the datasets of logs
+def get_task_granularity_dataset(activity_df, task_df=None):
+    new_task_df = get_task_rows(activity_df)
+    if task_df is not None and len(task_df) != 0:
+        task_df = task_df[new_task_df.columns].reset_index(drop=True)
+        for column in task_columns[-2:]:
+            task_df[column] = get_full_precision_durations(task_df[column])
+        # the last task of each student converted before, and the first new task of each student
+        last_tasks = np.flatnonzero(~task_df["Student ID"].duplicated(keep="last").to_numpy())
+        first_new_tasks = np.flatnonzero(~new_task_df["Student ID"].duplicated(keep="first").to_numpy())
+        last_task_keys = {column: task_df[column].to_numpy(dtype=object)[last_tasks] for column in task_columns[:3]}
+        first_new_task_keys = {column: new_task_df[column].to_numpy(dtype=object)[first_new_tasks]
+                               for column in task_columns[:3]}
+        last_task_keys["Last task"] = last_tasks
+        first_new_task_keys["First new task"] = first_new_tasks
+        continued_tasks = pd.merge(pd.DataFrame(last_task_keys), pd.DataFrame(first_new_task_keys),
+                                   on=task_columns[:3])
+        for column in task_columns[-2:]:
+            durations = task_df[column].to_numpy(copy=True)
+            durations[continued_tasks["Last task"].to_numpy()] += \
+                new_task_df[column].to_numpy()[continued_tasks["First new task"].to_numpy()]
+            task_df[column] = durations
+        new_task_df = new_task_df.drop(index=continued_tasks["First new task"].to_numpy())
+        # the new tasks of each student follow the tasks converted before
+        new_task_df = pd.concat([task_df.astype({column: object for column in task_columns[:3]}),
+                                 new_task_df.astype({column: object for column in task_columns[:3]})],
+                                ignore_index=True)
+        order = np.argsort(pd.factorize(new_task_df["Student ID"])[0], kind="stable")
+        new_task_df = new_task_df.take(order).reset_index(drop=True)
+    return get_typed_dataset(new_task_df)
+
+
+# --- TASKS OF THE LOGS WITH ACTIVITY GRANULARITY (WITH THE DURATIONS IN FULL PRECISION) ---
+def get_task_rows(activity_df):
+    # the logs of each student (in the order of their first appearance) keep their order in the dataset
+    order = np.argsort(pd.factorize(activity_df["Student ID"])[0], kind="stable")
+    activity_df = activity_df.take(order)
+    is_first_log = np.zeros(len(activity_df), dtype=bool)
+    is_first_log[:1] = True
+    for column in task_columns[:3]:
+        codes = pd.factorize(activity_df[column])[0]
+        is_first_log[1:] |= codes[1:] != codes[:-1]
+    first_logs = np.flatnonzero(is_first_log)
+    task_df = activity_df[task_columns[:4]].iloc[first_logs].reset_index(drop=True)
+    for column in task_columns[-2:]:
+        durations = get_full_precision_durations(activity_df[column])
+        task_df[column] = np.add.reduceat(durations, first_logs) if len(first_logs) != 0 else durations
+    return task_df
+
+
+# --- DURATIONS WITH THE FULL PRECISION OF THEIR TYPE (THE SUMS ARE COMPACTED AGAIN BY THE SCHEMA) ---
+def get_full_precision_durations(values):
+    values = values.to_numpy()
+    return values.astype(np.float64 if values.dtype.kind == "f" else np.int64)
+
+
+# --- CONVERT THE CSV FILE OF LOGS WITH ACTIVITY GRANULARITY INTO A CSV FILE OF LOGS WITH TASK GRANULARITY ---
+# the CSV file is written with the columns that the Visual Tool loads (see constants.file_names);
+# with chunk_size, the activity logs are read and converted chunk_size rows at a time: only the last task
+# of each student is kept from one chunk to the next (the first task of the student in the next chunk may continue
+# it), and the other tasks are appended to the CSV file as soon as their chunk is converted. The tasks are then
+# written in the order they are finished (the Visual Tool sorts them by student and time), with the durations
+# in full precision. Returns the number of tasks
+def write_task_granularity_csv(activity_csv_path, task_csv_path, chunk_size=None):
+    if chunk_size is None:
+        task_df = get_task_granularity_dataset(read_typed_csv(activity_csv_path))
+        task_df.to_csv(task_csv_path)
+        return len(task_df)
+    tasks_count = 0
+    # the last task of each student: (course/area, component, timestamp, estimated duration, duration)
+    last_tasks = {}
+
+    def write_tasks(task_df):
+        task_df.index = pd.RangeIndex(tasks_count, tasks_count + len(task_df))
+        task_df.to_csv(task_file, header=False)
+        return tasks_count + len(task_df)
+
+    with open(task_csv_path, "w", newline="") as task_file:
+        pd.DataFrame(columns=task_columns).to_csv(task_file)
+        for chunk in pd.read_csv(activity_csv_path,
+                                 chunksize=chunk_size,
+                                 usecols=lambda column: column not in dropped_columns):
+            task_df = get_task_rows(chunk)
+            students = task_df["Student ID"].to_numpy(dtype=object)
+            course_areas = task_df["Course_Area"].to_numpy(dtype=object)
+            components = task_df["Component"].to_numpy(dtype=object)
+            columns = [task_df[column].to_numpy(copy=True) for column in task_columns[3:]]
+            # the first task of each student in the chunk continues the student's last task if it is on the same
+            # component of the same course/area (it keeps the timestamp of the last task and adds its durations);
+            # otherwise the last task is finished
+            finished_tasks = []
+            for row in np.flatnonzero(~task_df["Student ID"].duplicated(keep="first").to_numpy()).tolist():
+                last_task = last_tasks.pop(students[row], None)
+                if last_task is None:
+                    continue
+                if last_task[0] == course_areas[row] and last_task[1] == components[row]:
+                    columns[0][row] = last_task[2]
+                    columns[1][row] += last_task[3]
+                    columns[2][row] += last_task[4]
+                else:
+                    finished_tasks.append((students[row],) + last_task)
+            for column, values in zip(task_columns[3:], columns):
+                task_df[column] = values
+            tasks_count = write_tasks(pd.DataFrame(finished_tasks, columns=task_columns))
+            # the last task of each student in the chunk is kept for the next chunks
+            is_last_task = ~task_df["Student ID"].duplicated(keep="last").to_numpy()
+            tasks_count = write_tasks(task_df[~is_last_task])
+            for row in np.flatnonzero(is_last_task).tolist():
+                last_tasks[students[row]] = (course_areas[row], components[row]) \
+                    + tuple(values[row] for values in columns)
+        tasks_count = write_tasks(pd.DataFrame([(student,) + last_task for student, last_task in last_tasks.items()],
+                                               columns=task_columns))
+    return tasks_count
+
+
+# --- MEMORY (BYTES) USED BY EACH COLUMN OF THE DATASET BEFORE AND AFTER THE CONVERSION INTO THE SCHEMA ---
+def get_memory_report(df_before, df_after):
+    report = pd.DataFrame({"Type before": df_before.dtypes.astype(str),
+                           "Bytes before": df_before.memory_usage(index=False, deep=True),
+                           "Type after": df_after.dtypes.astype(str),
+                           "Bytes after": df_after.memory_usage(index=False, deep=True)},
+                          index=df_before.columns)
+    # the dropped columns do not use memory after the conversion
+    report = report.fillna({"Type after": "dropped", "Bytes after": 0})
+    report["Bytes after"] = report["Bytes after"].astype(np.int64)
+    report.loc["Total"] = ["", report["Bytes before"].sum(), "", report["Bytes after"].sum()]
+    return report
+
+
+# --- LOCATION OF THE COLUMNAR CACHE OF THE CSV FILE (A DIRECTORY NEXT TO IT) ---
+def get_data_cache_path(csv_path):
+    return csv_path + constants.data_cache_suffix
+
+
+# --- SIZE AND MODIFICATION TIME OF THE CSV FILE (THE CACHE IS STALE IF THEY CHANGE) ---
+def get_csv_signature(csv_path):
+    csv_stat = os.stat(csv_path)
+    return {"size": csv_stat.st_size, "mtime_ns": csv_stat.st_mtime_ns}
+
+
+# --- WRITE THE DATAFRAME READ FROM THE CSV FILE AS A COLUMNAR CACHE ---
+# every column is stored as a .npy file, the categorical columns as integer codes (-1 for the missing values, with
+# the integer type pandas uses for their number of categories) with their categories in the metadata.
+# The rows are stored in the order of the student index (by student, in the order of their first appearance,
+# and by time, see functions_algorithm.StudentIndex), so the index of the loaded logs does not sort them again.
+# The cache is written in a temporary directory and renamed at the end,
+# so that the processes that load the dataset at the same time never see a half-written cache.
+# csv_signature is the signature of the CSV file when df was read (by default, the current one)
+def write_data_cache(df, csv_path, csv_signature=None):
+    if csv_signature is None:
+        csv_signature = get_csv_signature(csv_path)
+    order = np.lexsort((df["Unix_Time"].to_numpy(), pd.factorize(df["Student ID"])[0]))
+    df = df.take(order)
+    cache_path = get_data_cache_path(csv_path)
+    temporary_path = cache_path + ".tmp-" + str(os.getpid())
+    os.makedirs(temporary_path, exist_ok=True)
+    try:
+        columns = []
+        for position, column in enumerate(df.columns):
+            file_name = "column_" + str(position) + ".npy"
+            column_info = {"name": column, "file": file_name}
+            values = df[column]
+            if not pd.api.types.is_numeric_dtype(values):
+                values = values.astype("category")
+                column_info["categories"] = values.cat.categories.tolist()
+                values = values.cat.codes.to_numpy()
+            np.save(os.path.join(temporary_path, file_name), np.ascontiguousarray(values), allow_pickle=False)
+            columns.append(column_info)
+        metadata = {"version": data_cache_version,
+                    "csv": csv_signature,
+                    "rows": len(df),
+                    "columns": columns}
+        with open(os.path.join(temporary_path, "metadata.json"), "w") as metadata_file:
+            json.dump(metadata, metadata_file)
+        # the stale cache (if any) is replaced by the new one
+        shutil.rmtree(cache_path, ignore_errors=True)
+        os.rename(temporary_path, cache_path)
+    finally:
+        shutil.rmtree(temporary_path, ignore_errors=True)
+
+
+# --- READ THE COLUMNAR CACHE OF THE CSV FILE (None IF IT IS MISSING OR STALE) ---
+# the columns are memory-mapped and the dataframe is built on them without copying (the categorical columns
+# on their codes), so the pages of the cache are read when they are needed
+# and the processes that load the same dataset share them through the page cache of the system
+def read_data_cache(csv_path):
+    cache_path = get_data_cache_path(csv_path)
+    try:
+        with open(os.path.join(cache_path, "metadata.json")) as metadata_file:
+            metadata = json.load(metadata_file)
+        if metadata["version"] != data_cache_version or metadata["csv"] != get_csv_signature(csv_path):
+            return None
+        columns = {}
+        for column_info in metadata["columns"]:
+            values = np.load(os.path.join(cache_path, column_info["file"]), mmap_mode="r", allow_pickle=False)
+            if len(values) != metadata["rows"]:
+                return None
+            if "categories" in column_info:
+                # (the codes were checked when the cache was written)
+                values = pd.Categorical.from_codes(values, categories=column_info["categories"], validate=False)
+            columns[column_info["name"]] = values
+    except (OSError, ValueError, KeyError):
+        return None
+    return pd.DataFrame(columns, columns=[column_info["name"] for column_info in metadata["columns"]], copy=False)
+
+
+# --- LOAD THE DATASET OF THE CSV FILE WITH THE SCHEMA (FROM ITS COLUMNAR CACHE, WHEN IT IS UP TO DATE) ---
+# if the cache is missing or stale, the CSV file is read and the cache is written again, and the dataset is loaded
+# from the new cache (if it can not be written, for example in a read-only directory, the dataset is just read
+# from the CSV file)
+def load_dataset(csv_path, use_cache=constants.use_data_cache):
+    df = read_data_cache(csv_path) if use_cache else None
+    if df is None:
+        # the signature is taken before reading, so a CSV file modified in the meantime is not cached as up to date
+        csv_signature = get_csv_signature(csv_path)
+        df = read_typed_csv(csv_path)
+        if use_cache:
+            try:
+                write_data_cache(df, csv_path, csv_signature)
+            except OSError:
+                return df
+            cached_df = read_data_cache(csv_path)
+            if cached_df is not None:
+                df = cached_df
+    return df
+
+
+# --- CONVERT ALL THE FILES OF THE DATASET INTO THEIR COLUMNAR CACHES ---
+# returns the memory report of each file
+def convert_datasets(data_dir_path=constants.data_dir_path):
+    memory_reports = {}
+    for key, file_name in constants.file_names.items():
+        csv_path = data_dir_path + file_name
+        csv_signature = get_csv_signature(csv_path)
+        df = pd.read_csv(csv_path)
+        typed_df = get_typed_dataset(df)
+        write_data_cache(typed_df, csv_path, csv_signature)
+        memory_reports[key] = get_memory_report(df, typed_df)
+    return memory_reports
+
+
+if __name__ == "__main__":
+    for dataset, dataset_dir_path in constants.datasets.items():
+        for key, memory_report in convert_datasets(dataset_dir_path).items():
+            print(dataset, key)
+            print(memory_report.to_string())
@@ -0,0 +1,228 @@
+import sqlite3
+from contextlib import closing
+import numpy as np
+import pandas as pd
+
+import constants
+import functions_algorithm
+import functions_data
+
+# -----------------------------------------------------------------------------------------
+# --- FUNCTIONS THAT ARE USED TO STORE THE DATASETS OF LOGS IN A SQLITE FILE AND QUERY THEM ---
+# -----------------------------------------------------------------------------------------
+
+
+# indexes of the table of each granularity: the logs of a student in a time range are read in order from the first one,
+# and the students with logs of some courses and the components of a course/area are found with the other two
+database_indexes = {"student_time": ["Student ID", "Unix_Time"],
+                    "course_area": ["Course_Area"],
+                    "component": ["Component"]}
+
+
+# --- NAME OF A TABLE OR A COLUMN IN THE SQL QUERIES ---
+def quote(name):
+    return '"' + name.replace('"', '""') + '"'
+
+
+# --- OPEN THE SQLITE FILE IN READ-ONLY MODE (A MISSING FILE IS AN ERROR, NOT AN EMPTY DATABASE) ---
+def connect(database_path):
+    return sqlite3.connect("file:" + database_path + "?mode=ro", uri=True, check_same_thread=False)
+
+
+# --- NAME OF THE TABLE WITH THE STUDENTS OF THE GRANULARITY IN THE ORDER OF THEIR FIRST LOG IN THE CSV FILE ---
+def get_students_table(granularity):
+    return granularity + "_students"
+
+
+# --- WRITE THE CSV FILE OF LOGS AS THE TABLE OF THE GRANULARITY IN THE SQLITE FILE ---
+# the CSV file is read chunk_size rows at a time, so it does not need to fit in memory;
+# the table is replaced if it already exists, and it is indexed after all the rows have been inserted.
+# The students are also written (in the order of their first log, as in the student index of the CSV file)
+# in the students table, whose rowid is the position of the student
+def write_database_table(csv_path, database_path, granularity, chunk_size=constants.segmentation_chunk_size):
+    students_table = get_students_table(granularity)
+    with closing(sqlite3.connect(database_path)) as connection:
+        connection.execute("DROP TABLE IF EXISTS " + quote(granularity))
+        connection.execute("DROP TABLE IF EXISTS " + quote(students_table))
+        connection.execute("CREATE TABLE " + quote(students_table) + " (" + quote("Student ID") + " PRIMARY KEY)")
+        for chunk in pd.read_csv(csv_path,
+                                 chunksize=chunk_size,
+                                 usecols=lambda column: column not in functions_data.dropped_columns):
+            chunk.to_sql(granularity, connection, if_exists="append", index=False)
+            # (the students already written keep their position)
+            connection.executemany("INSERT OR IGNORE INTO " + quote(students_table) + " VALUES (?)",
+                                   [(student,) for student in chunk["Student ID"].unique().tolist()])
+        for index_name, columns in database_indexes.items():
+            connection.execute("CREATE INDEX " + quote(granularity + "_" + index_name) + " ON " + quote(granularity)
+                               + " (" + ", ".join(quote(column) for column in columns) + ")")
+        # the statistics of the indexes let SQLite choose the index of each query
+        connection.execute("ANALYZE")
+        connection.commit()
+
+
+# --- WRITE THE FILES OF THE DATASET IN ITS SQLITE FILE (A TABLE PER GRANULARITY) ---
+def convert_datasets_to_database(data_dir_path=constants.data_dir_path):
+    for granularity, file_name in constants.file_names.items():
+        write_database_table(data_dir_path + file_name, data_dir_path + constants.sqlite_file_name, granularity)
+
+
+# --- CONDITIONS (AND THEIR PARAMETERS) THAT SELECT THE LOGS OF THE OBSERVATION RANGE AND THE COURSE FILTER ---
+# the range goes from start_time (included) to end_time (excluded), None for no limit. The course filter keeps
+# the sessions with at least one log of the courses, and a student's sessions only depend on the student's logs,
+# so only the students with a log of the courses in the range are selected (with all their logs in the range)
+def get_filter_conditions(granularity, start_time, end_time, specific_moodle_course):
+    conditions = []
+    parameters = []
+    if start_time is not None:
+        conditions.append(quote("Unix_Time") + " >= ?")
+        parameters.append(int(start_time))
+    if end_time is not None:
+        conditions.append(quote("Unix_Time") + " < ?")
+        parameters.append(int(end_time))
+    if len(specific_moodle_course) != 0:
+        course_conditions = [quote("Course_Area") + " IN (" + ", ".join("?" * len(specific_moodle_course)) + ")"]
+        students_query = "SELECT " + quote("Student ID") + " FROM " + quote(granularity) \
+            + " WHERE " + " AND ".join(course_conditions + conditions)
+        # (the student of the log, not of the students table that the logs are joined to)
+        conditions.append(quote(granularity) + "." + quote("Student ID") + " IN (" + students_query + ")")
+        parameters = parameters + list(specific_moodle_course) + parameters
+    return conditions, parameters
+
+
+# --- QUERY OF THE LOGS OF THE OBSERVATION RANGE AND THE COURSE FILTER, SORTED BY STUDENT AND TIME ---
+# the students are in the order of the students table (the order of the student index of the CSV file, so the
+# sessions and the reasons to end are listed in the same order with both data backends): for each student of the
+# table, the student's logs are read in order from the (Student ID, Unix_Time) index
+def get_logs_query(granularity, start_time, end_time, specific_moodle_course):
+    conditions, parameters = get_filter_conditions(granularity, start_time, end_time, specific_moodle_course)
+    logs_table = quote(granularity)
+    students_table = quote(get_students_table(granularity))
+    query = "SELECT " + logs_table + ".* FROM " + students_table + " CROSS JOIN " + logs_table \
+            + " ON " + logs_table + "." + quote("Student ID") + " = " + students_table + "." + quote("Student ID")
+    if len(conditions) != 0:
+        query += " WHERE " + " AND ".join(conditions)
+    # (the logs with the same timestamp keep the order of the dataset, as in the student index)
+    return query + " ORDER BY " + students_table + ".rowid, " + logs_table + "." + quote("Unix_Time") + ", " \
+        + logs_table + ".rowid", parameters
+
+
+# --- LOGS OF THE OBSERVATION RANGE AND THE COURSE FILTER (WITH THE SCHEMA OF THE DATASETS OF LOGS) ---
+def read_logs(database_path, granularity, start_time=None, end_time=None, specific_moodle_course=()):
+    query, parameters = get_logs_query(granularity, start_time, end_time, specific_moodle_course)
+    with closing(connect(database_path)) as connection:
+        return functions_data.get_typed_dataset(pd.read_sql_query(query, connection, params=parameters))
+
+
+# student index of the last logs read for each (database, granularity), with the filters they were read with
+# (the callbacks of the same settings read the same logs)
+student_index_cache = {}
+
+
+# --- FORGET THE LOGS READ FROM THE DATABASE ---
+def clear_student_index_cache(database_path):
+    for key in [key for key in student_index_cache.keys() if key[0] == database_path]:
+        del student_index_cache[key]
+
+
+# --- MEMORY (BYTES) USED BY THE LOGS READ FROM THE DATABASE ---
+def get_student_index_cache_memory_usage(database_path):
+    return sum(int(student_index.df.memory_usage(deep=True).sum())
+               for key, (_, student_index) in student_index_cache.items() if key[0] == database_path)
+
+
+# --- STUDENT INDEX OF THE LOGS OF THE OBSERVATION RANGE AND THE COURSE FILTER ---
+# this is what the Visual Tool divides into sessions: all the logs of the range are read in memory at once,
+# so the range (not the whole table) has to fit in the memory of the worker. The logs of larger ranges can be
+# divided a few students at a time with iterate_session_results, that the Visual Tool does not use
+def get_student_index(database_path, granularity, start_time=None, end_time=None, specific_moodle_course=()):
+    key = (database_path, granularity)
+    filters = (start_time, end_time, frozenset(specific_moodle_course))
+    cached_filters, student_index = student_index_cache.get(key, (None, None))
+    if cached_filters != filters:
+        student_index = functions_algorithm.StudentIndex(read_logs(database_path,
+                                                                   granularity,
+                                                                   start_time,
+                                                                   end_time,
+                                                                   specific_moodle_course))
+        student_index_cache[key] = (filters, student_index)
+    return student_index
+
+
+# --- LOGS OF THE OBSERVATION RANGE AND THE COURSE FILTER, A FEW STUDENTS AT A TIME ---
+# the rows are read chunk_size at a time in the order of the index on (Student ID, Unix_Time), and each dataframe
+# returned has all the logs of its students (the rows of the last student of a chunk are kept for the next one)
+def iterate_student_logs(database_path,
+                         granularity,
+                         start_time=None,
+                         end_time=None,
+                         specific_moodle_course=(),
+                         chunk_size=constants.segmentation_chunk_size):
+    query, parameters = get_logs_query(granularity, start_time, end_time, specific_moodle_course)
+    open_logs = None
+    with closing(connect(database_path)) as connection:
+        for chunk in pd.read_sql_query(query, connection, params=parameters, chunksize=chunk_size):
+            if len(chunk) == 0:
+                continue
+            if open_logs is not None:
+                chunk = pd.concat([open_logs, chunk], ignore_index=True)
+            students = chunk["Student ID"].to_numpy()
+            other_students_logs = np.flatnonzero(students != students[-1])
+            last_student_start = int(other_students_logs[-1]) + 1 if len(other_students_logs) != 0 else 0
+            open_logs = chunk.iloc[last_student_start:]
+            if last_student_start != 0:
+                yield chunk.iloc[:last_student_start].reset_index(drop=True)
+    if open_logs is not None:
+        yield open_logs.reset_index(drop=True)
+
+
+# --- SESSIONS OF THE LOGS OF THE OBSERVATION RANGE, DIVIDED A FEW STUDENTS AT A TIME ---
+# the settings have the same meaning as the parameters of functions_algorithm.get_session_result();
+# yields a SessionResult for the logs of each group of students returned by iterate_student_logs
+def iterate_session_results(database_path,
+                            granularity,
+                            start_time,
+                            end_time,
+                            specific_moodle_course,
+                            type_of_session,
+                            authentication_flag,
+                            stt_flag,
+                            del_attendance_session_flag,
+                            outlier_detection_switch,
+                            general_stt,
+                            active_component_stt_dict,
+                            chunk_size=constants.segmentation_chunk_size):
+    for logs in iterate_student_logs(database_path,
+                                     granularity,
+                                     start_time,
+                                     end_time,
+                                     specific_moodle_course,
+                                     chunk_size):
+        yield functions_algorithm.get_session_result(functions_algorithm.StudentIndex(logs),
+                                                     specific_moodle_course,
+                                                     type_of_session,
+                                                     authentication_flag,
+                                                     stt_flag,
+                                                     del_attendance_session_flag,
+                                                     outlier_detection_switch,
+                                                     general_stt,
+                                                     active_component_stt_dict)
+
+
+# --- DIFFERENT COMPONENTS OF THE LOGS OF THE COURSES/AREAS ---
+def get_components(database_path, granularity, course_areas):
+    query = "SELECT DISTINCT " + quote("Component") + " FROM " + quote(granularity) \
+            + " WHERE " + quote("Course_Area") + " IN (" + ", ".join("?" * len(course_areas)) + ")"
+    with closing(connect(database_path)) as connection:
+        return [row[0] for row in connection.execute(query, list(course_areas))]
+
+
+# --- TIMESTAMPS OF THE FIRST AND THE LAST LOG (None IF THERE ARE NO LOGS) ---
+def get_time_limits(database_path, granularity):
+    query = "SELECT MIN(" + quote("Unix_Time") + "), MAX(" + quote("Unix_Time") + ") FROM " + quote(granularity)
+    with closing(connect(database_path)) as connection:
+        return connection.execute(query).fetchone()
+
+
+if __name__ == "__main__":
+    for dataset_dir_path in constants.datasets.values():
+        convert_datasets_to_database(dataset_dir_path)
@@ -0,0 +1,348 @@
+import heapq
+import numpy as np
+import pandas as pd
+
+import constants
+import functions_algorithm
+import functions_data
+
+# ------------------------------------------------------------------------------------
+# --- FUNCTIONS THAT ARE USED TO DIVIDE LOGS INTO SESSIONS WHILE THE LOGS ARE ARRIVING ---
+# ------------------------------------------------------------------------------------
+
+
+# --- DIVIDE THE APPEND-ONLY FEED OF LOGS INTO SESSIONS OF CORRESPONDING SESSION TYPE ---
+# the settings have the same meaning as the parameters of functions_algorithm.get_session_logs();
+# for each student only the logs after the last returned session are kept, and a session is returned as soon as
+# it is closed: by log-out, or by the other interruption rules once the two logs that follow it have arrived
+# (the rules look at the next log and at the log after the next one), or by the STT against the watermark.
+# The reason to end of a session closed by the watermark depends on the logs that follow it, so the session is
+# returned with the reason to end [None, None, None], which is filled in place (with the same reason to end as in
+# get_session_logs) when they arrive, or at the end of the feed; until then only its last log is kept.
+class StreamingSessionSegmenter:
+    def __init__(self,
+                 specific_moodle_course,
+                 type_of_session,
+                 authentication_flag,
+                 stt_flag,
+                 del_attendance_session_flag,
+                 outlier_detection_switch,
+                 general_stt,
+                 active_component_stt_dict):
+        self.specific_moodle_course = specific_moodle_course
+        self.type_of_session = type_of_session
+        self.authentication_flag = authentication_flag
+        self.stt_flag = stt_flag
+        self.del_attendance_session_flag = del_attendance_session_flag
+        self.outlier_detection_switch = outlier_detection_switch
+        self.general_stt = 0 if general_stt is None else general_stt
+        self.active_component_stt_dict = active_component_stt_dict
+        # logs of each student that do not belong to a returned session yet
+        # (and the last log of the session returned by the watermark whose reason to end is not known yet)
+        self.pending_logs = {}
+        # time after which the open session of each student is closed by the STT,
+        # and the heap that gives the students in the order of these times
+        self.expiration_times = {}
+        self.expiration_heap = []
+        # reason to end (returned by advance_watermark, to be filled in place) of the session whose last log is
+        # the first pending log of each student
+        self.unclassified_reasons = {}
+        # number of pending logs of each student that belong to sessions closed by the STT against the watermark,
+        # but that could not be returned yet (see advance_watermark)
+        self.closed_logs_counts = {}
+
+    # --- ADD THE NEW LOGS (SORTED BY TIME FOR EACH STUDENT) AND RETURN THE SESSIONS THEY HAVE CLOSED ---
+    def add_logs(self, new_logs_df):
+        student_index = functions_algorithm.StudentIndex(new_logs_df)
+        sessions = []
+        reason_to_end = []
+        for student in student_index.students.tolist():
+            new_logs = student_index.get_student_logs(student)
+            if student in self.pending_logs:
+                new_logs = pd.concat([self.pending_logs[student], new_logs])
+            open_logs = self.divide_pending_logs(student, new_logs, sessions, reason_to_end, logs_are_complete=False)
+            self.pending_logs[student] = open_logs
+            if student in self.closed_logs_counts:
+                # the sessions closed by the watermark are forgotten once they are returned
+                closed_logs_count = self.closed_logs_counts.pop(student) - (len(new_logs) - len(open_logs))
+                if closed_logs_count > 0:
+                    self.closed_logs_counts[student] = closed_logs_count
+            self.update_expiration_time(student)
+        return sessions, reason_to_end
+
+    # --- CLOSE AND RETURN THE SESSIONS OF THE STUDENTS INACTIVE FOR LONGER THAN THE STT ---
+    # the watermark is the timestamp before which all the logs have already been added.
+    # In course and learning sessions, the interruption after the second last log of the student can depend on
+    # the log after the next one (when the last log belongs to the site area or is a Course_home page): in that case
+    # the sessions are not returned (nor kept open) until the following logs arrive
+    def advance_watermark(self, watermark):
+        sessions = []
+        reason_to_end = []
+        while len(self.expiration_heap) != 0 and self.expiration_heap[0][0] < watermark:
+            expiration_time, student = heapq.heappop(self.expiration_heap)
+            # the heap can still contain the times that were replaced by the following logs of the student
+            if self.expiration_times.get(student) == expiration_time:
+                del self.expiration_times[student]
+                logs = self.pending_logs[student]
+                open_logs = self.divide_pending_logs(student, logs, sessions, reason_to_end,
+                                                     logs_are_complete=False,
+                                                     closed_by_watermark=True)
+                if len(open_logs) == 0:
+                    del self.pending_logs[student]
+                    continue
+                self.pending_logs[student] = open_logs
+                if len(open_logs) > 1 or student not in self.unclassified_reasons:
+                    # the session is closed, but it is returned when the following logs arrive
+                    self.closed_logs_counts[student] = len(open_logs)
+        return sessions, reason_to_end
+
+    # --- THE SESSIONS THAT ARE STILL OPEN (AS THEY WOULD BE RETURNED IF THE LOGS ENDED NOW) ---
+    # (the sessions closed by the watermark are not open)
+    def get_open_sessions(self):
+        sessions = []
+        reason_to_end = []
+        for student, logs in self.pending_logs.items():
+            open_logs = logs.iloc[max(self.closed_logs_counts.get(student, 0),
+                                      int(student in self.unclassified_reasons)):]
+            if len(open_logs) != 0:
+                open_session_result, _, _, _ = self.get_pending_session_result(student,
+                                                                              open_logs,
+                                                                              logs_are_complete=True)
+                append_session_result(open_session_result, sessions, reason_to_end)
+        return sessions, reason_to_end
+
+    # --- CLOSE ALL THE OPEN SESSIONS (AT THE END OF THE FEED) ---
+    def close_all(self):
+        sessions = []
+        reason_to_end = []
+        for student in list(self.pending_logs.keys()):
+            self.divide_pending_logs(student, self.pending_logs.pop(student), sessions, reason_to_end,
+                                     logs_are_complete=True)
+            self.expiration_times.pop(student, None)
+            self.closed_logs_counts.pop(student, None)
+        return sessions, reason_to_end
+
+    def update_expiration_time(self, student):
+        # the session is closed by the STT if the next log arrives later than the inactivity allowed after the last
+        # log (in case of time-off-task, the estimated duration of the last log is not counted as inactivity)
+        logs = self.pending_logs[student]
+        if not self.stt_flag or len(logs) == int(student in self.unclassified_reasons):
+            self.expiration_times.pop(student, None)
+            if len(logs) == 0:
+                del self.pending_logs[student]
+            return
+        last_log = logs.iloc[-1]
+        stt_component = self.active_component_stt_dict.get(last_log["Component"], self.general_stt)
+        expiration_time = last_log["Unix_Time"] + stt_component * 60.0
+        if self.outlier_detection_switch:
+            expiration_time += last_log["Estimated_Duration"]
+        self.expiration_times[student] = expiration_time
+        heapq.heappush(self.expiration_heap, (expiration_time, student))
+
+    # --- DIVIDE THE PENDING LOGS OF THE STUDENT INTO SESSIONS, AND ADD THE CLOSED ONES TO THE LISTS ---
+    # the reason to end of the session returned by the watermark is filled in place as soon as it is known;
+    # returns the logs that are still pending
+    def divide_pending_logs(self, student, logs, sessions, reason_to_end, logs_are_complete, closed_by_watermark=False):
+        unclassified_reason = self.unclassified_reasons.pop(student, None)
+        session_result, open_logs, is_first_classified, is_last_unclassified = \
+            self.get_pending_session_result(student, logs, logs_are_complete, closed_by_watermark, unclassified_reason)
+        if unclassified_reason is not None and not is_first_classified:
+            self.unclassified_reasons[student] = unclassified_reason
+        append_session_result(session_result, sessions, reason_to_end)
+        if is_last_unclassified:
+            reason_to_end[-1] = [None, None, None]
+            self.unclassified_reasons[student] = reason_to_end[-1]
+        return open_logs
+
+    # --- DIVIDE THE PENDING LOGS OF THE STUDENT INTO SESSIONS WITH THE RULES OF get_session_logs() ---
+    # when the logs are complete, the last log of the student ends the session ("Final log"), otherwise only
+    # the interruptions that can not change when the following logs arrive are applied.
+    # If unclassified_reason is given, the first log is the last log of a session already returned by the watermark:
+    # the reason to end is filled in place once it is known, and the log is no longer kept.
+    # Returns the sessions that are closed, the logs that are still pending, whether unclassified_reason has been
+    # filled, and whether the reason to end of the last session is not known yet (the session closed by the watermark,
+    # whose last log is kept to classify it later)
+    def get_pending_session_result(self,
+                                   student,
+                                   logs,
+                                   logs_are_complete,
+                                   closed_by_watermark=False,
+                                   unclassified_reason=None):
+        student_codes = np.zeros(len(logs), dtype=np.int64)
+        category_codes = functions_algorithm.CategoryCodes(logs)
+        columns, lookups, components = functions_algorithm.get_session_rule_columns(logs,
+                                                                                    student_codes,
+                                                                                    self.general_stt,
+                                                                                    self.active_component_stt_dict,
+                                                                                    category_codes)
+        break_ids, reason_codes, component_codes, inactivity_periods = functions_algorithm.get_session_breaks(
+            columns,
+            lookups,
+            self.type_of_session,
+            self.authentication_flag,
+            self.stt_flag,
+            self.outlier_detection_switch)
+        first_undecided_id = len(logs)
+        if not logs_are_complete:
+            # the check after a log is final once the two logs that follow it are known, or if it is a log-out
+            is_decided = np.arange(len(logs)) < len(logs) - 2
+            is_decided |= lookups["is_logout"][columns["component"]] & self.authentication_flag
+            if closed_by_watermark and len(logs) >= 2:
+                # the log after the next one is only checked after a change of course in the course and learning
+                # sessions (through the site area) and after quality learning (through Course_home)
+                is_decided[-2] |= self.type_of_session == "session_study" \
+                    or not (lookups["is_site_area"][columns["course_area"][-1]]
+                            or lookups["is_course_home"][columns["component"][-1]])
+            undecided_ids = np.flatnonzero(~is_decided)
+            first_undecided_id = undecided_ids[0] if len(undecided_ids) != 0 else len(logs)
+
+        is_first_classified = unclassified_reason is not None and first_undecided_id != 0
+        first_log = 0
+        if is_first_classified:
+            if len(break_ids) != 0 and break_ids[0] == 0:
+                unclassified_reason[:] = [functions_algorithm.reason_to_end_labels[reason_codes[0]],
+                                          components[component_codes[0]],
+                                          float(inactivity_periods[0])]
+                break_ids = break_ids[1:]
+                reason_codes = reason_codes[1:]
+                component_codes = component_codes[1:]
+                inactivity_periods = inactivity_periods[1:]
+            first_log = 1
+        elif unclassified_reason is not None:
+            # (no session can be closed before the reason to end of the previous one is known)
+            first_undecided_id = 0
+
+        closed = break_ids < first_undecided_id
+        # the STT against the watermark ends the session after the last log, if the interruptions before it are known
+        is_last_unclassified = closed_by_watermark and first_undecided_id >= len(logs) - 1 and len(logs) > first_log
+        if is_last_unclassified:
+            closed[-1] = True
+        break_ids = break_ids[closed]
+        reason_codes = reason_codes[closed]
+        component_codes = component_codes[closed]
+        inactivity_periods = inactivity_periods[closed]
+
+        ends = (break_ids + 1).astype(np.int64)
+        starts = np.full_like(ends, first_log)
+        starts[1:] = ends[:-1]
+        session_result = functions_algorithm.SessionResult(logs,
+                                                           starts,
+                                                           ends,
+                                                           np.zeros(len(ends), dtype=np.int64),
+                                                           np.array([student], dtype=object),
+                                                           reason_codes,
+                                                           component_codes,
+                                                           components,
+                                                           inactivity_periods,
+                                                           category_codes)
+        session_result = functions_algorithm.select_and_clean_sessions(session_result,
+                                                                       self.specific_moodle_course,
+                                                                       self.type_of_session,
+                                                                       self.del_attendance_session_flag)
+        open_logs = logs.iloc[int(ends[-1]) if len(ends) != 0 else first_log:]
+        if is_last_unclassified:
+            # (the sessions are cleaned within their rows, so the last one is kept if it ends after the previous ones)
+            previous_end = int(ends[-2]) if len(ends) >= 2 else first_log
+            is_last_unclassified = len(session_result) != 0 and int(session_result.ends[-1]) > previous_end
+            # the last log is only kept to classify the reason to end of a returned session
+            open_logs = logs.iloc[len(logs) - int(is_last_unclassified):]
+        return session_result, open_logs, is_first_classified, is_last_unclassified
+
+
+# --- ADD THE SESSIONS AND REASONS TO END (IN THE FORMAT OF get_session_logs()) OF THE SESSION RESULT TO THE LISTS ---
+def append_session_result(session_result, sessions, reason_to_end):
+    if len(session_result) != 0:
+        sessions += session_result.get_sessions()
+        reason_to_end += session_result.get_reason_to_end()
+
+
+# --- DIVIDE THE LOGS OF A CSV FILE SORTED BY (STUDENT, TIME) INTO SESSIONS, ONE CHUNK OF ROWS AT A TIME ---
+# for the CSV files that do not fit in memory; the settings have the same meaning as the parameters of
+# functions_algorithm.get_session_logs(). The file is read in chunks of chunk_size rows: the students whose logs are
+# complete in the chunk are divided with the columnar engine, and the last student of the chunk is divided by
+# the streaming segmenter, which only carries the logs of the open session (including the two logs that the rules
+# look at after the last decided log) to the next chunk.
+# The sessions are appended to sessions_path (their logs, with the number of the session) and their reasons to end
+# to pauses_path as soon as they are closed, so the memory used depends on the size of the chunks (and of the
+# longest session), not on the size of the dataset. Returns the number of sessions written
+def write_sessions_of_csv(csv_path,
+                          sessions_path,
+                          pauses_path,
+                          specific_moodle_course,
+                          type_of_session,
+                          authentication_flag,
+                          stt_flag,
+                          del_attendance_session_flag,
+                          outlier_detection_switch,
+                          general_stt,
+                          active_component_stt_dict,
+                          chunk_size=constants.segmentation_chunk_size):
+    segmenter = StreamingSessionSegmenter(specific_moodle_course,
+                                          type_of_session,
+                                          authentication_flag,
+                                          stt_flag,
+                                          del_attendance_session_flag,
+                                          outlier_detection_switch,
+                                          general_stt,
+                                          active_component_stt_dict)
+    session_count = 0
+    # students whose logs have already been divided (a student found again means that the file is not sorted)
+    finished_students = set()
+    open_logs = None
+    with open(sessions_path, "w", newline="") as sessions_file, open(pauses_path, "w", newline="") as pauses_file:
+        for chunk in pd.read_csv(csv_path,
+                                 chunksize=chunk_size,
+                                 usecols=lambda column: column not in functions_data.dropped_columns):
+            if open_logs is not None and len(open_logs) != 0:
+                chunk = pd.concat([open_logs, chunk], ignore_index=True)
+            students = chunk["Student ID"].to_numpy()
+            unix_time = chunk["Unix_Time"].to_numpy()
+            is_first_log = np.ones(len(chunk), dtype=bool)
+            is_first_log[1:] = students[1:] != students[:-1]
+            first_logs = np.flatnonzero(is_first_log)
+            chunk_students = students[first_logs].tolist()
+            if len(set(chunk_students)) != len(chunk_students) or not finished_students.isdisjoint(chunk_students):
+                raise ValueError("The logs of " + csv_path + " are not sorted by student")
+            if np.any(np.diff(unix_time)[~is_first_log[1:]] < 0):
+                raise ValueError("The logs of " + csv_path + " are not sorted by time for each student")
+            # all the logs of the students before the last one are in the chunk
+            last_student_start = int(first_logs[-1])
+            complete_session_result = functions_algorithm.get_session_result(
+                functions_algorithm.StudentIndex(chunk.iloc[:last_student_start]),
+                specific_moodle_course,
+                type_of_session,
+                authentication_flag,
+                stt_flag,
+                del_attendance_session_flag,
+                outlier_detection_switch,
+                general_stt,
+                active_component_stt_dict)
+            closed_session_result, open_logs, _, _ = segmenter.get_pending_session_result(
+                chunk_students[-1],
+                chunk.iloc[last_student_start:],
+                logs_are_complete=False)
+            for session_result in (complete_session_result, closed_session_result):
+                session_count = write_session_result(session_result, session_count, sessions_file, pauses_file)
+            finished_students.update(chunk_students[:-1])
+        if open_logs is not None and len(open_logs) != 0:
+            final_session_result, _, _, _ = segmenter.get_pending_session_result(open_logs["Student ID"].iloc[0],
+                                                                                 open_logs,
+                                                                                 logs_are_complete=True)
+            session_count = write_session_result(final_session_result, session_count, sessions_file, pauses_file)
+    return session_count
+
+
+# --- APPEND THE SESSIONS AND THEIR REASONS TO END TO THE OPEN CSV FILES ---
+# the sessions are numbered from first_session (the header is written with the first sessions);
+# returns the number of the next session
+def write_session_result(session_result, first_session, sessions_file, pauses_file):
+    session_numbers = np.arange(first_session, first_session + len(session_result))
+    logs = session_result.df.take(session_result.get_session_rows())
+    logs.insert(0, "Session", session_numbers[session_result.get_session_numbers()])
+    pauses = session_result.get_reason_to_end_table()
+    pauses.insert(0, "Student ID", np.asarray(session_result.students, dtype=object)[session_result.student_codes])
+    pauses.insert(0, "Session", session_numbers)
+    write_header = sessions_file.tell() == 0
+    logs.to_csv(sessions_file, header=write_header, index=False)
+    pauses.to_csv(pauses_file, header=write_header, index=False)
+    return first_session + len(session_result)
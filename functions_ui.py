@@ -1,4 +1,6 @@
+from collections import OrderedDict
 from datetime import datetime, timedelta
+import threading
 import pytz
 import pandas as pd
 import plotly.express as px
@@ -8,30 +10,168 @@ import numpy as np
 import constants
 import ui_text
 import functions_algorithm
+import functions_data
+import functions_database
 
 
 # ---------------------------------------------------------------------------------------------
 # --- FUNCTIONS THAT ARE USED TO EXTRACT AND ELABORATE DATA, TRANSFORM IT FOR DISPLAY, ETC. ---
 # ---------------------------------------------------------------------------------------------
 
-# --- INITIAL PRELOADING OF THE DATASETS FOR THE FUTURE USE IN THE APP ---  
-def preload_data():
-    dict_of_df = {}
-    # preload all the dataset (with all the granularity options)
-    for key in constants.file_names.keys():
-        dict_of_df[key] = pd.read_csv(constants.data_dir_path + constants.file_names[key])
-    return dict_of_df
+# --- REGISTRY OF THE DATASETS SERVED BY THE VISUAL TOOL ---
+# dataset_dir_paths has the folder (with the files of constants.file_names) of each dataset. The datasets are loaded
+# lazily, one granularity at a time (see LazyDatasets), and the information shown by the layout and the options
+# of each dataset is kept once computed. When the loaded datasets use more than memory_budget bytes,
+# the least recently used ones are unloaded; their student indexes and daily pause histograms are forgotten
+# with their dataframes, as well as the logs read from their SQLite files
+class DatasetRegistry:
+    def __init__(self, dataset_dir_paths, memory_budget=None):
+        self.dataset_dir_paths = dataset_dir_paths
+        self.memory_budget = memory_budget
+        # the datasets in the order of their last use (the most recently used is the last one)
+        self.loaded_datasets = OrderedDict()
+        self.dataset_infos = {}
+        self.lock = threading.RLock()
+
+    def get_datasets(self, dataset):
+        # the dictionary {granularity: dataframe} of the dataset, that loads each granularity on first use
+        with self.lock:
+            if dataset not in self.loaded_datasets:
+                self.loaded_datasets[dataset] = LazyDatasets(self.dataset_dir_paths[dataset],
+                                                             self.unload_least_recently_used)
+            self.loaded_datasets.move_to_end(dataset)
+            # (the logs read from the SQLite files of the other datasets may be unloaded)
+            self.unload_least_recently_used()
+            return self.loaded_datasets[dataset]
+
+    def get_dataset_info(self, dataset):
+        # components of the site area and of each course, and timestamps of the first and the last log
+        # (the dataset is loaded without holding the lock of the registry, that is also taken after every load);
+        # they are read from the activity granularity, whose logs the tasks are made of, so the task granularity
+        # is only loaded when it is shown
+        if dataset not in self.dataset_infos:
+            dataset_info = get_dataset_info(self.get_datasets(dataset),
+                                            "activity_granularity",
+                                            [course_dict["value"] for course_dict
+                                             in constants.specific_moodle_course_filter])
+            with self.lock:
+                self.dataset_infos.setdefault(dataset, dataset_info)
+        return self.dataset_infos[dataset]
+
+    def get_memory_usage(self):
+        # the loaded dataframes and the logs last read from the SQLite file of each dataset
+        return sum(datasets.memory_usage
+                   + functions_database.get_student_index_cache_memory_usage(datasets.data_dir_path
+                                                                             + constants.sqlite_file_name)
+                   for datasets in self.loaded_datasets.values())
+
+    def unload_least_recently_used(self):
+        # the most recently used dataset is never unloaded (it is the one that is being loaded)
+        with self.lock:
+            while self.memory_budget is not None and len(self.loaded_datasets) > 1 \
+                    and self.get_memory_usage() > self.memory_budget:
+                _, datasets = self.loaded_datasets.popitem(last=False)
+                functions_database.clear_student_index_cache(datasets.data_dir_path + constants.sqlite_file_name)
+
+
+# --- DATASETS OF THE GRANULARITY OPTIONS, LOADED THE FIRST TIME EACH OF THEM IS REQUESTED ---
+# a dictionary {granularity: dataframe} that only contains the granularities already loaded from data_dir_path;
+# the lock prevents two callbacks from loading the same dataset at the same time,
+# and on_load (if given) is called after every load
+class LazyDatasets(dict):
+    def __init__(self, data_dir_path=constants.data_dir_path, on_load=None):
+        super().__init__()
+        self.data_dir_path = data_dir_path
+        self.on_load = on_load
+        self.lock = threading.RLock()
+        # memory (bytes) used by the loaded dataframes and their student indexes
+        self.memory_usage = 0
+
+    def __missing__(self, granularity):
+        with self.lock:
+            is_loaded = not dict.__contains__(self, granularity)
+            if is_loaded:
+                df = load_granularity_dataset(self, granularity)
+                self[granularity] = df
+                self.memory_usage += int(df.memory_usage(deep=True).sum()) \
+                    + int(functions_algorithm.get_student_index(df).df.memory_usage(deep=True).sum())
+            df = dict.__getitem__(self, granularity)
+        if is_loaded and self.on_load is not None:
+            self.on_load()
+        return df
+
+
+# --- LOAD THE DATASET OF THE GRANULARITY (AND BUILD ITS STUDENT INDEX) ---
+def load_granularity_dataset(dict_of_df, granularity):
+    if granularity == "task_granularity" and constants.derive_task_granularity:
+        # the tasks are derived from the activity logs (that are loaded first, if they are not yet)
+        df = functions_data.get_task_granularity_dataset(dict_of_df["activity_granularity"])
+    else:
+        # (from the columnar cache of the CSV file, when it is up to date)
+        df = functions_data.load_dataset(dict_of_df.data_dir_path + constants.file_names[granularity])
+    # the logs are sorted by student and time once, and the index is reused by all the following callbacks
+    functions_algorithm.get_student_index(df)
+    return df
+
+
+# --- GRANULARITIES THAT ARE COMPUTED BY THE CALLBACKS (IN THE ORDER OF THE GRANULARITY OPTIONS) ---
+# the ones that are shown, and the ones that are required anyway by the callback
+def get_computed_granularities(activity_task_toggle, required_granularities=()):
+    return [granularity for granularity in constants.file_names.keys()
+            if granularity in activity_task_toggle or granularity in required_granularities]
+
+
+# --- LIMITS (UNIX TIME) OF THE OBSERVATION RANGE: FROM THE START DATE INCLUDED TO THE DAY AFTER THE END DATE ---
+def get_observation_range(observation_start_date, observation_end_date):
+    start_date = int(datetime.timestamp(datetime.fromisoformat(observation_start_date)))
+    end_date = int(datetime.timestamp(datetime.fromisoformat(observation_end_date) + timedelta(days=1)))
+    return start_date, end_date
+
+
+# --- DAY (MIDNIGHT IN THE TIME ZONE OF THE VISUAL TOOL) OF THE UNIX TIME, AS SHOWN IN THE DATE PICKER ---
+def get_day(unix_time):
+    return datetime.fromtimestamp(unix_time, tz=pytz.timezone("Europe/Rome")) \
+        .replace(hour=0, minute=0, second=0, microsecond=0)
 
 
 # --- ACCORDING TO SETTINGS GET THE REQUIRED PORTION OF THE DATASET ---
-def get_chosen_df(dict_of_df, observation_start_date, observation_end_date, activity_task_status):
+def get_chosen_df(dict_of_df,
+                  observation_start_date,
+                  observation_end_date,
+                  activity_task_status,
+                  specific_moodle_course=()):
+    start_date, end_date = get_observation_range(observation_start_date, observation_end_date)
+    if constants.data_backend == "sqlite":
+        # only the logs of the defined time period (of the students with logs of the chosen courses) are read
+        # from the table of the granularity, with queries on its indexes (and read in memory all at once)
+        return functions_database.get_student_index(dict_of_df.data_dir_path + constants.sqlite_file_name,
+                                                    activity_task_status,
+                                                    start_date,
+                                                    end_date,
+                                                    specific_moodle_course)
     # which dataset to use (with activity or task granularity)
-    chosen_df = dict_of_df[activity_task_status]
-    # only consider rows that represent logs occurred in the defined time period (limit dates included)
-    start_date = int(datetime.timestamp(datetime.fromisoformat(observation_start_date)))
-    end_date = int(datetime.timestamp(datetime.fromisoformat(observation_end_date) + timedelta(days=1)))
-    chosen_df = chosen_df.loc[(chosen_df["Unix_Time"] >= start_date) & (chosen_df["Unix_Time"] < end_date)]
-    return chosen_df
+    student_index = functions_algorithm.get_student_index(dict_of_df[activity_task_status])
+    # only consider rows that represent logs occurred in the defined time period (limit dates included):
+    # the rows of each student in the period are found by binary search in the index (sorted by student and time),
+    # and the selected logs stay sorted, so the result can be divided into sessions as it is
+    return student_index.get_time_subset(start_date, end_date)
+
+
+# --- COMPONENTS OF THE SITE AREA AND OF EACH COURSE, AND TIMESTAMPS OF THE FIRST AND THE LAST LOG OF THE DATASET ---
+def get_dataset_info(dict_of_df, granularity, courses):
+    if constants.data_backend == "sqlite":
+        database_path = dict_of_df.data_dir_path + constants.sqlite_file_name
+        site_area_components = functions_database.get_components(database_path, granularity, constants.site_area)
+        course_components = {course: functions_database.get_components(database_path, granularity, [course])
+                             for course in courses}
+        min_time, max_time = functions_database.get_time_limits(database_path, granularity)
+    else:
+        df = dict_of_df[granularity]
+        site_area_components = list(df.loc[df["Course_Area"].isin(constants.site_area)]["Component"].unique())
+        course_components = {course: list(df.loc[df["Course_Area"] == course]["Component"].unique())
+                             for course in courses}
+        min_time, max_time = int(df["Unix_Time"].min()), int(df["Unix_Time"].max())
+    return site_area_components, course_components, min_time, max_time
 
 
 # --- TRANSFORMATION OF THE LIST OF ASSIGNED THRESHOLDS FOR SPECIFIC COMPONENTS INTO DICTIONARY
@@ -60,70 +200,49 @@ def transform_active_components_dict_to_options(options_dict):
 
 # --- FUNCTION DESCRIPTION ---
 def get_data_for_boxplot(learning_sessions):
-    def most_frequent(lst):
-        try:
-            max_val = max(set(lst), key=lst.count)
-        except:
-            return "Not present", 0
-        return max_val, lst.count(max_val)
-
-    starts = []
-    starts_unix = []
-    ends = []
-    ends_unix = []
-    most_freq_activity_task = []
-    most_freq_activity_task_count = []
-    most_freq_last_activity_task = []
-    most_freq_last_activity_task_count = []
-    most_freq_type = []
-    possible_start_values = [0, 1, 2, 3, 4, 5, 6, 7, 8, 9, 10, 11, 12, 13, 14, 15, 16, 17, 18, 19, 20, 21, 22, 23]
-    granularity = "activity_granularity" if "Event_Name" in learning_sessions[0][0].keys() else "task_granularity"
-    dict_activity_task_by_start = {}
-    dict_last_activity_task_by_start = {}
-    dict_inner_activity_task_by_start = {}
-    for start_value in possible_start_values:
-        dict_activity_task_by_start[start_value] = []
-        dict_last_activity_task_by_start[start_value] = []
-        dict_inner_activity_task_by_start[start_value] = []
-    for session in learning_sessions:
-        start_unix = session[0]["Unix_Time"]
-        end_unix = session[-1]["Unix_Time"]
-        starts_unix.append(int(start_unix))
-        start_session = datetime.fromtimestamp(start_unix, tz=pytz.timezone("Europe/Rome"))
-        ends_unix.append(int(end_unix))
-        end_session = datetime.fromtimestamp(end_unix, tz=pytz.timezone("Europe/Rome"))
-        end_time = end_session.hour + end_session.minute / 60.0
-        if start_session.day != end_session.day:
-            end_time += 24
-        start_session = start_session.hour
-        starts.append(start_session)
-        ends.append(end_time)
-        for i in range(len(session)):
-            log = session[i]
-            info = log["Component"] if granularity == "task_granularity" else (log["Component"], log["Event_Name"])
-            dict_activity_task_by_start[start_session].append(info)
-            if i == len(session)-1:
-                dict_last_activity_task_by_start[start_session].append(info)
-            else:
-                dict_inner_activity_task_by_start[start_session].append(info)
-    for start_value in possible_start_values:
-        dict_activity_task_by_start[start_value] = (most_frequent(dict_activity_task_by_start[start_value]))
-        dict_last_activity_task_by_start[start_value] = (most_frequent(dict_last_activity_task_by_start[start_value]))
-        dict_inner_activity_task_by_start[start_value] = (most_frequent(dict_inner_activity_task_by_start[start_value]))
-    for start in starts:
-        most_freq_activity_task.append(dict_activity_task_by_start[start][0])
-        most_freq_activity_task_count.append(dict_activity_task_by_start[start][1])
-        most_freq_last_activity_task.append(dict_last_activity_task_by_start[start][0])
-        most_freq_last_activity_task_count.append(dict_last_activity_task_by_start[start][1])
-        most_freq_type.append(granularity[:-12])
+    def most_frequent(logs):
+        # the most frequent activity/task (and how many times it occurred) for each hour of session start
+        # (in case of a tie, the activity/task that occurred first is chosen)
+        counts = logs.groupby(["Start"] + info_columns, sort=False, observed=True).size().reset_index(name="Count")
+        counts = counts.sort_values("Count", ascending=False, kind="mergesort").drop_duplicates("Start")
+        if granularity == "task_granularity":
+            values = counts["Component"].tolist()
+        else:
+            values = list(zip(counts["Component"].tolist(), counts["Event_Name"].tolist()))
+        return dict(zip(counts["Start"].tolist(), zip(values, counts["Count"].tolist())))
+
+    def get_local_time(unix_time):
+        return pd.to_datetime(unix_time, unit="s", utc=True).tz_convert("Europe/Rome")
+
+    granularity = "activity_granularity" if "Event_Name" in learning_sessions.df.columns else "task_granularity"
+    info_columns = ["Component"] if granularity == "task_granularity" else ["Component", "Event_Name"]
+    # the start and the end of each session are its first and its last rows
+    unix_time = learning_sessions.df["Unix_Time"].to_numpy()
+    starts_unix = unix_time[learning_sessions.starts]
+    ends_unix = unix_time[learning_sessions.ends - 1]
+    start_session = get_local_time(starts_unix)
+    end_session = get_local_time(ends_unix)
+    starts = np.asarray(start_session.hour)
+    ends = np.asarray(end_session.hour) + np.asarray(end_session.minute) / 60.0
+    ends = np.where(np.asarray(start_session.day) != np.asarray(end_session.day), ends + 24, ends)
+
+    # all the logs of the sessions, each one with the hour of its session's start
+    session_rows = learning_sessions.get_session_rows()
+    session_numbers = learning_sessions.get_session_numbers()
+    logs = learning_sessions.df.iloc[session_rows][info_columns].reset_index(drop=True)
+    logs["Start"] = starts[session_numbers]
+    is_last_log = session_rows == learning_sessions.ends[session_numbers] - 1
+    most_freq_activity_task = most_frequent(logs)
+    most_freq_last_activity_task = most_frequent(logs[is_last_log])
     return pd.DataFrame({"Time of session start": starts,
-                         "Unix session start": starts_unix,
+                         "Unix session start": starts_unix.astype(int),
                          "Time of session end": ends,
-                         "Unix session end": ends_unix,
-                         "Most freq": most_freq_activity_task,
-                         "Most freq - Count": most_freq_activity_task_count,
-                         "Most freq last": most_freq_last_activity_task,
-                         "Most freq last - Count": most_freq_last_activity_task_count}
+                         "Unix session end": ends_unix.astype(int),
+                         "Most freq": [most_freq_activity_task[start][0] for start in starts.tolist()],
+                         "Most freq - Count": [most_freq_activity_task[start][1] for start in starts.tolist()],
+                         "Most freq last": [most_freq_last_activity_task[start][0] for start in starts.tolist()],
+                         "Most freq last - Count": [most_freq_last_activity_task[start][1]
+                                                    for start in starts.tolist()]}
                         )
 
 
@@ -254,7 +373,7 @@ def plot_boxplot(data, activity_task_visibility, current_split_points):
     return fig
 
 
-def get_suggestion_ui_text(time_off_task_suggestion_dict):
+def get_suggestion_ui_text(time_off_task_suggestion_dict, confidence_interval_dict=None):
     activity_task_toggle = list(time_off_task_suggestion_dict.keys())
     activity_granularity_is_none = "activity_granularity" in activity_task_toggle \
                                    and (time_off_task_suggestion_dict["activity_granularity"] is None
@@ -262,6 +381,15 @@ def get_suggestion_ui_text(time_off_task_suggestion_dict):
     task_granularity_is_none = "task_granularity" in activity_task_toggle \
                                and (time_off_task_suggestion_dict["task_granularity"] is None
                                     or np.isnan(time_off_task_suggestion_dict["task_granularity"]))
+    # the suggestions with a confidence interval are shown together with it
+    if confidence_interval_dict is not None:
+        time_off_task_suggestion_dict = dict(time_off_task_suggestion_dict)
+        for granularity, confidence_interval in confidence_interval_dict.items():
+            if confidence_interval is not None:
+                time_off_task_suggestion_dict[granularity] = ui_text.suggestion_with_confidence_interval.format(
+                    time_off_task_suggestion_dict[granularity],
+                    "{:g}".format(100 * constants.stt_suggestion_confidence),
+                    *confidence_interval)
     if activity_granularity_is_none or task_granularity_is_none:
         suggestion = ui_text.no_suggestion_session_timeout_threshold
     elif len(activity_task_toggle) == 1:
@@ -277,8 +405,30 @@ def get_suggestion_ui_text(time_off_task_suggestion_dict):
     return suggestion
 
 
+# --- NUMBER OF SESSIONS AND THEIR MEDIAN DURATION FOR THE CURRENT GENERAL STT (FROM THE PRECOMPUTED STT SWEEP) ---
+def get_stt_sweep_ui_text(stt_sweep_dict, general_stt, activity_task_toggle):
+    general_stt = 0 if general_stt is None else general_stt
+    # the sweep is only computed for the integer STT values (the JSON keys are strings)
+    if len(activity_task_toggle) == 0 or general_stt != int(general_stt):
+        return ""
+    summaries = {}
+    for granularity in activity_task_toggle:
+        # (the sweep of a granularity that has just been shown is not computed yet)
+        if granularity not in stt_sweep_dict:
+            return ""
+        summary = stt_sweep_dict[granularity].get(str(int(general_stt)))
+        if summary is None:
+            return ""
+        median = summary["duration_distribution"]["median"]
+        summaries[granularity] = (summary["session_count"], "-" if median is None else round(median, 1))
+    if len(activity_task_toggle) == 1:
+        return ui_text.stt_sweep_summary.format(*summaries[activity_task_toggle[0]])
+    return ui_text.stt_sweep_summary_activity_task.format(*summaries["activity_granularity"],
+                                                          *summaries["task_granularity"])
+
+
 # --- FUNCTION DESCRIPTION ---
-def get_general_time_off_task_update(final_pause_analysis_dict,
+def get_general_time_off_task_update(pause_histogram_dict,
                                      type_of_session,
                                      study_session_identification,
                                      outlier_detection_switch,
@@ -293,22 +443,25 @@ def get_general_time_off_task_update(final_pause_analysis_dict,
             general_time_off_task["visibility"] = "visible"
             if outlier_detection_switch:
                 time_off_task_suggestion_dict = {}
+                confidence_interval_dict = {}
                 for granularity in activity_task_toggle:
-                    final_pause_analysis = final_pause_analysis_dict[granularity]
-                    preprocessed_analysis = functions_algorithm.get_classified_pause_length_list(final_pause_analysis,
-                                                                                                 type_of_session,
-                                                                                                 None)
-                    time_off_task_suggestion_dict[granularity] = functions_algorithm.get_recommended_threshold(
-                        preprocessed_analysis,
-                        constants.stt_suggestion_final_pause_types[type_of_session],
-                        max_stt
-                    )
-                general_time_off_task_suggestion = get_suggestion_ui_text(time_off_task_suggestion_dict)
+                    # the pauses are already binned (for all the components and each of them)
+                    pause_histogram = functions_algorithm.PauseHistogram.from_dict(pause_histogram_dict[granularity])
+                    time_off_task_suggestion_dict[granularity] = pause_histogram.get_recommended_threshold(
+                        None,
+                        max_stt,
+                        method=constants.stt_suggestion_method)
+                    confidence_interval_dict[granularity] = pause_histogram.get_threshold_confidence_interval(
+                        None,
+                        max_stt,
+                        method=constants.stt_suggestion_method)
+                general_time_off_task_suggestion = get_suggestion_ui_text(time_off_task_suggestion_dict,
+                                                                          confidence_interval_dict)
     return max_time_off_task, general_time_off_task, general_time_off_task_suggestion
 
 
 # --- FUNCTION DESCRIPTION ---
-def get_component_time_off_task_suggestion(final_pause_analysis_dict,
+def get_component_time_off_task_suggestion(pause_histogram_dict,
                                            type_of_session,
                                            outlier_detection_switch,
                                            component_toggle,
@@ -316,28 +469,32 @@ def get_component_time_off_task_suggestion(final_pause_analysis_dict,
                                            max_stt):
     component_time_off_task_suggestion = ""
     if outlier_detection_switch and component_toggle is not None and len(activity_task_toggle) != 0:
-        preprocessed_analysis_dict = {}
+        pause_histograms = {}
         for granularity in activity_task_toggle:
-            final_pause_analysis = final_pause_analysis_dict[granularity]
-            preprocessed_analysis_dict[granularity] = functions_algorithm.get_classified_pause_length_list(
-                final_pause_analysis,
-                type_of_session,
-                component_toggle)
+            pause_histograms[granularity] = functions_algorithm.PauseHistogram.from_dict(
+                pause_histogram_dict[granularity])
         activity_granularity_check = "activity_granularity" in activity_task_toggle \
-                                     and (len(preprocessed_analysis_dict["activity_granularity"][0]) != 0
-                                          or len(preprocessed_analysis_dict["activity_granularity"][1]) != 0)
+                                     and pause_histograms["activity_granularity"].get_pause_counts(
+                                         component_toggle).sum() != 0
         task_granularity_check = "task_granularity" in activity_task_toggle \
-                                 and (len(preprocessed_analysis_dict["task_granularity"][0]) != 0
-                                      or len(preprocessed_analysis_dict["task_granularity"][1]) != 0)
+                                 and pause_histograms["task_granularity"].get_pause_counts(
+                                     component_toggle).sum() != 0
         if activity_granularity_check or task_granularity_check:
             time_off_task_suggestion_dict = {}
+            confidence_interval_dict = {}
             for granularity in activity_task_toggle:
-                time_off_task_suggestion_dict[granularity] = functions_algorithm.get_recommended_threshold(
-                    preprocessed_analysis_dict[granularity],
-                    constants.stt_suggestion_final_pause_types[type_of_session],
-                    max_stt
+                time_off_task_suggestion_dict[granularity] = pause_histograms[granularity].get_recommended_threshold(
+                    component_toggle,
+                    max_stt,
+                    method=constants.stt_suggestion_method
                 )
-            component_time_off_task_suggestion = get_suggestion_ui_text(time_off_task_suggestion_dict)
+                confidence_interval_dict[granularity] = pause_histograms[granularity].get_threshold_confidence_interval(
+                    component_toggle,
+                    max_stt,
+                    method=constants.stt_suggestion_method
+                )
+            component_time_off_task_suggestion = get_suggestion_ui_text(time_off_task_suggestion_dict,
+                                                                        confidence_interval_dict)
     return component_time_off_task_suggestion
 
 
@@ -383,21 +540,26 @@ def info_task_in_time_window(sessions, current_split_points):
     def get_time_window_label(time_window):
         return time_window[0] + "-" + time_window[1]
 
-    def log_time_window(row):
+    def hour_time_window(hour):
         if len(sessions_time_windows) > 0:
-            start_unix = row["Unix_Time"]
-            start_session = datetime.fromtimestamp(start_unix, tz=pytz.timezone("Europe/Rome"))
-            start_session = start_session.hour
             for j in range(len(sessions_time_windows)-1):
                 tw = sessions_time_windows[j]
                 tw_start = int(tw[0][:-3])
                 tw_end = int(tw[1][:-3])
-                if tw_start <= start_session < tw_end:
+                if tw_start <= hour < tw_end:
                     return get_time_window_label(tw)
             return get_time_window_label(sessions_time_windows[-1])
         else:
             return None
 
+    def add_task_info(time_window, logs):
+        task_info = logs.groupby("Component", sort=False, observed=True)["Duration"].agg(["count", "sum"])
+        for component, count, duration in zip(task_info.index, task_info["count"].tolist(), task_info["sum"].tolist()):
+            task_info_dict[time_window][component] = {
+                "count": count,
+                "duration": duration,
+            }
+
     def transform_time_in_minutes(duration_seconds):
         output = ""
         if duration_seconds >= 3600:
@@ -424,29 +586,19 @@ def info_task_in_time_window(sessions, current_split_points):
         sessions_time_windows.append((current_split_points[-1], current_split_points[0]))
 
     # getting statistical information
+    # (about all the logs of the sessions except the last log of each session)
     task_info_dict = {"Overall": {}}
     for time_window in sessions_time_windows:
         task_info_dict[get_time_window_label(time_window)] = {}
-    for session in sessions:
-        for i in range(len(session)-1):
-            log = session[i]
-            current_time_window = log_time_window(log)
-            component = log["Component"]
-            if component not in task_info_dict["Overall"]:
-                task_info_dict["Overall"][component] = {
-                    "count": 0,
-                    "duration": 0,
-                }
-            task_info_dict["Overall"][component]["count"] += 1
-            task_info_dict["Overall"][component]["duration"] += log["Duration"]
-            if current_time_window is not None:
-                if component not in task_info_dict[current_time_window]:
-                    task_info_dict[current_time_window][component] = {
-                        "count": 0,
-                        "duration": 0,
-                    }
-                task_info_dict[current_time_window][component]["count"] += 1
-                task_info_dict[current_time_window][component]["duration"] += log["Duration"]
+    session_rows = sessions.get_session_rows()
+    is_last_log = session_rows == np.repeat(sessions.ends - 1, sessions.get_session_lengths())
+    logs = sessions.df.iloc[session_rows[~is_last_log]][["Unix_Time", "Component", "Duration"]]
+    add_task_info("Overall", logs)
+    if len(sessions_time_windows) > 0:
+        start_hour = pd.to_datetime(logs["Unix_Time"], unit="s", utc=True).dt.tz_convert("Europe/Rome").dt.hour
+        hour_time_window_labels = np.array([hour_time_window(hour) for hour in range(24)], dtype=object)
+        for time_window, time_window_logs in logs.groupby(hour_time_window_labels[start_hour.to_numpy()], sort=False):
+            add_task_info(time_window, time_window_logs)
 
     # transforming dictionary into dataframe
     for key in task_info_dict:
@@ -0,0 +1,43 @@
+import numpy as np
+import pandas as pd
+
+import constants
+
+# -------------------------------------------------------------------
+# --- SYNTHETIC LOGS WITH THE COLUMNS OF THE DATASETS, FOR THE TESTS ---
+# -------------------------------------------------------------------
+
+courses = [course_dict["value"] for course_dict in constants.specific_moodle_course_filter]
+components = {"Overall Site": ["Dashboard", "Calendar", "Messages", "Grades", "File"],
+              "Authentication": ["Login", "Logout"]}
+for course in courses:
+    components[course] = ["Assignment", "File", "Lesson", "URL", "Quiz", "Forum", "Course_home", "Attendance"]
+
+
+# --- SYNTHETIC LOGS: STUDENTS MOVING BETWEEN THE COURSES AND THE SITE AREA WITH SHORT AND LONG PAUSES ---
+def get_synthetic_logs(seed, students_count=30):
+    random_generator = np.random.default_rng(seed)
+    rows = []
+    for student in range(students_count):
+        unix_time = 1610000000 + int(random_generator.integers(0, 10 ** 6))
+        course_area = random_generator.choice(list(components.keys()))
+        for _ in range(int(random_generator.integers(1, 60))):
+            if random_generator.random() < 0.35:
+                course_area = random_generator.choice(list(components.keys()))
+            # some logs have the same timestamp as the previous one
+            gap = int(random_generator.choice([0, random_generator.integers(1, 60), random_generator.integers(60, 900),
+                                               random_generator.integers(900, 9000)], p=[0.1, 0.5, 0.3, 0.1]))
+            rows.append(["User_" + str(student),
+                         course_area,
+                         random_generator.choice(components[course_area]),
+                         "Event_" + str(random_generator.integers(0, 3)),
+                         unix_time,
+                         gap])
+            unix_time += gap
+    df = pd.DataFrame(rows, columns=["Student ID", "Course_Area", "Component", "Event_Name", "Unix_Time", "Duration"])
+    # the last log of each student has no following log
+    df.loc[df["Student ID"] != df["Student ID"].shift(-1), "Duration"] = 0
+    df["Duration"] = df["Duration"].astype(float)
+    df["Estimated_Duration"] = np.floor(df["Duration"] * random_generator.random(len(df))
+                                        * random_generator.choice([0.3, 1.0], len(df)))
+    return df
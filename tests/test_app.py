@@ -0,0 +1,52 @@
+import json
+import pytest
+
+import app
+import functions_algorithm
+import functions_data
+import synthetic_logs
+
+# ---------------------------------------------------------------------------------------
+# --- THE PLOT AND THE TIME WINDOW STATISTICS ONLY USE THE GRANULARITIES THAT ARE SHOWN ---
+# ---------------------------------------------------------------------------------------
+
+logs = synthetic_logs.get_synthetic_logs(11, students_count=10)
+datasets = {"activity_granularity": logs, "task_granularity": functions_data.get_task_granularity_dataset(logs)}
+# the sessions of each granularity, as stored by prepare_data_for_plot
+session_dicts = {granularity: functions_algorithm.get_session_result(functions_algorithm.get_student_index(df),
+                                                                     [], "session_study", True, True, True, True, 5, {})
+                 .to_dict(["Unix_Time", "Component", "Event_Name", "Duration"])
+                 for granularity, df in datasets.items()}
+
+
+def get_sessions_json(granularities):
+    return json.dumps({granularity: session_dicts[granularity] for granularity in granularities})
+
+
+@pytest.mark.parametrize("granularities", [[], ["activity_granularity"], ["task_granularity"],
+                                           ["activity_granularity", "task_granularity"]])
+def test_box_plot_of_the_granularities_shown(granularities):
+    figure = app.update_legend_visibility(get_sessions_json(granularities), granularities, ["08:00", "14:00"])
+    # a box and its hovering information for each granularity shown
+    assert sorted(trace.name for trace in figure.data if trace.type == "box") \
+        == sorted("Task" if granularity == "task_granularity" else "Activity" for granularity in granularities)
+    assert len(figure.data) == 2 * len(granularities)
+
+
+@pytest.mark.parametrize("granularities", [[], ["activity_granularity"]])
+def test_no_time_window_statistics_without_the_task_granularity(granularities):
+    children, tab_value, statistics = app.update_tabs(get_sessions_json(granularities), ["08:00", "14:00"])
+    assert children == [] and tab_value is None and statistics is None
+    assert app.update_tabs_displayed_content(tab_value, statistics) == app.ui_text.time_window_statistics_without_task
+
+
+def test_time_window_statistics_of_the_task_granularity():
+    tabs = {}
+    for granularities in [["task_granularity"], ["activity_granularity", "task_granularity"]]:
+        children, tab_value, statistics = app.update_tabs(get_sessions_json(granularities), ["08:00", "14:00"])
+        tabs[len(granularities)] = ([(child.label, child.value) for child in children], tab_value, statistics)
+    # the statistics do not depend on the activity granularity
+    assert tabs[1] == tabs[2]
+    children, tab_value, statistics = tabs[1]
+    assert tab_value == "Overall-tab"
+    assert list(json.loads(statistics)) == [label for label, _ in children] == ["Overall", "08:00-14:00", "14:00-08:00"]
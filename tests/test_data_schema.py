@@ -0,0 +1,38 @@
+import numpy as np
+import pandas as pd
+
+import functions_algorithm
+import functions_data
+import synthetic_logs
+
+
+# --- THE DURATIONS USE THE COMPACT TYPES OF THE SCHEMA WHEN THEY KEEP THE VALUES UP TO THEIR ROUNDING ---
+def test_durations_are_compacted():
+    decimal_durations = pd.Series(np.round(np.random.default_rng(0).uniform(0, 10 ** 5, 1000), 3))
+    typed_durations = functions_data.get_typed_column(decimal_durations, "float32")
+    assert typed_durations.dtype == np.float32
+    assert np.allclose(typed_durations.to_numpy(dtype=np.float64), decimal_durations, rtol=1.2e-7, atol=0)
+    assert functions_data.get_typed_column(pd.Series([3, 4]), "float32").dtype == np.int32
+    assert functions_data.get_typed_column(pd.Series([np.nan, 1.5]), "float32").dtype == np.float32
+
+
+def test_values_out_of_the_compact_types_are_kept():
+    assert functions_data.get_typed_column(pd.Series([1e40, 1.0]), "float32").dtype == np.float64
+    assert functions_data.get_typed_column(pd.Series([2 ** 40, 4]), "int32").dtype == np.int64
+
+
+# --- THE SESSIONS OF THE TYPED DATASET ARE THE SAME AS THE ONES OF THE LOGS AS THEY ARE READ ---
+# (the durations are not rounded, so that a pause close to the STT does not change its side of the STT)
+def test_pauses_close_to_the_stt_keep_their_breaks():
+    logs = synthetic_logs.get_synthetic_logs(9, students_count=10)
+    random_generator = np.random.default_rng(9)
+    logs["Estimated_Duration"] = np.round(random_generator.uniform(10 ** 5, 2 * 10 ** 5, len(logs)), 3)
+    logs["Duration"] = logs["Estimated_Duration"] + 300 + random_generator.choice([-0.001, 0.001], len(logs))
+    typed_logs = functions_data.get_typed_dataset(logs)
+    assert typed_logs["Duration"].equals(logs["Duration"])
+    settings = ([], "session_study", True, True, True, True, 5, {})
+    session_result = functions_algorithm.get_session_result(functions_algorithm.get_student_index(logs), *settings)
+    typed_session_result = functions_algorithm.get_session_result(functions_algorithm.get_student_index(typed_logs),
+                                                                  *settings)
+    assert typed_session_result.get_sessions() == session_result.get_sessions()
+    assert typed_session_result.get_reason_to_end() == session_result.get_reason_to_end()
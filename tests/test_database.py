@@ -0,0 +1,69 @@
+import itertools
+import numpy as np
+import pytest
+
+import functions_algorithm
+import functions_data
+import functions_database
+import synthetic_logs
+
+# ----------------------------------------------------------------------------------------------------
+# --- THE SESSIONS OF THE SQLITE BACKEND ARE THE SAME AS THE ONES OF THE STUDENT INDEX OF THE CSV FILE ---
+# ----------------------------------------------------------------------------------------------------
+
+# the students' logs are interleaved in time, as in the datasets
+logs = synthetic_logs.get_synthetic_logs(13, students_count=20).sort_values("Unix_Time", kind="stable") \
+    .reset_index(drop=True)
+unix_time = logs["Unix_Time"].to_numpy()
+# the observation ranges: all the logs, a part of them, and a range without logs
+time_ranges = [(None, None), (int(unix_time.min()) + 86400, int(unix_time.max()) - 86400), (0, 1)]
+
+
+@pytest.fixture(scope="module")
+def database(tmp_path_factory):
+    csv_path = str(tmp_path_factory.mktemp("database") / "logs.csv")
+    logs.to_csv(csv_path)
+    database_path = csv_path[:-len(".csv")] + ".sqlite"
+    # (the rows are written a few at a time)
+    functions_database.write_database_table(csv_path, database_path, "activity_granularity", chunk_size=100)
+    yield database_path, functions_algorithm.get_student_index(functions_data.read_typed_csv(csv_path))
+    functions_database.clear_student_index_cache(database_path)
+
+
+def get_session_keys(session_result):
+    # the sessions (as tuples of logs) with their reasons to end, in the order of the session result
+    return [(tuple(tuple(sorted(log.items())) for log in session), tuple(reason))
+            for session, reason in zip(session_result.get_sessions(), session_result.get_reason_to_end())]
+
+
+@pytest.mark.parametrize("time_range, specific_moodle_course, type_of_session",
+                         list(itertools.product(time_ranges,
+                                                [[], ["Course_A"], ["Course_B", "Course_C"]],
+                                                ["session_study", "session_course", "session_learning"])))
+def test_database_sessions_match_student_index(database, time_range, specific_moodle_course, type_of_session):
+    database_path, student_index = database
+    start_time, end_time = time_range
+    settings = (specific_moodle_course, type_of_session, True, True, True, True, 5, {"File": 2})
+    chosen_df = student_index if start_time is None else student_index.get_time_subset(start_time, end_time)
+    session_keys = get_session_keys(functions_algorithm.get_session_result(chosen_df, *settings))
+    assert (len(session_keys) == 0) == (time_range == (0, 1))
+    database_index = functions_database.get_student_index(database_path, "activity_granularity", start_time, end_time,
+                                                          specific_moodle_course)
+    assert get_session_keys(functions_algorithm.get_session_result(database_index, *settings)) == session_keys
+    # the sessions divided a few students at a time are the same, in the same order
+    session_results = list(functions_database.iterate_session_results(database_path,
+                                                                      "activity_granularity",
+                                                                      start_time,
+                                                                      end_time,
+                                                                      *settings,
+                                                                      chunk_size=37))
+    assert sum((get_session_keys(session_result) for session_result in session_results), []) == session_keys
+    assert len(session_results) <= len(np.unique(chosen_df.df["Student ID"].astype(str)))
+
+
+def test_database_limits_and_components(database):
+    database_path, student_index = database
+    assert tuple(functions_database.get_time_limits(database_path, "activity_granularity")) \
+        == (int(unix_time.min()), int(unix_time.max()))
+    assert sorted(functions_database.get_components(database_path, "activity_granularity", ["Course_B"])) \
+        == sorted(logs.loc[logs["Course_Area"] == "Course_B", "Component"].unique().tolist())
@@ -0,0 +1,85 @@
+import pytest
+
+import constants
+import functions_data
+import functions_ui
+import synthetic_logs
+
+# ------------------------------------------------------------------------------------------------------
+# --- THE DATASETS ARE LOADED ON FIRST USE, AND THE LEAST RECENTLY USED ONES ARE UNLOADED OVER BUDGET ---
+# ------------------------------------------------------------------------------------------------------
+
+logs = synthetic_logs.get_synthetic_logs(14, students_count=10)
+
+
+@pytest.fixture
+def dataset_dir_paths(tmp_path, monkeypatch):
+    monkeypatch.setattr(constants, "data_backend", "csv")
+    monkeypatch.setattr(constants, "use_data_cache", False)
+    monkeypatch.setattr(constants, "derive_task_granularity", False)
+    monkeypatch.setattr(constants, "file_names", {"activity_granularity": "activity.csv",
+                                                  "task_granularity": "task.csv"})
+    # three datasets with the same logs (and so with the same memory usage)
+    dataset_dir_paths = {}
+    for dataset in ["A", "B", "C"]:
+        (tmp_path / dataset).mkdir()
+        logs.to_csv(tmp_path / dataset / "activity.csv")
+        functions_data.get_task_granularity_dataset(logs).to_csv(tmp_path / dataset / "task.csv")
+        dataset_dir_paths[dataset] = str(tmp_path / dataset) + "/"
+    return dataset_dir_paths
+
+
+def read_activity_logs(dataset_dir_path):
+    return functions_data.read_typed_csv(dataset_dir_path + "activity.csv")
+
+
+def test_granularities_are_loaded_on_first_use(dataset_dir_paths):
+    loads = []
+    dict_of_df = functions_ui.LazyDatasets(dataset_dir_paths["A"], lambda: loads.append(len(loads)))
+    assert len(dict_of_df) == 0 and dict_of_df.memory_usage == 0
+    df = dict_of_df["activity_granularity"]
+    assert list(dict_of_df.keys()) == ["activity_granularity"] and len(loads) == 1
+    assert df.equals(read_activity_logs(dataset_dir_paths["A"]))
+    activity_memory_usage = dict_of_df.memory_usage
+    assert activity_memory_usage > 0
+    # a granularity already loaded is not loaded again
+    assert dict_of_df["activity_granularity"] is df and len(loads) == 1
+    dict_of_df["task_granularity"]
+    assert sorted(dict_of_df.keys()) == sorted(constants.file_names.keys()) and len(loads) == 2
+    assert dict_of_df.memory_usage > activity_memory_usage
+
+
+def test_task_granularity_derived_from_activity_granularity(dataset_dir_paths, monkeypatch):
+    monkeypatch.setattr(constants, "derive_task_granularity", True)
+    dict_of_df = functions_ui.LazyDatasets(dataset_dir_paths["A"])
+    # (the activity logs are loaded first)
+    task_df = dict_of_df["task_granularity"]
+    assert sorted(dict_of_df.keys()) == sorted(constants.file_names.keys())
+    assert task_df.equals(functions_data.get_task_granularity_dataset(dict_of_df["activity_granularity"]))
+
+
+def test_least_recently_used_dataset_is_unloaded_over_budget(dataset_dir_paths):
+    registry = functions_ui.DatasetRegistry(dataset_dir_paths)
+    registry.get_datasets("A")["activity_granularity"]
+    dataset_memory_usage = registry.get_memory_usage()
+    # two datasets fit in the budget, three do not
+    registry.memory_budget = int(2.5 * dataset_memory_usage)
+    registry.get_datasets("B")["activity_granularity"]
+    assert list(registry.loaded_datasets) == ["A", "B"]
+    # A is used again, so B is the least recently used when C is loaded
+    registry.get_datasets("A")
+    registry.get_datasets("C")["activity_granularity"]
+    assert list(registry.loaded_datasets) == ["A", "C"]
+    assert registry.get_memory_usage() == 2 * dataset_memory_usage
+    # B is loaded again when it is used (and A is unloaded)
+    assert registry.get_datasets("B")["activity_granularity"].equals(read_activity_logs(dataset_dir_paths["B"]))
+    assert list(registry.loaded_datasets) == ["C", "B"]
+
+
+def test_most_recently_used_dataset_is_kept_over_budget(dataset_dir_paths):
+    registry = functions_ui.DatasetRegistry(dataset_dir_paths, memory_budget=1)
+    for dataset in ["A", "B"]:
+        df = registry.get_datasets(dataset)["activity_granularity"]
+        # the dataset that is used is kept, even if it does not fit in the budget by itself
+        assert list(registry.loaded_datasets) == [dataset]
+        assert registry.get_datasets(dataset)["activity_granularity"] is df
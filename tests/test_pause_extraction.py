@@ -0,0 +1,59 @@
+import itertools
+import pytest
+
+import functions_algorithm
+import functions_data
+import synthetic_logs
+
+# ------------------------------------------------------------------------------------------------------
+# --- THE PAUSES OF THE STT SUGGESTION ARE THE SAME AS THE REASONS TO END RETURNED BY get_session_logs ---
+# ------------------------------------------------------------------------------------------------------
+
+datasets = {"activity": synthetic_logs.get_synthetic_logs(0),
+            "task": synthetic_logs.get_synthetic_logs(1).drop(columns=["Event_Name"]),
+            "typed": functions_data.get_typed_dataset(synthetic_logs.get_synthetic_logs(2))}
+
+
+# --- REASONS TO END OF get_session_logs (ONE LOG-LINE AT A TIME) WITH THE SETTINGS OF THE STT SUGGESTION ---
+def get_reference_pauses(chosen_df, specific_moodle_course, type_of_session):
+    _, reason_to_end = functions_algorithm.get_session_logs(chosen_df,
+                                                            specific_moodle_course,
+                                                            type_of_session,
+                                                            authentication_flag=False,
+                                                            stt_flag=True,
+                                                            del_attendance_session_flag=False,
+                                                            outlier_detection_switch=True,
+                                                            general_stt=0,
+                                                            active_component_stt_dict={},
+                                                            engine="loop")
+    return [(reason, component, float(inactivity)) for reason, component, inactivity in reason_to_end]
+
+
+def get_pauses_of_table(pause_table):
+    return list(zip(pause_table["Reason"].tolist(),
+                    pause_table["Component"].tolist(),
+                    pause_table["Inactivity"].tolist()))
+
+
+@pytest.mark.parametrize("dataset, type_of_session, specific_moodle_course",
+                         list(itertools.product(datasets.keys(),
+                                                ["session_study", "session_course", "session_learning"],
+                                                [[], ["Course_A"], ["Course_B", "Course_C"]])))
+def test_pauses_match_session_logs(dataset, type_of_session, specific_moodle_course):
+    chosen_df = datasets[dataset]
+    reference_pauses = get_reference_pauses(chosen_df, specific_moodle_course, type_of_session)
+    assert len(reference_pauses) != 0
+    assert functions_algorithm.get_pause_analysis(chosen_df, specific_moodle_course, type_of_session) \
+        == reference_pauses
+    pause_table = functions_algorithm.get_pause_table(chosen_df, specific_moodle_course, type_of_session)
+    assert get_pauses_of_table(pause_table) == reference_pauses
+    assert functions_algorithm.get_pause_table_from_list(reference_pauses)["Reason"].tolist() \
+        == pause_table["Reason"].tolist()
+
+
+@pytest.mark.parametrize("type_of_session", ["session_study", "session_course", "session_learning"])
+def test_pauses_match_session_logs_with_workers(type_of_session):
+    chosen_df = datasets["activity"]
+    reference_pauses = get_reference_pauses(chosen_df, ["Course_A"], type_of_session)
+    assert functions_algorithm.get_pause_analysis(chosen_df, ["Course_A"], type_of_session, workers=2) \
+        == reference_pauses
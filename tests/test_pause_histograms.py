@@ -0,0 +1,65 @@
+import itertools
+import numpy as np
+import pytest
+from datetime import datetime, timedelta
+
+import functions_algorithm
+import synthetic_logs
+
+# --------------------------------------------------------------------------------------------------
+# --- THE DAILY PAUSE HISTOGRAMS OF A RANGE ARE THE SAME AS THE ONES OF THE PAUSES OF ITS LOGS ---
+# --------------------------------------------------------------------------------------------------
+
+logs = synthetic_logs.get_synthetic_logs(8, students_count=40).sort_values("Unix_Time", kind="stable") \
+    .reset_index(drop=True)
+# some pauses of the Calendar last 0 seconds: the Calendar ends pauses that are out of the histograms
+is_calendar = (logs["Component"] == "Calendar").to_numpy()
+logs.loc[is_calendar, "Estimated_Duration"] = logs.loc[is_calendar, "Duration"]
+student_index = functions_algorithm.get_student_index(logs)
+
+
+def get_midnight(day):
+    return int(datetime.timestamp(datetime.combine(day, datetime.min.time())))
+
+
+first_day = datetime.fromtimestamp(logs["Unix_Time"].min()).date()
+last_day = datetime.fromtimestamp(logs["Unix_Time"].max()).date()
+# ranges of one day, of a week, over the first or the last log, and of all the logs
+day_ranges = [(first_day + timedelta(days=start), first_day + timedelta(days=start + length))
+              for start, length in [(-1, 2), (0, 1), (3, 1), (4, 7), (9, 1), ((last_day - first_day).days, 3)]] \
+    + [(first_day, last_day + timedelta(days=1))]
+
+
+def assert_same_histograms(pause_histogram, reference_histogram):
+    assert pause_histogram.components == reference_histogram.components
+    for counts, reference_counts in zip((pause_histogram.bin_counts,
+                                         pause_histogram.edge_counts,
+                                         pause_histogram.pause_counts),
+                                        (reference_histogram.bin_counts,
+                                         reference_histogram.edge_counts,
+                                         reference_histogram.pause_counts)):
+        assert np.array_equal(counts, reference_counts)
+
+
+@pytest.mark.parametrize("type_of_session, specific_moodle_course",
+                         list(itertools.product(["session_study", "session_course", "session_learning"],
+                                                [[], ["Course_A"], ["Course_B", "Course_C"]])))
+def test_daily_pause_histograms_match_pause_extraction(type_of_session, specific_moodle_course):
+    daily_pause_histograms = functions_algorithm.get_daily_pause_histograms(student_index,
+                                                                            specific_moodle_course,
+                                                                            type_of_session)
+    for start_day, end_day in day_ranges:
+        start_time, end_time = get_midnight(start_day), get_midnight(end_day)
+        pause_table = functions_algorithm.get_pause_table(student_index.get_time_subset(start_time, end_time),
+                                                          specific_moodle_course,
+                                                          type_of_session)
+        assert_same_histograms(daily_pause_histograms.get_pause_histogram(start_time, end_time),
+                               functions_algorithm.get_pause_histogram_index(pause_table, type_of_session))
+
+
+def test_components_without_pauses_in_the_histograms():
+    daily_pause_histograms = functions_algorithm.get_daily_pause_histograms(student_index, [], "session_study")
+    start_time, end_time = get_midnight(first_day), get_midnight(last_day + timedelta(days=1))
+    pause_histogram = daily_pause_histograms.get_pause_histogram(start_time, end_time)
+    calendar_pause_counts = pause_histogram.get_pause_counts("Calendar")
+    assert "Calendar" in pause_histogram.components and not calendar_pause_counts.any()
@@ -0,0 +1,57 @@
+import itertools
+import pytest
+
+import functions_algorithm
+import functions_data
+import synthetic_logs
+
+# ------------------------------------------------------------------------------------------------
+# --- THE COLUMNAR ENGINE RETURNS THE SAME SESSIONS AND REASONS TO END AS THE ONE LOG-LINE LOOP ---
+# ------------------------------------------------------------------------------------------------
+
+# the students' logs are also interleaved in time, as in the datasets
+datasets = {"activity": synthetic_logs.get_synthetic_logs(3, students_count=15),
+            "interleaved": synthetic_logs.get_synthetic_logs(4, students_count=15)
+                                         .sort_values("Unix_Time", kind="stable").reset_index(drop=True),
+            "typed": functions_data.get_typed_dataset(synthetic_logs.get_synthetic_logs(5, students_count=15))}
+stt_settings = list(itertools.product([0, 5, None], [{}, {"Attendance": 3, "File": 0.5}]))
+course_filters = [[], ["Course_A"], ["Course_B", "Course_C"]]
+
+
+def get_session_logs(chosen_df, specific_moodle_course, type_of_session, flags, general_stt,
+                     active_component_stt_dict, **engine_settings):
+    return functions_algorithm.get_session_logs(chosen_df,
+                                                specific_moodle_course,
+                                                type_of_session,
+                                                *flags,
+                                                general_stt,
+                                                active_component_stt_dict,
+                                                **engine_settings)
+
+
+# flags: authentication_flag, stt_flag, del_attendance_session_flag, outlier_detection_switch
+@pytest.mark.parametrize("flags, type_of_session",
+                         list(itertools.product(itertools.product([True, False], repeat=4),
+                                                ["session_study", "session_course", "session_learning"])))
+def test_columnar_engine_matches_loop(flags, type_of_session):
+    for k, (dataset, (general_stt, active_component_stt_dict)) in enumerate(itertools.product(datasets.keys(),
+                                                                                             stt_settings)):
+        chosen_df = datasets[dataset]
+        specific_moodle_course = course_filters[k % len(course_filters)]
+        settings = (chosen_df, specific_moodle_course, type_of_session, flags, general_stt, active_component_stt_dict)
+        sessions, reason_to_end = get_session_logs(*settings, engine="loop")
+        assert len(sessions) != 0
+        assert get_session_logs(*settings, engine="columnar") == (sessions, reason_to_end)
+
+
+@pytest.mark.parametrize("flags, specific_moodle_course",
+                         list(itertools.product([(True, True, True, True), (False, False, False, False)],
+                                                course_filters)))
+def test_columnar_engine_with_workers_matches_loop(flags, specific_moodle_course):
+    settings = (datasets["interleaved"], specific_moodle_course, "session_course", flags, 5, {"File": 0.5})
+    assert get_session_logs(*settings, engine="columnar", workers=2) == get_session_logs(*settings, engine="loop")
+
+
+def test_unknown_engine():
+    with pytest.raises(ValueError):
+        get_session_logs(datasets["activity"], [], "session_study", (True, True, True, True), 5, {}, engine="other")
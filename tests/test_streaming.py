@@ -0,0 +1,138 @@
+import itertools
+import numpy as np
+import pandas as pd
+import pytest
+
+import functions_algorithm
+import functions_streaming
+import synthetic_logs
+
+# -------------------------------------------------------------------------------------
+# --- THE STREAMING SEGMENTER RETURNS THE SAME SESSIONS AS get_session_logs ON ALL LOGS ---
+# -------------------------------------------------------------------------------------
+
+# the logs of all the students, in the order in which they arrive
+logs = synthetic_logs.get_synthetic_logs(6, students_count=20).sort_values("Unix_Time", kind="stable") \
+    .reset_index(drop=True)
+
+
+def get_session_keys(sessions, reason_to_end):
+    # the sessions (as tuples of logs) with their reasons to end, in a comparable order
+    return sorted((tuple(tuple(sorted(log.items())) for log in session), tuple(reason))
+                  for session, reason in zip(sessions, reason_to_end))
+
+
+@pytest.mark.parametrize("type_of_session, flags, specific_moodle_course, window",
+                         list(itertools.product(["session_study", "session_course", "session_learning"],
+                                                [(True, True, True, True), (False, True, False, False)],
+                                                [[], ["Course_A"]],
+                                                [600, 7200])))
+def test_streaming_matches_get_session_logs(type_of_session, flags, specific_moodle_course, window):
+    settings = (specific_moodle_course, type_of_session) + flags + (5, {"File": 2})
+    segmenter = functions_streaming.StreamingSessionSegmenter(*settings)
+    sessions = []
+    reason_to_end = []
+    unix_time = logs["Unix_Time"].to_numpy()
+    watermark_sessions_count = 0
+    # the logs arrive window seconds at a time, and the watermark follows them
+    for window_start in range(int(unix_time.min()), int(unix_time.max()) + 1, window):
+        window_logs = logs[(unix_time >= window_start) & (unix_time < window_start + window)]
+        if len(window_logs) != 0:
+            new_sessions, new_reason_to_end = segmenter.add_logs(window_logs)
+            sessions += new_sessions
+            reason_to_end += new_reason_to_end
+        new_sessions, new_reason_to_end = segmenter.advance_watermark(window_start + window)
+        watermark_sessions_count += len(new_sessions)
+        sessions += new_sessions
+        reason_to_end += new_reason_to_end
+        # only the logs of the sessions that are not returned yet are kept
+        # (and the last log of each session whose reason to end is not known yet)
+        assert sum(len(student_logs) for student_logs in segmenter.pending_logs.values()) \
+            <= (unix_time < window_start + window).sum() - sum(len(session) for session in sessions) \
+            + len(segmenter.unclassified_reasons)
+    new_sessions, new_reason_to_end = segmenter.close_all()
+    sessions += new_sessions
+    reason_to_end += new_reason_to_end
+    assert watermark_sessions_count != 0
+    assert len(segmenter.pending_logs) == 0 and len(segmenter.unclassified_reasons) == 0
+    assert get_session_keys(sessions, reason_to_end) \
+        == get_session_keys(*functions_algorithm.get_session_logs(logs, *settings))
+
+
+def test_watermark_returns_session_before_its_reason_to_end():
+    settings = ([], "session_study", False, True, False, True, 5, {})
+    student_logs = logs[logs["Student ID"] == logs["Student ID"].iloc[0]].reset_index(drop=True)
+    gaps = np.flatnonzero(student_logs["Duration"] - student_logs["Estimated_Duration"] > 300)
+    assert len(gaps) != 0
+    segmenter = functions_streaming.StreamingSessionSegmenter(*settings)
+    # the logs until the first pause longer than the STT, then the watermark after the STT
+    segmenter.add_logs(student_logs.iloc[:gaps[0] + 1])
+    sessions, reason_to_end = segmenter.advance_watermark(student_logs["Unix_Time"].iloc[gaps[0] + 1])
+    assert len(sessions) == 1 and sessions[0][-1]["Unix_Time"] == student_logs["Unix_Time"].iloc[gaps[0]]
+    assert reason_to_end == [[None, None, None]]
+    # only the last log of the session is kept, to classify the reason to end when the next logs arrive
+    assert len(segmenter.pending_logs[sessions[0][0]["Student ID"]]) == 1
+    assert segmenter.get_open_sessions() == ([], [])
+    segmenter.add_logs(student_logs.iloc[gaps[0] + 1:])
+    segmenter.close_all()
+    _, batch_reason_to_end = functions_algorithm.get_session_logs(student_logs, *settings)
+    assert tuple(reason_to_end[0]) == batch_reason_to_end[0]
+
+
+# -----------------------------------------------------------------------------------------------------
+# --- THE SESSIONS OF A CSV FILE DIVIDED IN CHUNKS ARE THE SAME AS THE ONES OF get_session_logs ---
+# -----------------------------------------------------------------------------------------------------
+
+# the logs sorted by student and time, as the CSV files divided by write_sessions_of_csv
+student_logs = synthetic_logs.get_synthetic_logs(10, students_count=4) \
+    .sort_values(["Student ID", "Unix_Time"], kind="stable").reset_index(drop=True)
+first_student_size = int((student_logs["Student ID"] == student_logs["Student ID"].iloc[0]).sum())
+
+
+def get_reason_keys(reason_to_end):
+    # the reasons to end without the missing values (read from the CSV file as nan)
+    return [tuple(None if pd.isna(value) else value for value in reason) for reason in reason_to_end]
+
+
+def read_sessions_of_csv(sessions_path, pauses_path):
+    session_logs = pd.read_csv(sessions_path)
+    sessions = [session.drop(columns="Session").to_dict("records")
+                for _, session in session_logs.groupby("Session", sort=True)]
+    pauses = pd.read_csv(pauses_path)
+    return sessions, list(zip(pauses["Reason"], pauses["Component"], pauses["Inactivity"]))
+
+
+# chunks of one log, of a few logs, that divide the first student (in the middle or one log after the end of
+# the student), and of the whole file
+@pytest.mark.parametrize("type_of_session, flags, chunk_size",
+                         list(itertools.product(["session_study", "session_course", "session_learning"],
+                                                [(True, True, True, True), (False, True, False, False)],
+                                                [1, 2, 7, first_student_size // 2, first_student_size + 1,
+                                                 len(student_logs)])))
+def test_chunked_csv_matches_get_session_logs(tmp_path, type_of_session, flags, chunk_size):
+    csv_path = str(tmp_path / "logs.csv")
+    student_logs.to_csv(csv_path)
+    for specific_moodle_course in [[], ["Course_A"]]:
+        settings = (specific_moodle_course, type_of_session) + flags + (5, {"File": 2})
+        sessions_path, pauses_path = str(tmp_path / "sessions.csv"), str(tmp_path / "pauses.csv")
+        sessions_count = functions_streaming.write_sessions_of_csv(csv_path, sessions_path, pauses_path, *settings,
+                                                                   chunk_size=chunk_size)
+        sessions, reason_to_end = functions_algorithm.get_session_logs(student_logs, *settings)
+        assert sessions_count == len(sessions) != 0
+        chunked_sessions, chunked_reason_to_end = read_sessions_of_csv(sessions_path, pauses_path)
+        assert get_session_keys(chunked_sessions, get_reason_keys(chunked_reason_to_end)) \
+            == get_session_keys(sessions, get_reason_keys(reason_to_end))
+
+
+# the logs of the first student divided by the ones of the other students, or not sorted by time
+@pytest.mark.parametrize("unsorted_logs",
+                         [student_logs.iloc[np.r_[first_student_size // 2:len(student_logs), :first_student_size // 2]],
+                          student_logs.iloc[np.r_[1, 0, 2:len(student_logs)]]])
+def test_unsorted_csv_is_not_divided(tmp_path, unsorted_logs):
+    csv_path = str(tmp_path / "logs.csv")
+    unsorted_logs.to_csv(csv_path)
+    for chunk_size in [1, 7, len(student_logs)]:
+        with pytest.raises(ValueError):
+            functions_streaming.write_sessions_of_csv(csv_path, str(tmp_path / "sessions.csv"),
+                                                      str(tmp_path / "pauses.csv"), [], "session_study",
+                                                      True, True, True, True, 5, {}, chunk_size=chunk_size)
@@ -0,0 +1,111 @@
+import numpy as np
+import pytest
+
+import constants
+import functions_algorithm
+
+labels = constants.stt_suggestion_final_pause_types["session_study"]
+
+
+# --- RANDOM DENSITY HISTOGRAMS OF THE TWO PAUSE TYPES, WITH MANY EMPTY, EQUAL OR PROPORTIONAL BINS ---
+def get_random_densities(random_generator, histograms_count, bins_count):
+    counts = random_generator.poisson(random_generator.uniform(0.05, 3, (histograms_count, 1, 1)),
+                                      (histograms_count, 2, bins_count))
+    # the pause types of some histograms have proportional counts (a flat fit)
+    is_proportional = random_generator.random(histograms_count) < 0.2
+    counts[is_proportional, 1] = counts[is_proportional, 0] * random_generator.integers(1, 3)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        return counts / counts.sum(axis=2, keepdims=True)
+
+
+@pytest.mark.parametrize("bins_count", [2, 3, 10, 60])
+def test_batch_suggestions_match_single_suggestions(bins_count):
+    densities = get_random_densities(np.random.default_rng(bins_count), 500, bins_count)
+    thresholds = functions_algorithm.get_thresholds_from_densities(densities, labels)
+    for n, threshold in zip(densities, thresholds):
+        single_threshold = functions_algorithm.get_threshold_from_densities(n, labels)
+        assert (single_threshold is None and np.isnan(threshold)) or single_threshold == threshold
+
+
+def test_no_suggestion_for_degenerate_fits():
+    index_real_pause = 0 if labels[0] in constants.stt_suggestion_real_pause else 1
+    one_bin = np.zeros((2, 5))
+    one_bin[:, 2] = 1.0
+    flat = np.full((2, 5), 0.2)
+    missing_pause_type = np.full((2, 5), 0.2)
+    missing_pause_type[index_real_pause] = np.nan
+    for n in [one_bin, flat, missing_pause_type]:
+        assert functions_algorithm.get_threshold_from_densities(n, labels) is None
+    # a regular fit gives the crossover of the least squares line of np.polyfit
+    increasing = np.array([[0.4, 0.3, 0.2, 0.1], [0.1, 0.2, 0.3, 0.4]])
+    difference = increasing[1 - index_real_pause] - increasing[index_real_pause]
+    a, b = np.polyfit(np.log(np.arange(1, 5)), difference, 1)
+    assert functions_algorithm.get_threshold_from_densities(increasing, labels) == round(np.exp(-b / a), 2)
+
+
+def test_confidence_interval_only_with_enough_pauses():
+    random_generator = np.random.default_rng(0)
+    minutes = np.arange(60)
+    probabilities = [np.exp(-minutes / 5) / np.exp(-minutes / 5).sum(), np.full(60, 1 / 60)]
+    for pauses_count, has_interval in [(20, False), (constants.stt_suggestion_confidence_min_pauses - 1, False),
+                                       (5000, True)]:
+        counts = np.stack([random_generator.multinomial(pauses_count, p) for p in probabilities])
+        confidence_interval = functions_algorithm.get_threshold_confidence_interval(counts, labels, 1000, 0.95)
+        assert (confidence_interval is not None) == has_interval
+    low, high = confidence_interval
+    densities = counts / counts.sum(axis=1, keepdims=True)
+    assert low <= functions_algorithm.get_threshold_from_densities(densities, labels) <= high
+
+
+# --- DIRECT GAUSSIAN KERNEL DENSITY ON THE GRID (SAME BANDWIDTH AND REFLECTION AS get_kde_densities) ---
+def get_direct_kde_densities(counts, grid_step=0.5):
+    positions = np.arange(len(counts)) * grid_step
+    pauses = np.repeat(positions, counts)
+    quartiles = np.percentile(pauses, [25, 75], method="inverted_cdf")
+    spread = min(pauses.std(), (quartiles[1] - quartiles[0]) / 1.34) if quartiles[1] > quartiles[0] else pauses.std()
+    bandwidth = max(0.9 * spread * len(pauses) ** -0.2, grid_step)
+
+    def get_kernel_sums(x):
+        return np.exp(-0.5 * ((x[:, np.newaxis] - pauses) / bandwidth) ** 2).sum(axis=1) \
+            / (bandwidth * np.sqrt(2 * np.pi))
+
+    # the density outside the grid is reflected at its first and its last point
+    densities = get_kernel_sums(positions)
+    densities[1:] += get_kernel_sums(-positions[1:])
+    densities[:-1] += get_kernel_sums(2 * positions[-1] - positions[:-1])
+    return densities / len(pauses)
+
+
+@pytest.mark.parametrize("seed", range(4))
+def test_kde_densities_match_direct_kde(seed):
+    random_generator = np.random.default_rng(seed)
+    max_stt = [20, 45, 60, 90][seed]
+    data = [random_generator.exponential(random_generator.uniform(2, 20), random_generator.integers(30, 3000)),
+            random_generator.uniform(0, max_stt + 10, random_generator.integers(30, 3000))]
+    grid_counts = functions_algorithm.get_kde_grid_counts(data, max_stt)
+    densities = functions_algorithm.get_kde_densities(grid_counts)
+    for counts, type_densities in zip(grid_counts, densities):
+        direct_densities = get_direct_kde_densities(counts)
+        assert np.allclose(type_densities, direct_densities, rtol=0, atol=1e-4 * direct_densities.max())
+
+
+def test_no_kde_suggestion_for_degenerate_distributions():
+    index_real_pause = 0 if labels[0] in constants.stt_suggestion_real_pause else 1
+    pauses = np.random.default_rng(0).exponential(5, 500)
+    no_pauses = [np.array([]), np.array([])]
+    missing_pause_type = [pauses, pauses]
+    missing_pause_type[index_real_pause] = np.array([])
+    same_pauses = [pauses, pauses]
+    one_length = [np.full(100, 3.0), np.full(100, 3.0)]
+    # the real pauses are shorter than the continuations: the probabilities never cross from above
+    no_crossing = [pauses, pauses]
+    no_crossing[1 - index_real_pause] = pauses + 20
+    for data in [no_pauses, missing_pause_type, same_pauses, one_length, no_crossing]:
+        grid_counts = functions_algorithm.get_kde_grid_counts(data, 60)
+        assert np.isnan(functions_algorithm.get_thresholds_from_kde(grid_counts[np.newaxis], labels)).all()
+        assert functions_algorithm.get_recommended_threshold(data, labels, 60, method="kde") is None
+    # the real pauses are longer than the continuations: a suggestion between the two distributions
+    crossing = [pauses, pauses]
+    crossing[index_real_pause] = pauses + 30
+    threshold = functions_algorithm.get_recommended_threshold(crossing, labels, 60, method="kde")
+    assert threshold is not None and 5 < threshold < 40
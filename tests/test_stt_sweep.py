@@ -0,0 +1,62 @@
+import itertools
+import pytest
+
+import functions_algorithm
+import synthetic_logs
+
+# ------------------------------------------------------------------------------------------
+# --- THE SESSIONS OF EVERY STT OF THE SWEEP ARE THE SAME AS THE ONES OF get_session_result ---
+# ------------------------------------------------------------------------------------------
+
+logs = synthetic_logs.get_synthetic_logs(7, students_count=20).sort_values("Unix_Time", kind="stable") \
+    .reset_index(drop=True)
+student_index = functions_algorithm.get_student_index(logs)
+unix_time = logs["Unix_Time"].to_numpy()
+# the whole index and the logs of a time range (a subset of the rows of the index)
+chosen_dfs = {"all": student_index,
+              "range": student_index.get_time_subset(int(unix_time.min()) + 86400, int(unix_time.max()) - 86400)}
+
+
+def get_settings(specific_moodle_course, type_of_session, flags, general_stt, active_component_stt_dict):
+    authentication_flag, stt_flag, del_attendance_session_flag, outlier_detection_switch = flags
+    return (specific_moodle_course, type_of_session, authentication_flag, stt_flag, del_attendance_session_flag,
+            outlier_detection_switch, general_stt, active_component_stt_dict)
+
+
+@pytest.mark.parametrize("chosen_df, type_of_session, flags, active_component_stt_dict",
+                         list(itertools.product(chosen_dfs.keys(),
+                                                ["session_study", "session_course", "session_learning"],
+                                                [(True, True, True, True), (False, True, False, False)],
+                                                [{}, {"File": 2, "Quiz": 15}])))
+def test_stt_sweep_matches_session_result(chosen_df, type_of_session, flags, active_component_stt_dict):
+    chosen_df = chosen_dfs[chosen_df]
+    # (the sessions are ranges of the rows of the indexed logs)
+    index_unix_time = chosen_df.df["Unix_Time"].to_numpy()
+    for specific_moodle_course in [[], ["Course_A"]]:
+        stt_sweep = functions_algorithm.get_stt_sweep(chosen_df,
+                                                      specific_moodle_course,
+                                                      type_of_session,
+                                                      *flags,
+                                                      active_component_stt_dict,
+                                                      min_stt=0,
+                                                      max_stt=30)
+        assert list(stt_sweep.keys()) == list(range(31))
+        for general_stt in range(31):
+            settings = get_settings(specific_moodle_course, type_of_session, flags, general_stt,
+                                    active_component_stt_dict)
+            session_result = functions_algorithm.get_session_result(chosen_df, *settings)
+            assert stt_sweep[general_stt] == functions_algorithm.get_session_summary(session_result, index_unix_time)
+
+
+@pytest.mark.parametrize("chosen_df, type_of_session, general_stt",
+                         list(itertools.product(chosen_dfs.keys(),
+                                                ["session_study", "session_course", "session_learning"],
+                                                [None, 0, 2.5, 5, 45])))
+def test_swept_session_result_matches_session_result(chosen_df, type_of_session, general_stt):
+    for flags, active_component_stt_dict in itertools.product([(True, True, True, True), (True, True, False, False)],
+                                                              [{}, {"File": 2}]):
+        settings = get_settings(["Course_B"], type_of_session, flags, general_stt, active_component_stt_dict)
+        swept_session_result = functions_algorithm.get_swept_session_result(chosen_dfs[chosen_df], *settings)
+        session_result = functions_algorithm.get_session_result(chosen_dfs[chosen_df], *settings)
+        assert swept_session_result.get_sessions() == session_result.get_sessions()
+        assert swept_session_result.get_reason_to_end() == session_result.get_reason_to_end()
@@ -0,0 +1,78 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+import functions_data
+import synthetic_logs
+
+# ------------------------------------------------------------------------------------------------
+# --- THE TASKS ARE THE SAME AS THE ONES OF THE TRANSFORMATION OF THE README (ONE STUDENT AT A TIME) ---
+# ------------------------------------------------------------------------------------------------
+
+# the students' logs are interleaved in time, and some consecutive logs of a student are on the same component
+logs = synthetic_logs.get_synthetic_logs(12, students_count=12)
+is_same_task = (np.random.default_rng(12).random(len(logs)) < 0.4) \
+    & (logs["Student ID"] == logs["Student ID"].shift()).to_numpy()
+for row in np.flatnonzero(is_same_task).tolist():
+    logs.loc[row, ["Course_Area", "Component"]] = logs.loc[row - 1, ["Course_Area", "Component"]].to_numpy()
+logs = logs.sort_values("Unix_Time", kind="stable").reset_index(drop=True)
+
+
+# --- TRANSFORMATION OF THE README: THE TASKS, AND THE ROWS OF THE LOGS OF EACH TASK ---
+def get_readme_tasks(df):
+    tasks = []
+    task_rows = []
+    for user in df["Student ID"].unique():
+        user_df = df[df["Student ID"] == user]
+        for _, course_area_df in user_df.groupby((user_df["Course_Area"].shift() != user_df["Course_Area"]).cumsum()):
+            for _, component_df in course_area_df.groupby(
+                    (course_area_df["Component"].shift() != course_area_df["Component"]).cumsum()):
+                component_df_dict = component_df.to_dict("records")
+                sum_duration = 0
+                sum_estimated_duration = 0
+                for row in component_df_dict:
+                    sum_duration += row["Duration"]
+                    sum_estimated_duration += row["Estimated_Duration"]
+                tasks.append((user,
+                              component_df_dict[0]["Course_Area"],
+                              component_df_dict[0]["Component"],
+                              component_df_dict[0]["Unix_Time"],
+                              sum_estimated_duration,
+                              sum_duration))
+                task_rows.append(component_df.index.to_numpy())
+    return tasks, task_rows
+
+
+def get_tasks(task_df):
+    return list(zip(*(task_df[column].astype(object) for column in functions_data.task_columns)))
+
+
+readme_tasks, readme_task_rows = get_readme_tasks(logs)
+
+
+def test_task_dataset_matches_readme_transformation():
+    assert len(readme_tasks) < len(logs)
+    assert get_tasks(functions_data.get_task_granularity_dataset(logs)) == readme_tasks
+    assert get_tasks(functions_data.get_task_granularity_dataset(functions_data.get_typed_dataset(logs))) \
+        == readme_tasks
+
+
+@pytest.mark.parametrize("split_row", [1, 100, len(logs) // 2, len(logs) - 1])
+def test_incremental_task_dataset_matches_readme_transformation(split_row):
+    task_df = functions_data.get_task_granularity_dataset(logs.iloc[:split_row])
+    assert get_tasks(functions_data.get_task_granularity_dataset(logs.iloc[split_row:], task_df)) == readme_tasks
+
+
+@pytest.mark.parametrize("chunk_size", [None, 1, 2, 7, 40, len(logs)])
+def test_task_csv_matches_readme_transformation(tmp_path, chunk_size):
+    if chunk_size is not None and chunk_size < len(logs):
+        # some tasks have logs in several chunks
+        assert any(len(np.unique(rows // chunk_size)) > 1 for rows in readme_task_rows)
+    activity_csv_path, task_csv_path = str(tmp_path / "activity.csv"), str(tmp_path / "task.csv")
+    logs.to_csv(activity_csv_path)
+    tasks_count = functions_data.write_task_granularity_csv(activity_csv_path, task_csv_path, chunk_size)
+    task_df = pd.read_csv(task_csv_path, index_col=0)
+    assert list(task_df.columns) == functions_data.task_columns
+    assert list(task_df.index) == list(range(tasks_count))
+    # with chunks, the tasks are written in the order they are finished
+    assert sorted(get_tasks(task_df)) == sorted(readme_tasks)
@@ -2,6 +2,8 @@
 # in case of the dictionary variables, for the translation or change of the ui-text,
 # ONLY change the "label" value ("value" is used inside the code; if changed, the algorithm will not work correctly)
 
+select_dataset_label = "Select the dataset"
+
 select_specific_moodle_course_filter_label = "Select no, one, or more courses"
 select_specific_moodle_course_filter_placeholder = "All dataset logs"
 
@@ -41,6 +43,9 @@ component_active_session_timeout_thresholds_placeholder = "No active module spec
 suggestion_session_timeout_threshold = "Recommended threshold: {} minutes"
 suggestion_session_timeout_threshold_activity_task = "Recommended threshold: {} minutes for activity, {} minutes for task"
 no_suggestion_session_timeout_threshold = "There is not enough examples of this behaviour to make an STT recommendation"
+suggestion_with_confidence_interval = "{} ({}% interval: {}-{})"
+stt_sweep_summary = "With this STT: {} sessions, median duration {} min"
+stt_sweep_summary_activity_task = "With this STT: {} activity sessions (median duration {} min), {} task sessions (median duration {} min)"
 
 plot_title = "Spread of session durations"
 hovertemplate = ("<b>Session start period %{customdata[0]}</b><br>" +
@@ -57,3 +62,4 @@ current_split_points_placeholder = "No inserted split-points"
 add_split_point_label = "Split-point"
 add_split_point_placeholder = "Time (from 0 to 23)"
 add_split_point_button_text = "Add split-point"
+time_window_statistics_without_task = "The time window statistics are computed from the task sessions: show the task granularity to see them"